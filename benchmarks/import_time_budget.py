@@ -0,0 +1,89 @@
+"""
+Import-time budget check for the shim hot path.
+
+Every php/node shim fallback imports grazr.cli, so its import cost is paid on
+every call. This script imports it in fresh interpreters with `python -X importtime`
+under a throw-away HOME/XDG tree, and fails (exit 1) if:
+
+  * the best-of-N cumulative import time of grazr.cli exceeds the budget, or
+  * the import created any file or directory (config must be side-effect free).
+
+Usage:
+    python benchmarks/import_time_budget.py [--budget-ms 80] [--runs 7] [--module grazr.cli]
+"""
+import os
+import re
+import sys
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MODULE = "grazr.cli"
+DEFAULT_BUDGET_MS = 80.0
+DEFAULT_RUNS = 7
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+\d+\s+\|\s+(\d+)\s+\|\s+(\S.*)$")
+
+
+def _isolated_env(sandbox: Path):
+    env = dict(os.environ)
+    env.update({
+        "HOME": str(sandbox / "home"),
+        "XDG_CONFIG_HOME": str(sandbox / "config"),
+        "XDG_DATA_HOME": str(sandbox / "data"),
+        "PYTHONPATH": str(PROJECT_ROOT),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    env.pop("PYTHONSTARTUP", None)
+    return env
+
+
+def measure_import_us(module: str, sandbox: Path):
+    """Returns the cumulative import time of `module` in microseconds (one fresh interpreter)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=_isolated_env(sandbox), cwd=str(sandbox), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match and match.group(2).strip() == module:
+            return int(match.group(1))
+    raise RuntimeError(f"No importtime entry for {module}")
+
+
+def _snapshot(root: Path):
+    return sorted(str(p.relative_to(root)) for p in root.rglob("*"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if grazr.cli import time regresses.")
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="grazr-importtime-") as tmp:
+        sandbox = Path(tmp)
+        for sub in ("home", "config", "data"): (sandbox / sub).mkdir()
+        before = _snapshot(sandbox)
+        samples_us = [measure_import_us(args.module, sandbox) for _ in range(max(1, args.runs))]
+        created = sorted(set(_snapshot(sandbox)) - set(before))
+
+    best_ms = min(samples_us) / 1000.0
+    print(f"{args.module}: best {best_ms:.1f} ms over {len(samples_us)} runs "
+          f"(budget {args.budget_ms:.1f} ms; samples: {', '.join(f'{s / 1000:.1f}' for s in samples_us)})")
+    failed = False
+    if created:
+        print(f"FAIL: importing {args.module} created files/dirs: {created}")
+        failed = True
+    if best_ms > args.budget_ms:
+        print(f"FAIL: import time {best_ms:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
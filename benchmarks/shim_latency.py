@@ -0,0 +1,270 @@
+"""
+Latency benchmarks for the php/node shim resolution path.
+
+Builds a throw-away HOME with a fake PHP/Node bundles tree, a sites.json with N
+sites (each with nested working directories) and Grazr's shim tables, then times:
+
+  * inprocess-php / inprocess-node:  grazr.cli.find_php_version_for_path /
+    find_node_version_for_path called in one warm interpreter (no import cost);
+  * shim-php / shim-node:            packaging/php-shim.sh and node-shim.sh run
+    end-to-end with fresh resolution tables (the normal path);
+  * shim-php-slow / shim-node-slow:  the same shims with the tables made stale
+    before every call, forcing the grazr.cli fallback. (With --storage sqlite there is
+    no sites.json to be older than, so only the PHP table goes stale via the bundles dir.)
+
+Queries alternate between the deepest nested directory of a random site and a
+directory outside every site. p50/p95/p99 are reported per scenario and size, and
+the run fails (exit 1) when any p95 exceeds the stored baseline by more than the
+tolerance factor and by more than the minimum slack. Scenarios missing from the baseline are reported, not failed.
+
+Usage:
+    python benchmarks/shim_latency.py [--sizes 10 100 1000] [--iterations 40]
+                                      [--scenarios shim-php inprocess-node ...] [--storage sqlite]
+                                      [--baseline FILE] [--tolerance 2.0] [--min-slack-ms 2.0]
+                                      [--update-baseline]
+"""
+import os
+import io
+import sys
+import json
+import random
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "shim_latency_baseline.json"
+DEFAULT_SIZES = (10, 100, 1000)
+DEFAULT_ITERATIONS = 40
+DEFAULT_TOLERANCE = 2.0  # Fail when p95 > baseline p95 * tolerance (CI runners are noisy)
+DEFAULT_MIN_SLACK_MS = 2.0  # ...and by more than this, so sub-millisecond scenarios don't flap
+SCENARIOS = ("inprocess-php", "inprocess-node", "shim-php", "shim-node", "shim-php-slow", "shim-node-slow")
+
+FAKE_PHP_VERSION = "8.3"
+FAKE_NODE_VERSIONS = ("18.19.0", "20.11.1")
+SITE_NESTING = ("app", "Http", "Controllers", "Api", "V1")
+RANDOM_SEED = 1234
+
+
+# --- Sandbox construction ---
+def _write_executable(path: Path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    path.chmod(0o755)
+
+
+_STORAGE_BACKEND = {"name": "json"}  # Set from --storage; passed to every sandboxed process
+
+
+def _sandbox_env(home: Path):
+    env = {k: v for k, v in os.environ.items() if not k.startswith("XDG_")}
+    env.update({"HOME": str(home), "PYTHONPATH": str(PROJECT_ROOT), "PYTHONDONTWRITEBYTECODE": "1",
+                "GRAZR_STORAGE_BACKEND": _STORAGE_BACKEND["name"]})
+    env.pop("PYTHONSTARTUP", None)
+    return env
+
+
+def build_sandbox(root: Path, site_count: int):
+    """Creates HOME under root with bundles, N sites, shims and a Projects/Grazr checkout link."""
+    home = root / "home"
+    bundles = home / ".local/share/grazr/bundles"
+    php_dir = bundles / "php" / FAKE_PHP_VERSION
+    _write_executable(php_dir / "bin" / f"php{FAKE_PHP_VERSION}", "#!/bin/sh\nexit 0\n")
+    _write_executable(php_dir / "sbin" / f"php-fpm{FAKE_PHP_VERSION}", "#!/bin/sh\nexit 0\n")
+    (php_dir / "cli").mkdir(parents=True, exist_ok=True)
+    (php_dir / "cli" / "php.ini.grazr-default").write_text("memory_limit = 128M\n")
+    (php_dir / "fpm").mkdir(parents=True, exist_ok=True)
+    (php_dir / "fpm" / "php-fpm.conf.grazr-default").write_text("[global]\n")
+    for node_version in FAKE_NODE_VERSIONS:
+        node_bin = home / ".local/share/grazr/nvm_nodes/versions/node" / f"v{node_version}" / "bin"
+        for command in ("node", "npm", "npx"):
+            _write_executable(node_bin / command, "#!/bin/sh\nexit 0\n")
+
+    # The shims hard-code ~/Projects/Grazr/venv/bin/python and ~/Projects/Grazr
+    checkout = home / "Projects" / "Grazr"
+    (checkout / "venv" / "bin").mkdir(parents=True)
+    (checkout / "venv" / "bin" / "python").symlink_to(sys.executable)
+    (checkout / "grazr").symlink_to(PROJECT_ROOT / "grazr")
+
+    # "system" node/npm/npx for unmatched directories, so the real Node startup is not timed
+    for command in ("node", "npm", "npx"):
+        _write_executable(root / "system-bin" / command, "#!/bin/sh\nexit 0\n")
+
+    shim_bin = root / "bin"
+    shim_bin.mkdir()
+    for shim_name, script in (("php", "php-shim.sh"), ("node", "node-shim.sh")):
+        target = shim_bin / shim_name
+        target.write_text((PROJECT_ROOT / "packaging" / script).read_text())
+        target.chmod(0o755)
+
+    rng = random.Random(RANDOM_SEED)
+    sites, deep_dirs = [], []
+    for index in range(site_count):
+        site_root = home / "Sites" / f"group{index % 10}" / f"site{index}"
+        deep_dir = site_root.joinpath(*SITE_NESTING)
+        deep_dir.mkdir(parents=True)
+        deep_dirs.append(str(deep_dir))
+        needs_node = index % 2 == 0
+        sites.append({
+            "id": f"bench-{index}", "path": str(site_root), "domain": f"site{index}.test",
+            "php_version": "default" if index % 3 else FAKE_PHP_VERSION, "https": False,
+            "needs_node": needs_node, "node_version": rng.choice(("18", "20")) if needs_node else "system",
+            "favorite": False,
+        })
+    outside_dir = home / "scratch" / "a" / "b" / "c"
+    outside_dir.mkdir(parents=True)
+
+    (root / "sites_input.json").write_text(json.dumps(sites))
+    _run_worker(home, ["--worker", "prepare", "--input", str(root / "sites_input.json")])
+    query_dirs = [rng.choice(deep_dirs) if i % 2 == 0 else str(outside_dir) for i in range(256)]
+    (root / "query_dirs.json").write_text(json.dumps(query_dirs))
+    return home, shim_bin, query_dirs
+
+
+# --- Measurements ---
+def _run_worker(home: Path, worker_args):
+    result = subprocess.run([sys.executable, str(Path(__file__).resolve())] + worker_args,
+                            env=_sandbox_env(home), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Benchmark worker {worker_args[:2]} failed:\n{result.stderr}")
+    return result.stdout
+
+
+def measure_inprocess(home: Path, kind: str, iterations: int):
+    output = _run_worker(home, ["--worker", f"inprocess-{kind}", "--iterations", str(iterations),
+                                "--input", str(home.parent / "query_dirs.json")])
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_shim(home: Path, shim_bin: Path, kind: str, query_dirs, iterations: int, stale: bool):
+    shim = shim_bin / kind
+    table = home / ".config/grazr" / ("php_resolution.tsv" if kind == "php" else "node_resolution.tsv")
+    env = _sandbox_env(home)
+    env["PATH"] = f"{home.parent / 'system-bin'}{os.pathsep}{env.get('PATH', '')}"
+    args = ["-r", "1"] if kind == "php" else ["-e", "0"]
+    samples_ms = []
+    for i in range(iterations):
+        if stale and table.exists(): os.utime(table, (0, 0))  # Older than sites.json -> fallback
+        start = time.perf_counter_ns()
+        result = subprocess.run([str(shim)] + args, cwd=query_dirs[i % len(query_dirs)], env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        samples_ms.append((time.perf_counter_ns() - start) / 1e6)
+        if result.returncode != 0:
+            raise RuntimeError(f"{kind} shim exited {result.returncode}:\n{result.stderr}")
+    return samples_ms
+
+
+def percentiles(samples_ms):
+    if len(samples_ms) < 2: return {"p50": samples_ms[0], "p95": samples_ms[0], "p99": samples_ms[0]}
+    cuts = statistics.quantiles(samples_ms, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+# --- Worker side (runs inside the sandbox HOME so grazr.core.config picks it up) ---
+def _worker_prepare(sites_file: str):
+    from grazr.managers.site_manager import save_sites
+    from grazr.managers.php_manager import ensure_php_version_config_if_stale
+    from grazr.core import config, shim_tables
+    config.ensure_base_dirs()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not save_sites(json.loads(Path(sites_file).read_text())): raise RuntimeError("save_sites failed")
+    ensure_php_version_config_if_stale(FAKE_PHP_VERSION)
+    if not shim_tables.refresh_all_shim_tables(): raise RuntimeError("Could not write shim tables")
+
+
+def _worker_inprocess(kind: str, query_dirs_file: str, iterations: int):
+    from grazr import cli
+    query_dirs = json.loads(Path(query_dirs_file).read_text())
+    lookup = cli.find_php_version_for_path if kind == "php" else cli.find_node_version_for_path
+    samples_ms = []
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        lookup(query_dirs[0])  # Warm-up: first PHP lookup may materialise the active config
+        for i in range(iterations):
+            start = time.perf_counter_ns()
+            lookup(query_dirs[i % len(query_dirs)])
+            samples_ms.append((time.perf_counter_ns() - start) / 1e6)
+            sink.seek(0); sink.truncate()
+    print(json.dumps(samples_ms))
+
+
+# --- Reporting / baseline gate ---
+def load_baseline(path: Path):
+    try:
+        return json.loads(path.read_text()).get("p95_ms", {})
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path: Path, results):
+    payload = {
+        "_comment": "p95 latency in ms per scenario/site-count; regenerate with --update-baseline",
+        "p95_ms": {key: round(stats["p95"], 3) for key, stats in sorted(results.items())},
+    }
+    path.write_text(json.dumps(payload, indent=2) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark php/node shim resolution latency.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json",
+                        help="Site storage backend (results for sqlite are keyed '<scenario>/<N>@sqlite').")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--min-slack-ms", type=float, default=DEFAULT_MIN_SLACK_MS)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--input", help=argparse.SUPPRESS)  # Worker input file (sites / query dirs JSON)
+    args = parser.parse_args(argv)
+
+    if args.worker == "prepare":
+        _worker_prepare(args.input); return 0
+    if args.worker in ("inprocess-php", "inprocess-node"):
+        _worker_inprocess(args.worker.split("-", 1)[1], args.input, args.iterations); return 0
+
+    _STORAGE_BACKEND["name"] = args.storage
+    key_suffix = "" if args.storage == "json" else f"@{args.storage}"
+    iterations = max(2, args.iterations)
+    results = {}
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix=f"grazr-shimbench-{size}-") as tmp:
+            home, shim_bin, query_dirs = build_sandbox(Path(tmp), size)
+            for scenario in args.scenarios:
+                mode, kind, *slow = scenario.split("-")
+                if mode == "inprocess":
+                    samples = measure_inprocess(home, kind, iterations)
+                else:
+                    samples = measure_shim(home, shim_bin, kind, query_dirs, iterations, stale=bool(slow))
+                results[f"{scenario}/{size}{key_suffix}"] = percentiles(samples)
+
+    baseline = load_baseline(args.baseline)
+    failed = []
+    print(f"{'scenario/sites':<28}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'base p95':>10}  status")
+    for key, stats in results.items():
+        base = baseline.get(key)
+        if base is None: status = "new"
+        elif stats["p95"] > base * args.tolerance and stats["p95"] - base > args.min_slack_ms:
+            status = f"FAIL (> {args.tolerance:g}x baseline)"
+            failed.append(key)
+        else: status = "ok"
+        base_str = f"{base:.2f}" if base is not None else "-"
+        print(f"{key:<28}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}{base_str:>10}  {status}")
+
+    if args.update_baseline:
+        save_baseline(args.baseline, {**{k: {"p95": v} for k, v in baseline.items()}, **results})
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if failed:
+        print(f"FAIL: {len(failed)} scenario(s) regressed: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,28 @@
 import sys
 import os
-import argparse
-from pathlib import Path
-import traceback
 import logging
 
 logger = logging.getLogger(__name__)
 
 # --- Import Core & Manager Modules (Using Absolute Paths) ---
+# Keep this list minimal: the shims import this module on every php/node call.
+# argparse is only needed when run as a script and is imported under __main__.
 try:
     from grazr.core import config
-    from grazr.managers.site_manager import load_sites
+    from grazr.managers.site_manager import find_site_for_path
     from grazr.managers.php_manager import (
         get_default_php_version,
         get_php_ini_path,
-        ensure_php_version_config_structure,
+        ensure_php_version_config_if_stale,
         get_php_version_paths
     )
-    from grazr.managers.node_manager import list_installed_node_versions
 except ImportError as e:
-    log_func = getattr(logger, 'error', print)
-    log_func(f"ERROR in cli.py: Could not import modules. Is 'grazr' installed (e.g., pip install -e .)? {e}", file=sys.stderr)
-    config = None; load_sites = None;
+    logger.error(f"ERROR in cli.py: Could not import modules. Is 'grazr' installed (e.g., pip install -e .)? {e}")
+    config = None; find_site_for_path = None;
     get_default_php_version = None;
     get_php_ini_path = None
-    ensure_php_version_config_structure = None
-    list_installed_node_versions = None
+    get_php_version_paths = None
+    ensure_php_version_config_if_stale = None
 # --- End Imports ---
 
 
@@ -37,8 +34,8 @@ def find_php_version_for_path(target_path_str):
     2. Absolute path to active php.ini (or empty if not found)
     3. Absolute path to active cli conf.d (or empty if not found)
     """
-    if not all([load_sites, get_default_php_version, config, get_php_ini_path,
-                ensure_php_version_config_structure, get_php_version_paths]):
+    if not all([find_site_for_path, get_default_php_version, config, get_php_ini_path,
+                ensure_php_version_config_if_stale, get_php_version_paths]):
          logger.error("CLI: Core components not loaded for PHP lookup.")
          print("\n\n", end="") # Three newlines for shim to detect error
          return
@@ -48,22 +45,8 @@ def find_php_version_for_path(target_path_str):
     active_cli_confd_str = ""
 
     try:
-        target_path = Path(target_path_str).resolve()
-        sites = load_sites()
-        found_site = None
-        current_check_path = target_path
-
-        while True:
-            for site in sites:
-                try:
-                    site_root_str = site.get('path', '')
-                    if not site_root_str: continue
-                    site_root = Path(site_root_str).resolve()
-                except Exception: continue
-                if current_check_path == site_root: found_site = site; break
-            if found_site: break
-            if current_check_path.parent == current_check_path: break
-            current_check_path = current_check_path.parent
+        # Deepest site containing the path (indexed; no per-site resolve())
+        found_site = find_site_for_path(target_path_str)
 
         if found_site:
             php_version_setting = found_site.get("php_version", config.DEFAULT_PHP)
@@ -76,8 +59,8 @@ def find_php_version_for_path(target_path_str):
             if not php_version_to_use: logger.error(f"CLI: No site match for '{target_path_str}', and no default Grazr PHP version found."); print("\n\n", end=""); return
 
         if php_version_to_use:
-            logger.info(f"CLI: Ensuring config structure for PHP {php_version_to_use} before getting paths...")
-            if not ensure_php_version_config_structure(php_version_to_use, force_recreate=False):
+            # Read-only unless the active config is missing or older than the bundle
+            if not ensure_php_version_config_if_stale(php_version_to_use):
                 logger.warning(f"CLI: Failed to ensure config structure for PHP {php_version_to_use}.")
                 # Continue, paths might still be partially valid or non-existent
 
@@ -109,32 +92,18 @@ def find_php_version_for_path(target_path_str):
         print("\n\n", end="")
 
 def find_node_version_for_path(target_path_str):
-    # ... (your existing implementation) ...
-    log_func_err = getattr(logger, 'error', lambda msg, file=None: print(msg, file=sys.stderr))
-    log_func_info = getattr(logger, 'info', lambda msg, file=None: print(msg, file=sys.stderr))
-
-    if not all([load_sites, list_installed_node_versions, config]):
-        log_func_err("Error: Core components not loaded for Node lookup.", file=sys.stderr)
+    """Returns the Node version configured for the deepest Node site containing the path, else "system"."""
+    if not all([find_site_for_path, config]):
+        logger.error("CLI: Core components not loaded for Node lookup.")
         return "system"
     try:
-        target_path = Path(target_path_str).resolve(); sites = load_sites(); found_site = None
         node_version_to_use = getattr(config, 'DEFAULT_NODE', "system")
-        current_check_path = target_path
-        while True:
-            for site in sites:
-                if site.get('needs_node'):
-                    try: site_root = Path(site.get('path', '')).resolve()
-                    except: continue
-                    if current_check_path == site_root: found_site = site; break
-            if found_site: break
-            if current_check_path.parent == current_check_path: break
-            current_check_path = current_check_path.parent
+        found_site = find_site_for_path(target_path_str, predicate=lambda site: site.get('needs_node'))
         if found_site: node_version_to_use = found_site.get("node_version", getattr(config, 'DEFAULT_NODE', "system"))
-        else: log_func_info(f"Debug cli: No Node site match for '{target_path_str}', using default: {node_version_to_use}", file=sys.stderr)
+        else: logger.info(f"CLI: No Node site match for '{target_path_str}', using default: {node_version_to_use}")
         return node_version_to_use if node_version_to_use else "system"
     except Exception as e:
-        log_func_err(f"Error during Node version lookup for '{target_path_str}': {e}", file=sys.stderr)
-        traceback.print_exc(file=sys.stderr)
+        logger.error(f"CLI: Error during Node version lookup for '{target_path_str}': {e}", exc_info=True)
         return "system"
 
 # --- Main CLI Execution ---
@@ -155,9 +124,13 @@ if __name__ == "__main__":
         logging.getLogger("grazr").addHandler(cli_console_handler)  # If other grazr modules log
         logging.getLogger("grazr").setLevel(logging.DEBUG)
 
+    import argparse
     parser = argparse.ArgumentParser(description="Grazr CLI.")
     parser.add_argument('--get-php-for-path', metavar='DIR_PATH', type=str, help='Print PHP version and INI path for path.')
     parser.add_argument('--get-node-for-path', metavar='DIR_PATH', type=str, help='Print Node version for path.')
+    parser.add_argument('--refresh-shim-tables', action='store_true', help='Regenerate the precompiled shim resolution tables.')
+    parser.add_argument('--slow-tasks', metavar='N', type=int, nargs='?', const=10,
+                        help='Print the N (default 10) slowest recent worker tasks with their step timings.')
 
     args = parser.parse_args()
 
@@ -169,6 +142,12 @@ if __name__ == "__main__":
         # Always print something ('system' or version string)
         print(node_version)
         sys.exit(0)  # Exit successfully even if returning 'system'
+    elif args.refresh_shim_tables:
+        from grazr.core import shim_tables
+        sys.exit(0 if shim_tables.refresh_all_shim_tables() else 1)
+    elif args.slow_tasks is not None:
+        from grazr.core import task_metrics
+        print(task_metrics.format_report(task_metrics.slowest(args.slow_tasks, from_file=True)))
     else:
         parser.print_help()
         sys.exit(0)
\ No newline at end of file
@@ -175,6 +175,15 @@ INTERNAL_NGINX_ERROR_LOG = LOG_DIR / 'nginx-error.log'
 INTERNAL_NGINX_ACCESS_LOG = LOG_DIR / 'nginx-access.log'
 INTERNAL_SITES_AVAILABLE = INTERNAL_NGINX_CONF_DIR / 'sites-available'
 INTERNAL_SITES_ENABLED = INTERNAL_NGINX_CONF_DIR / 'sites-enabled'
+INTERNAL_NGINX_STAGING_DIR = INTERNAL_NGINX_CONF_DIR / 'staging' # Site configs are validated here before going live
+# Site layout: "files" (default) writes one server block file per site. "mapped" serves
+# plain-HTTP sites from one generic server block driven by `map $host` tables in
+# NGINX_SITE_MAP_CONF_NAME (sites-available/, linked in sites-enabled/), so adding or
+# changing such a site rewrites one small file. HTTPS, Symfony and proxy sites keep their own file.
+NGINX_SITE_MODE = os.environ.get('GRAZR_NGINX_SITE_MODE', 'files')
+NGINX_SITE_MAP_CONF_NAME = '00-grazr-site-map.conf'
+# One `upstream php<version>` block per PHP version; site configs reference these by name
+NGINX_PHP_UPSTREAMS_CONF_NAME = '00-grazr-php-upstreams.conf'
 INTERNAL_NGINX_TEMP_DIR = CONFIG_DIR / 'nginx_temp'
 INTERNAL_CLIENT_BODY_TEMP = INTERNAL_NGINX_TEMP_DIR / 'client_body'
 INTERNAL_PROXY_TEMP = INTERNAL_NGINX_TEMP_DIR / 'proxy'
@@ -236,7 +245,8 @@ INTERNAL_POSTGRES_INSTANCE_LOG_TEMPLATE = str(LOG_DIR / 'postgres-{instance_id}.
 INTERNAL_POSTGRES_INSTANCE_SOCK_DIR_TEMPLATE = str(RUN_DIR / 'postgres_sock_{instance_id}')
 
 POSTGRES_DEFAULT_PORT = 5432
-POSTGRES_DEFAULT_USER_VAR = os.getlogin() if hasattr(os, 'getlogin') else "postgres"
+# POSTGRES_DEFAULT_USER_VAR is resolved lazily on first access (see __getattr__ at the end):
+# os.getlogin() needs a controlling terminal and must not run when the shims import config.
 POSTGRES_DEFAULT_DB = "postgres"
 
 # --- Redis Specific Paths
@@ -283,6 +293,31 @@ SITE_TLD = "test"
 DEFAULT_PHP = "default"
 DEFAULT_NODE="system"
 
+# --- State Storage Backend ---
+# "json" (default): sites.json / services.json rewritten in full on every change.
+# "sqlite": rows in STATE_DB_FILE (WAL mode, see core/state_db.py); the JSON files are
+# imported once on first use and renamed to *.json.migrated.
+STORAGE_BACKEND = os.environ.get('GRAZR_STORAGE_BACKEND', 'json')
+STATE_DB_FILE = CONFIG_DIR / 'grazr.db'
+
+# --- Shim Resolution Tables ---
+# Precompiled lookup files read directly by the shell shims (no Python start-up).
+# Regenerated whenever sites.json is saved; shims fall back to grazr.cli when stale.
+PHP_RESOLUTION_TABLE_FILE = CONFIG_DIR / 'php_resolution.tsv'
+NODE_RESOLUTION_TABLE_FILE = CONFIG_DIR / 'node_resolution.tsv' # site root -> node version
+NODE_VERSION_MAP_FILE = CONFIG_DIR / 'node_versions.tsv' # version/alias -> bin dir (no nvm.sh needed)
+
+# --- Shim Resolver Daemon (optional) ---
+# Resident resolver answering shim queries over a Unix socket (see core/resolver_daemon.py).
+RESOLVER_ENABLED = True # Started alongside the GUI; can also run as a user systemd unit
+RESOLVER_SOCKET_PATH = RUN_DIR / 'resolver.sock'
+
+# --- Worker Task Metrics ---
+# Timings of the most recent worker tasks (see core/task_metrics.py). The ring buffer is
+# mirrored to TASK_METRICS_FILE after every task for `grazr.cli --slow-tasks`.
+TASK_METRICS_SIZE = 200
+TASK_METRICS_FILE = LOG_DIR / 'task_metrics.json'
+
 # --- SSL Management ---
 MKCERT_BUNDLES_DIR = BUNDLES_DIR / 'mkcert'
 MKCERT_BINARY = MKCERT_BUNDLES_DIR / 'mkcert'
@@ -323,15 +358,40 @@ def ensure_dir(path: Path):
         print(f"CONFIG_ERROR: Error creating directory {path}: {e}")
         return False
 
-# --- Ensure base directories exist on config load ---
-def ensure_base_dirs():
+# --- Base directories (explicit bootstrap, NOT run on import) ---
+# Importing config must stay side-effect free: the shims import it on every php/node call.
+# Call ensure_base_dirs() from bootstrap points instead (GUI start-up, service start).
+_base_dirs_ensured = False
+
+def ensure_base_dirs(force=False):
+    """Creates all top-level Grazr directories. Cheap no-op after the first successful call."""
+    global _base_dirs_ensured
+    if _base_dirs_ensured and not force: return True
     base_dirs_to_ensure = [ CONFIG_DIR, DATA_DIR, BUNDLES_DIR, RUN_DIR, LOG_DIR, CERT_DIR, INTERNAL_NGINX_TEMP_DIR, PHP_CONFIG_DIR, PHP_BUNDLES_DIR, MYSQL_BUNDLES_DIR, INTERNAL_MYSQL_CONF_DIR, INTERNAL_MYSQL_DATA_DIR, POSTGRES_BUNDLES_DIR, # INTERNAL_POSTGRES_CONF_DIR, INTERNAL_POSTGRES_DATA_DIR, # These are now instance specific
                            REDIS_BUNDLES_DIR, INTERNAL_REDIS_CONF_DIR, INTERNAL_REDIS_DATA_DIR, MINIO_BUNDLES_DIR, INTERNAL_MINIO_DATA_DIR, INTERNAL_MINIO_CONFIG_DIR, NVM_BUNDLES_DIR, NVM_MANAGED_NODE_DIR, MKCERT_BUNDLES_DIR ]
     all_ok = True
     for d_path in base_dirs_to_ensure:
         if d_path and not ensure_dir(d_path): all_ok = False # Check if d_path is not None
     if not all_ok: print("CONFIG_WARNING: Some base directories could not be created.")
+    _base_dirs_ensured = all_ok
     return all_ok
 
-if not ensure_base_dirs():
-    print("CONFIG_CRITICAL: Failed to create one or more essential base directories on startup.")
\ No newline at end of file
+# --- Lazily computed settings ---
+def _default_login_name():
+    try:
+        return os.getlogin()
+    except OSError: # No controlling terminal (systemd unit, IDE, CI...)
+        return os.environ.get("USER") or "postgres"
+
+_LAZY_SETTINGS = {
+    "POSTGRES_DEFAULT_USER_VAR": _default_login_name,
+}
+
+def __getattr__(name):
+    """Module-level __getattr__ (PEP 562): computes _LAZY_SETTINGS on first access, then caches."""
+    factory = _LAZY_SETTINGS.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = factory()
+    globals()[name] = value
+    return value
@@ -8,6 +8,11 @@ import traceback
 import tempfile
 import shlex
 import logging
+import threading
+import functools
+
+from . import process_watch
+from . import readiness
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +36,7 @@ except ImportError:
     config.INTERNAL_POSTGRES_PID_FILE = Path("/tmp/err-pg.pid");
     def ensure_dir_dummy(p): os.makedirs(p, exist_ok=True); return True;
     config.ensure_dir = ensure_dir_dummy
+    config.ensure_base_dirs = lambda force=False: True
 
 # --- Process Tracking ---
 # Stores info about managed processes
@@ -44,8 +50,28 @@ except ImportError:
 # }
 running_processes = {}
 
+# Worker tasks run concurrently: start/stop of one process id are serialised
+_process_locks = {}
+_process_locks_guard = threading.Lock()
+
+SIGKILL_WAIT_SECONDS = 1.5  # How long stop_process() waits for exit after SIGKILL
+
 # --- Internal Helper Functions ---
 
+def _process_lock(process_id: str):
+    with _process_locks_guard:
+        return _process_locks.setdefault(process_id, threading.RLock())
+
+
+def _serialised_per_process(func):
+    """Runs func(process_id, ...) while holding the lock of that process id."""
+    @functools.wraps(func)
+    def wrapper(process_id, *args, **kwargs):
+        with _process_lock(process_id):
+            return func(process_id, *args, **kwargs)
+    return wrapper
+
+
 def read_pid_file(pid_file_path_str: str):
     """
     Internal helper: Reads PID from a file.
@@ -164,7 +190,32 @@ def _get_pid_file_path_for_id(process_id: str):
         logger.warning(f"PROCESS_MANAGER: _get_pid_file_path_for_id could not resolve PID file for '{process_id}'")
     return pid_path
 
+def _wait_for_pid_exit(pid: int, timeout: float, pid_file_path_str: str = None, popen_obj=None):
+    """
+    Blocks until `pid` exits (or removes pid_file_path_str), at most `timeout` seconds.
+    Our own children are checked through Popen.poll(), which also reaps them; otherwise
+    an exited child would linger as a zombie that kill(0) still reports as running.
+    """
+    if popen_obj is not None and popen_obj.pid == pid:
+        is_alive = lambda: popen_obj.poll() is None
+    else:
+        is_alive = lambda: check_pid_running(pid)
+    return process_watch.wait_for_exit(pid, timeout, is_alive=is_alive, pid_file=pid_file_path_str)
+
+
+def _log_early_exit(process_id: str, pid: int, exit_code, log_path_str: str):
+    """Logs a process that exited during start-up, with its output log."""
+    logger.warning(f"PROCESS_MANAGER: Process '{process_id}' (Popen PID: {pid}) exited during start-up with code: {exit_code}.")
+    if not log_path_str: return
+    try:
+        log_content = Path(log_path_str).read_text(encoding='utf-8')
+        logger.warning(f"-- Log for '{process_id}' ({log_path_str}): --\n{log_content}\n---")
+    except Exception as e_log:
+        logger.warning(f"Could not read log {log_path_str}: {e_log}")
+
+
 # --- Public Process Management API ---
+@_serialised_per_process
 def start_process(process_id: str, command: list, pid_file_path: str = None,
                   working_dir: str = None, env: dict = None, log_file_path: str = None):
     """
@@ -173,6 +224,7 @@ def start_process(process_id: str, command: list, pid_file_path: str = None,
     - If pid_file_path is None, process_manager tracks the Popen object directly.
     """
     logger.info(f"PROCESS_MANAGER: Received start request for '{process_id}'")
+    config.ensure_base_dirs()  # Bootstrap point: config no longer creates dirs on import
 
     # Check if already running (more robust check)
     current_status = get_process_status(process_id)  # This now uses the improved logic
@@ -250,27 +302,21 @@ def start_process(process_id: str, command: list, pid_file_path: str = None,
         logger.debug(
             f"PROCESS_MANAGER: '{process_id}' launched (Popen PID: {process.pid}). Tracking info: {running_processes[process_id]}")
 
-        time.sleep(0.2)  # Brief moment for the process to potentially exit if it fails very early
+        # No settle sleep here: callers confirm start-up with wait_until_running(), which
+        # wakes as soon as the process exits or its PID file appears.
         initial_poll = process.poll()
         if initial_poll is not None:
-            logger.warning(
-                f"PROCESS_MANAGER: Process '{process_id}' (Popen PID: {process.pid}) exited immediately with code: {initial_poll}.")
             if temp_log_used and log_handle: log_handle.close(); log_handle = None  # Close temp log
-            try:
-                log_content = Path(actual_log_path_str).read_text(encoding='utf-8')
-                logger.warning(f"-- Log for '{process_id}' ({actual_log_path_str}): --\n{log_content}\n---")
-            except Exception as e_log:
-                logger.warning(f"Could not read log {actual_log_path_str}: {e_log}")
-
-            if process_id in running_processes: del running_processes[process_id]  # Clear tracking
+            _log_early_exit(process_id, process.pid, initial_poll, actual_log_path_str)
+            running_processes.pop(process_id, None)  # Clear tracking
             return False  # Indicate launch failure
 
         logger.info(f"PROCESS_MANAGER: Launch command issued for '{process_id}' (Popen PID: {process.pid}).")
-        return True  # Command launched, subsequent status check will confirm if it's truly running via PID file or Popen status.
+        return True  # Command launched; wait_until_running() confirms it via PID file or Popen status.
 
     except Exception as e:
         logger.error(f"PROCESS_MANAGER: Failed to launch process '{process_id}': {e}", exc_info=True)
-        if process_id in running_processes: del running_processes[process_id]
+        running_processes.pop(process_id, None)
         return False
     finally:
         if log_handle and not temp_log_used:  # Only close if it's the persistent log_file_path
@@ -285,6 +331,7 @@ def start_process(process_id: str, command: list, pid_file_path: str = None,
             except Exception:
                 return None
 
+@_serialised_per_process
 def stop_process(process_id: str, signal_to_use: signal.Signals = signal.SIGTERM, timeout: int = 5):
     """
     Stops a managed process.
@@ -300,8 +347,8 @@ def stop_process(process_id: str, signal_to_use: signal.Signals = signal.SIGTERM
     pid_file_path_str = None # Absolute string path to the PID file this process uses
     popen_obj = None
 
-    if process_id in running_processes:
-        proc_info = running_processes[process_id]
+    proc_info = running_processes.get(process_id)  # May be cleared by another thread
+    if proc_info:
         pid_file_path_str = proc_info.get("pid_file") # This is the explicit path used at start
         popen_obj = proc_info.get("process") # The Popen object itself
 
@@ -325,7 +372,7 @@ def stop_process(process_id: str, signal_to_use: signal.Signals = signal.SIGTERM
         if not pid_to_signal: # If no valid PID found from tracking info
             logger.info(f"PROCESS_MANAGER Stop: '{process_id}' was tracked but no longer has a running PID. Cleaning up.")
             if pid_file_path_str and Path(pid_file_path_str).exists(): Path(pid_file_path_str).unlink(missing_ok=True)
-            del running_processes[process_id]
+            running_processes.pop(process_id, None)
             return True # Effectively stopped
 
     else: # Not actively tracked in running_processes, try to find by configured PID file
@@ -346,40 +393,27 @@ def stop_process(process_id: str, signal_to_use: signal.Signals = signal.SIGTERM
     if not pid_to_signal or not check_pid_running(pid_to_signal): # Final check
         logger.info(f"PROCESS_MANAGER Stop: PID {pid_to_signal} for '{process_id}' is not valid or not running before attempting kill. Assuming stopped.")
         if pid_file_path_str and Path(pid_file_path_str).exists(): Path(pid_file_path_str).unlink(missing_ok=True)
-        if process_id in running_processes: del running_processes[process_id]
+        running_processes.pop(process_id, None)
         return True
 
     logger.info(f"PROCESS_MANAGER Stop: Attempting to stop '{process_id}' (PID: {pid_to_signal}) with {signal_to_use.name}...")
     stopped_cleanly = False
     try:
         os.kill(pid_to_signal, signal_to_use)
-        start_time = time.monotonic()
-        while (time.monotonic() - start_time) < timeout:
-            if not check_pid_running(pid_to_signal):
-                logger.info(f"PROCESS_MANAGER Stop: Process '{process_id}' (PID: {pid_to_signal}) stopped gracefully after {signal_to_use.name}.")
-                stopped_cleanly = True; break
-            # Crucial check for processes that manage their own PID files (like PHP-FPM)
-            if pid_file_path_str and not Path(pid_file_path_str).exists():
-                logger.info(f"PROCESS_MANAGER Stop: PID file {pid_file_path_str} for '{process_id}' removed by process. Assuming stopped.")
-                stopped_cleanly = True; break
-            time.sleep(0.2)
+        # Wakes on process exit (pidfd) or removal of its PID file (e.g. PHP-FPM), not on a timer
+        if _wait_for_pid_exit(pid_to_signal, timeout, pid_file_path_str, popen_obj):
+            logger.info(f"PROCESS_MANAGER Stop: Process '{process_id}' (PID: {pid_to_signal}) stopped gracefully after {signal_to_use.name}.")
+            stopped_cleanly = True
 
         if not stopped_cleanly:
             logger.warning(f"PROCESS_MANAGER Stop: Process '{process_id}' (PID: {pid_to_signal}) did not stop with {signal_to_use.name} in {timeout}s. Sending SIGKILL.")
             try:
                 os.kill(pid_to_signal, signal.SIGKILL)
-                # Wait a bit and retry check for termination, as SIGKILL should be effective
-                for i in range(5): # Retry up to 5 times (e.g., 5 * 0.3s = 1.5 seconds total)
-                    time.sleep(0.3)
-                    if not check_pid_running(pid_to_signal):
-                        logger.info(f"PROCESS_MANAGER Stop: Process '{process_id}' (PID: {pid_to_signal}) confirmed stopped after SIGKILL (attempt {i+1}).")
-                        stopped_cleanly = True; break
-                    if pid_file_path_str and not Path(pid_file_path_str).exists(): # Check PID file again
-                        logger.info(f"PROCESS_MANAGER Stop: PID file {pid_file_path_str} for '{process_id}' removed after SIGKILL. Assuming stopped.")
-                        stopped_cleanly = True; break
-
-                if not stopped_cleanly:
-                    logger.error(f"PROCESS_MANAGER Stop: Process '{process_id}' (PID: {pid_to_signal}) did not appear to stop even after SIGKILL and retries.")
+                if _wait_for_pid_exit(pid_to_signal, SIGKILL_WAIT_SECONDS, pid_file_path_str, popen_obj):
+                    logger.info(f"PROCESS_MANAGER Stop: Process '{process_id}' (PID: {pid_to_signal}) confirmed stopped after SIGKILL.")
+                    stopped_cleanly = True
+                else:
+                    logger.error(f"PROCESS_MANAGER Stop: Process '{process_id}' (PID: {pid_to_signal}) did not appear to stop even after SIGKILL ({SIGKILL_WAIT_SECONDS}s).")
 
             except OSError as kill_err:
                  if kill_err.errno == errno.ESRCH: # No such process
@@ -402,7 +436,7 @@ def stop_process(process_id: str, signal_to_use: signal.Signals = signal.SIGTERM
             logger.debug(f"PROCESS_MANAGER Stop: Cleaning up PID file {pid_file_path_str} for stopped process '{process_id}'.")
             Path(pid_file_path_str).unlink(missing_ok=True)
         if process_id in running_processes: # Remove from internal tracking
-            del running_processes[process_id]
+            running_processes.pop(process_id, None)
         return True
     else:
         # If not stopped cleanly, we don't know its state for sure.
@@ -419,8 +453,8 @@ def get_process_status(process_id: str):
     Cleans up stale tracking info.
     """
     logger.debug(f"PROCESS_MANAGER: get_process_status for '{process_id}'")
-    if process_id in running_processes:
-        proc_info = running_processes[process_id]
+    proc_info = running_processes.get(process_id)  # May be cleared by another thread
+    if proc_info:
         pid_file_str = proc_info.get("pid_file")
         popen_obj = proc_info.get("process")
 
@@ -430,12 +464,12 @@ def get_process_status(process_id: str):
                 # Update tracked PID if different from initial Popen PID (e.g. FPM master re-forked)
                 if proc_info.get("pid") != pid_in_file:
                     logger.info(f"PROCESS_MANAGER: Updating tracked PID for '{process_id}' from {proc_info.get('pid')} to {pid_in_file} (from PID file).")
-                    running_processes[process_id]['pid'] = pid_in_file
+                    proc_info['pid'] = pid_in_file
                 return "running"
             else: # PID file gone, or PID not running
                 logger.info(f"PROCESS_MANAGER: Process '{process_id}' (PID file: {pid_file_str}) appears stopped or PID file stale. Clearing tracking.")
                 if Path(pid_file_str).exists(): Path(pid_file_str).unlink(missing_ok=True) # Clean stale PID file
-                del running_processes[process_id]
+                running_processes.pop(process_id, None)
                 return "stopped"
         elif popen_obj: # Tracked by Popen object
             if popen_obj.poll() is None: # Process is still running according to Popen
@@ -443,15 +477,15 @@ def get_process_status(process_id: str):
                     return "running"
                 else: # Popen thinks it's running, but os.kill says no -> inconsistent state
                     logger.warning(f"PROCESS_MANAGER: Popen for '{process_id}' (PID {popen_obj.pid}) has no exit code, but PID not found by os.kill. Clearing tracking.")
-                    del running_processes[process_id]
+                    running_processes.pop(process_id, None)
                     return "stopped" # Treat as stopped
             else: # Process has terminated
                 logger.info(f"PROCESS_MANAGER: Popen for '{process_id}' (PID {popen_obj.pid}) exited with code: {popen_obj.poll()}. Clearing tracking.")
-                del running_processes[process_id]
+                running_processes.pop(process_id, None)
                 return "stopped"
         else: # Tracked but no pid_file and no popen_obj, or popen_obj already reaped
             logger.warning(f"PROCESS_MANAGER: Invalid or reaped Popen tracking for '{process_id}'. Removing.")
-            del running_processes[process_id]
+            running_processes.pop(process_id, None)
             return "stopped"
     else: # Not actively tracked in running_processes, check PID file based on config
         pid_file_path = _get_pid_file_path_for_id(process_id)
@@ -473,9 +507,85 @@ def get_process_status(process_id: str):
             logger.debug(f"PROCESS_MANAGER: Process '{process_id}' not tracked and no PID file configured for it (or config error).")
             return "stopped"
 
+def wait_until_running(process_id: str, timeout: float = 10):
+    """
+    Confirms that a process launched by start_process() came up, without fixed sleeps.
+
+    Returns as soon as the outcome is known:
+    - PID-file processes: "running" the moment the PID file holds a live PID.
+    - Any process: "stopped" the moment it exits (its log is dumped).
+    - Processes without a PID file have no start-up signal and are "running" immediately;
+      use wait_until_ready() to wait for them to accept connections.
+
+    Args:
+        process_id (str): Id passed to start_process().
+        timeout (float): Maximum seconds to wait for the PID file.
+
+    Returns:
+        str: "running" or "stopped" (as get_process_status()).
+    """
+    proc_info = running_processes.get(process_id)
+    popen_obj = proc_info.get("process") if proc_info else None
+    if not popen_obj: return get_process_status(process_id)
+    pid_file_str = proc_info.get("pid_file")
+
+    def _outcome():
+        if popen_obj.poll() is not None: return "stopped"
+        if pid_file_str:
+            pid = read_pid_file(pid_file_str)
+            return "running" if pid and check_pid_running(pid) else None
+        return "running"
+
+    outcome = process_watch.wait_until(_outcome, timeout, pid=popen_obj.pid,
+                                       watch_dir=Path(pid_file_str).parent if pid_file_str else None)
+
+    if outcome == "stopped":
+        _log_early_exit(process_id, popen_obj.pid, popen_obj.poll(), proc_info.get("log_path"))
+        running_processes.pop(process_id, None)
+        return "stopped"
+    if outcome != "running":
+        logger.warning(f"PROCESS_MANAGER: '{process_id}' is up but wrote no live PID to {pid_file_str} within {timeout}s.")
+    return get_process_status(process_id)
+
+def wait_until_ready(process_id: str, service_type: str, timeout: float = 10, **target):
+    """
+    wait_until_running() followed by the readiness probe for service_type
+    (see core/readiness.py), both within one `timeout` budget.
+
+    Args:
+        process_id (str): Id passed to start_process().
+        service_type (str): Readiness probe key, e.g. "mysql", "redis", "php-fpm".
+        timeout (float): Overall deadline in seconds.
+        **target: Probe arguments (port, socket_path...).
+
+    Returns:
+        str: "running" once the service accepts connections, "starting" if it is alive
+             but not ready by the deadline, "stopped" if it exited.
+    """
+    deadline = time.monotonic() + timeout
+    status = wait_until_running(process_id, timeout=timeout)
+    if status != "running": return status
+
+    log_path = (running_processes.get(process_id) or {}).get("log_path")  # Tracking is cleared if it exits
+    is_alive = lambda: get_process_status(process_id) == "running"
+    if readiness.wait_until_ready(service_type, max(0.0, deadline - time.monotonic()), is_alive=is_alive, **target):
+        return "running"
+    if is_alive():
+        logger.warning(f"PROCESS_MANAGER: '{process_id}' is running but not accepting connections after {timeout}s.")
+        return "starting"
+    logger.warning(f"PROCESS_MANAGER: '{process_id}' exited before accepting connections. Log: {log_path}")
+    return "stopped"
+
+
+def get_ready_status(process_id: str, service_type: str, **target):
+    """get_process_status(), reporting "starting" while a live process fails its readiness probe."""
+    return readiness.refine_status(service_type, get_process_status(process_id), **target)
+
+
 def get_process_pid(process_id: str):
-    if process_id in running_processes:
-        proc_info = running_processes[process_id]; pid_file = proc_info.get("pid_file"); popen_obj = proc_info.get("process")
+    proc_info = running_processes.get(process_id)
+    if proc_info:
+        pid_file = proc_info.get("pid_file"); popen_obj = proc_info.get("process")
         if pid_file: pid = read_pid_file(pid_file); return pid if pid and check_pid_running(pid) else None
         elif popen_obj and popen_obj.poll() is None: return popen_obj.pid if check_pid_running(popen_obj.pid) else None
         else: return None
@@ -0,0 +1,155 @@
+"""
+Event-driven waiting for process_manager: wake exactly when a process exits or a
+file in a watched directory (e.g. a PID file) changes, instead of sleep-polling.
+
+Process exit is observed through a pidfd (os.pidfd_open, Linux >= 5.3), which becomes
+readable once the process has terminated, whether or not it is our child. Directory
+changes are observed through inotify (via ctypes; Python has no stdlib binding).
+Both descriptors are waited on with a single select.poll(). Where either facility is
+unavailable, the wait degrades to re-checking every FALLBACK_TICK seconds.
+"""
+import os
+import time
+import errno
+import select
+import ctypes
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_TICK = 0.05  # Seconds between re-checks when a wake-up source is unavailable
+
+# inotify(7) constants
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_DIR_EVENTS = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        try:
+            _libc = ctypes.CDLL(None, use_errno=True)
+            _libc.inotify_init1.argtypes = [ctypes.c_int]
+            _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        except (OSError, AttributeError) as e:
+            logger.debug(f"PROCESS_WATCH: inotify unavailable ({e}); using {FALLBACK_TICK}s re-checks.")
+            _libc = False
+    return _libc
+
+
+def open_pidfd(pid):
+    """Returns a pidfd for pid, or None if the process is gone or pidfds are unsupported."""
+    if not pid or not hasattr(os, 'pidfd_open'): return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError as e:
+        if e.errno not in (errno.ESRCH, errno.ENOSYS, errno.EPERM):
+            logger.debug(f"PROCESS_WATCH: pidfd_open({pid}) failed: {e}")
+        return None
+
+
+def open_dir_watch(directory):
+    """Returns a non-blocking inotify fd watching directory for entry changes, or None."""
+    libc = _get_libc()
+    if not libc or not directory: return None
+    fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if fd < 0: return None
+    if libc.inotify_add_watch(fd, os.fsencode(str(directory)), _DIR_EVENTS) < 0:
+        logger.debug(f"PROCESS_WATCH: Cannot watch {directory}: {os.strerror(ctypes.get_errno())}")
+        os.close(fd)
+        return None
+    return fd
+
+
+def _drain(fd):
+    """Discards pending inotify events; callers re-check their condition instead of parsing them."""
+    try:
+        while os.read(fd, 4096): pass
+    except BlockingIOError:
+        pass
+
+
+def wait_until(check, timeout, pid=None, watch_dir=None, exit_result=None):
+    """
+    Waits until check() returns a truthy value, re-evaluating it whenever process `pid`
+    exits or an entry in `watch_dir` changes.
+
+    Args:
+        check (callable): Returns a truthy value once the awaited state is reached.
+        timeout (float): Maximum seconds to wait.
+        pid (int, optional): Process whose exit should wake the wait. After it has
+            exited, check() is evaluated one last time and its result returned.
+        watch_dir (Path, optional): Directory whose entry changes should wake the wait.
+        exit_result (optional): Returned instead of the final check() when `pid` exits.
+
+    Returns:
+        The first truthy check() result, else the final check() result (on timeout or exit).
+    """
+    result = check()
+    if result: return result
+
+    pidfd = open_pidfd(pid)
+    if pid and pidfd is None and not _pid_exists(pid):  # Exited before we could watch it
+        return exit_result if exit_result is not None else check()
+    watch_fd = open_dir_watch(watch_dir) if watch_dir and Path(watch_dir).is_dir() else None
+    # Tick only when a requested wake-up source could not be set up
+    needs_tick = (pid and pidfd is None) or (watch_dir and watch_fd is None) or (not pid and not watch_dir)
+
+    poller = select.poll()
+    for fd in (pidfd, watch_fd):
+        if fd is not None: poller.register(fd, select.POLLIN)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            result = check()  # Re-check after registering, so no event between the two is lost
+            if result: return result
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: return result
+            wait_s = min(remaining, FALLBACK_TICK) if needs_tick else remaining
+            for fd, _event in poller.poll(wait_s * 1000):
+                if fd == pidfd:
+                    return exit_result if exit_result is not None else check()
+                _drain(fd)
+    finally:
+        for fd in (pidfd, watch_fd):
+            if fd is not None: os.close(fd)
+
+
+def _pid_exists(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def wait_for_exit(pid, timeout, is_alive=None, pid_file=None):
+    """
+    Waits for process `pid` to terminate. Returns True once it has (or once pid_file,
+    if given, has been removed by the process), False on timeout.
+
+    is_alive (callable, optional) overrides the liveness check, e.g. Popen.poll() for
+    our own children, which also reaps them so they don't linger as zombies.
+    """
+    is_alive = is_alive or (lambda: _pid_exists(pid))
+    pid_file = Path(pid_file) if pid_file else None
+
+    def _exited():
+        return not is_alive() or bool(pid_file and not pid_file.exists())
+
+    # A fired pidfd is authoritative: a non-child can still show up in kill(0) as a zombie
+    exited = wait_until(_exited, timeout, pid=pid, watch_dir=pid_file.parent if pid_file else None,
+                        exit_result=True)
+    if exited: is_alive()  # Reaps our own child now that it has exited
+    return bool(exited)
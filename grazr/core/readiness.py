@@ -0,0 +1,181 @@
+"""
+Readiness probes: "does the service accept connections yet?" instead of "is its PID alive?".
+
+Probes are registered per service type, i.e. the keys of config.AVAILABLE_BUNDLED_SERVICES
+plus "php-fpm". Types without their own probe fall back to their "service_group", so all
+PostgreSQL versions share the "postgres" probe. A probe receives keyword targets
+(port, socket_path, sock_dir, ...) and returns True once the service is usable.
+
+wait_until_ready() retries a probe with exponential backoff until a deadline, so a start
+returns as soon as the service is usable instead of after a guessed sleep.
+"""
+import time
+import socket
+import logging
+import http.client
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# --- Import Core Config ---
+try:
+    from . import config
+except ImportError as e:
+    logger.error(f"READINESS: Could not import core.config: {e}", exc_info=True)
+
+    class ConfigDummy:
+        AVAILABLE_BUNDLED_SERVICES = {}
+
+    config = ConfigDummy()
+# --- End Imports ---
+
+PROBE_CONNECT_TIMEOUT = 0.5  # Seconds per connection attempt
+INITIAL_BACKOFF = 0.01       # First retry delay; doubles on every failed probe
+MAX_BACKOFF = 0.25
+LOCALHOST = "127.0.0.1"
+
+_PROBES = {}
+
+
+def register_probe(service_type):
+    """Decorator registering func(**target) -> bool as the readiness probe for service_type."""
+    def decorator(func):
+        _PROBES[service_type] = func
+        return func
+    return decorator
+
+
+def get_probe(service_type):
+    """Returns the probe for service_type (or its service_group), or None."""
+    probe = _PROBES.get(service_type)
+    if probe is None:
+        group = config.AVAILABLE_BUNDLED_SERVICES.get(service_type, {}).get('service_group')
+        probe = _PROBES.get(group) if group else None
+    return probe
+
+
+# --- Connection checks ---
+def tcp_connect(port, host=LOCALHOST):
+    try:
+        with socket.create_connection((host, int(port)), timeout=PROBE_CONNECT_TIMEOUT):
+            return True
+    except (OSError, ValueError, TypeError):
+        return False
+
+
+def unix_connect(socket_path):
+    if not socket_path or not Path(socket_path).exists(): return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(PROBE_CONNECT_TIMEOUT)
+            sock.connect(str(socket_path))
+            return True
+    except OSError:
+        return False
+
+
+def http_ok(port, path, host=LOCALHOST):
+    conn = http.client.HTTPConnection(host, int(port), timeout=PROBE_CONNECT_TIMEOUT)
+    try:
+        conn.request("GET", path)
+        return conn.getresponse().status == 200
+    except (OSError, http.client.HTTPException):
+        return False
+    finally:
+        conn.close()
+
+
+# --- Probes per service type ---
+@register_probe("nginx")
+def _probe_nginx(port=80, **_target):
+    return tcp_connect(port)
+
+
+@register_probe("mysql")
+def _probe_mysql(socket_path=None, port=None, **_target):
+    # mysqld creates its socket and TCP listener together, once it accepts connections
+    if socket_path: return unix_connect(socket_path)
+    return tcp_connect(port) if port else False
+
+
+@register_probe("postgres")
+def _probe_postgres(sock_dir=None, port=None, **_target):
+    if sock_dir:
+        sockets = sorted(Path(sock_dir).glob(".s.PGSQL.*")) if Path(sock_dir).is_dir() else []
+        return any(unix_connect(path) for path in sockets if not path.name.endswith(".lock"))
+    return tcp_connect(port) if port else False
+
+
+@register_probe("redis")
+def _probe_redis(port=6379, **_target):
+    # A connect alone succeeds while Redis is still loading its dataset (-LOADING)
+    try:
+        with socket.create_connection((LOCALHOST, int(port)), timeout=PROBE_CONNECT_TIMEOUT) as sock:
+            sock.sendall(b"PING\r\n")
+            return sock.recv(64).startswith(b"+PONG")
+    except (OSError, ValueError, TypeError):
+        return False
+
+
+@register_probe("php-fpm")
+def _probe_php_fpm(socket_path=None, **_target):
+    return unix_connect(socket_path)
+
+
+@register_probe("minio")
+def _probe_minio(port=9000, **_target):
+    return http_ok(port, "/minio/health/live")
+
+
+# --- Public API ---
+def is_ready(service_type, **target):
+    """
+    Runs the readiness probe for service_type once.
+    Service types without a probe are considered ready (PID liveness is all we know).
+    """
+    probe = get_probe(service_type)
+    if probe is None: return True
+    try:
+        return bool(probe(**target))
+    except Exception as e:
+        logger.warning(f"READINESS: Probe for '{service_type}' failed with {target}: {e}")
+        return False
+
+
+def wait_until_ready(service_type, timeout, is_alive=None, **target):
+    """
+    Probes service_type with exponential backoff until it is ready or `timeout` expires.
+
+    Args:
+        service_type (str): Key of the probe registry.
+        timeout (float): Deadline in seconds.
+        is_alive (callable, optional): Stops waiting early once it returns False
+            (the process died, so it will never become ready).
+        **target: Passed to the probe (port, socket_path, sock_dir...).
+
+    Returns:
+        bool: True as soon as the probe succeeds, False on deadline or process exit.
+    """
+    deadline = time.monotonic() + timeout
+    backoff = INITIAL_BACKOFF
+    attempts = 0
+    while True:
+        attempts += 1
+        if is_ready(service_type, **target):
+            logger.debug(f"READINESS: '{service_type}' ready after {attempts} probe(s).")
+            return True
+        if is_alive is not None and not is_alive():
+            logger.debug(f"READINESS: '{service_type}' exited before becoming ready.")
+            return False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            logger.warning(f"READINESS: '{service_type}' not ready after {timeout}s ({attempts} probes, target {target}).")
+            return False
+        time.sleep(min(backoff, remaining))
+        backoff = min(backoff * 2, MAX_BACKOFF)
+
+
+def refine_status(service_type, status, **target):
+    """Turns a PID-level "running" into "starting" while the service does not accept connections yet."""
+    if status != "running": return status
+    return "running" if is_ready(service_type, **target) else "starting"
@@ -0,0 +1,283 @@
+"""
+Optional resident resolver for the php/node shims.
+
+Keeps the site list, the default PHP version and the installed Node versions in
+memory and answers one-line queries over a Unix socket (config.RESOLVER_SOCKET_PATH):
+
+    request:  "php\t<dir>\n"   reply: "ok\t<version>\t<cli php.ini>\t<cli conf.d>\n" or "miss\n"
+    request:  "node\t<dir>\n"  reply: "ok\t<version>\t<bin dir or empty>\n"
+    request:  "ping\n"         reply: "ok\tpong\n"
+
+Runs inside the GUI (start_resolver_in_background) or standalone as a user systemd
+unit (python -m grazr.core.resolver_daemon). Shims treat it as best effort and fall
+back to grazr.cli on any error or timeout.
+"""
+import os
+import sys
+import asyncio
+import socket
+import threading
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# --- Import Core Config ---
+try:
+    from . import config
+except ImportError as e:
+    logger.critical(f"RESOLVER: Failed to import core.config: {e}", exc_info=True)
+    sys.exit(1)
+# --- End Imports ---
+
+READ_TIMEOUT = 1.0  # Seconds a client gets to send its request line
+MAX_REQUEST_BYTES = 8192
+
+
+class _ResolverState:
+    """In-memory lookup data, rebuilt whenever one of the watched paths changes."""
+
+    def __init__(self):
+        self._stamp = None
+        self.php_rows = []   # (site_root, version, cli_ini, cli_confd), longest root first, '*' last
+        self.node_rows = []  # (site_root, node_version), longest root first
+        self.node_version_map = {}  # version/alias -> bin dir, see shim_tables.build_node_version_map
+        self.stale_php_versions = set()  # Versions whose active config the server still has to check
+
+    def _watched_paths(self):
+        paths = [config.SITES_FILE, config.SERVICES_CONFIG_FILE, config.PHP_BUNDLES_DIR,
+                 config.NVM_MANAGED_NODE_DIR / 'versions' / 'node']
+        if getattr(config, 'STORAGE_BACKEND', 'json') == 'sqlite':
+            # Every commit appends to the WAL, so its stat changes even when grazr.db doesn't
+            paths += [config.STATE_DB_FILE, config.STATE_DB_FILE.with_name(config.STATE_DB_FILE.name + '-wal')]
+        return paths
+
+    def _current_stamp(self):
+        # inotify is not in the stdlib; a few stat() calls per query are microseconds
+        # and catch both in-place edits (mtime) and atomic replaces (inode).
+        stamp = []
+        for path in self._watched_paths():
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def changed_stamp(self):
+        """The current stamp if it differs from the loaded one, else None."""
+        stamp = self._current_stamp()
+        return None if stamp == self._stamp else stamp
+
+    def refresh_if_changed(self):
+        stamp = self.changed_stamp()
+        if stamp is None: return
+        self.apply(self.load(), stamp)
+
+    @staticmethod
+    def load():
+        """Reads the sites and Node versions and builds the tables; touches no state, so it can run off the loop."""
+        from ..managers.site_manager import load_sites
+        from .shim_tables import build_php_resolution_rows, build_node_resolution_rows, build_node_version_map
+
+        sites = load_sites()
+        return build_php_resolution_rows(sites), build_node_resolution_rows(sites), build_node_version_map()
+
+    def apply(self, tables, stamp):
+        self.php_rows, self.node_rows, self.node_version_map = tables
+        self.stale_php_versions = {row[1] for row in self.php_rows}  # Materialised off the loop, see ResolverServer
+        self._stamp = stamp
+        logger.info(f"RESOLVER: Loaded {len(self.php_rows)} PHP rows, {len(self.node_rows)} Node rows.")
+
+    @staticmethod
+    def _matches(target, site_root):
+        return target == site_root or target.startswith(site_root.rstrip('/') + '/')
+
+    def resolve_php(self, target):
+        for row in self.php_rows:
+            if row[0] == '*' or self._matches(target, row[0]): return row[1:]
+        return None
+
+    def resolve_node(self, target):
+        """Returns (node_version, bin_dir); bin_dir is '' for "system" or unmapped versions."""
+        node_version = getattr(config, 'DEFAULT_NODE', "system")
+        for site_root, site_node_version in self.node_rows:
+            if self._matches(target, site_root):
+                node_version = site_node_version
+                break
+        return node_version, self.node_version_map.get(node_version, '')
+
+
+class ResolverServer:
+    def __init__(self, socket_path=None):
+        self.socket_path = Path(socket_path or config.RESOLVER_SOCKET_PATH)
+        self.state = _ResolverState()
+        self._server = None
+        self._php_config_ready = {}  # version -> future of its ensure_php_version_config_if_stale() run
+        self._reloading = None  # Task of the in-flight table reload, shared by concurrent queries
+
+    @staticmethod
+    def _ensure_php_config(version):
+        from ..managers.php_manager import ensure_php_version_config_if_stale
+        try:
+            return ensure_php_version_config_if_stale(version)
+        except Exception as e:
+            logger.error(f"RESOLVER: Could not prepare the active config of PHP {version}: {e}", exc_info=True)
+            return False
+
+    async def _reload(self, stamp):
+        try:
+            tables = await asyncio.get_running_loop().run_in_executor(None, self.state.load)
+            self.state.apply(tables, stamp)
+        finally:
+            self._reloading = None
+
+    async def _refresh(self):
+        """
+        Reloads the lookup data if needed. Loading the sites (JSON or SQLite) and
+        materialising a PHP version's active config (file lock, writes) both block, so
+        they run on the default executor instead of the loop: queries wait for the
+        reload, and only PHP queries for a version wait for its config.
+        """
+        stamp = self.state.changed_stamp()
+        if stamp is not None:
+            if self._reloading is None:
+                self._reloading = asyncio.ensure_future(self._reload(stamp))
+            await self._reloading
+        if not self.state.stale_php_versions: return
+        loop = asyncio.get_running_loop()
+        for version in self.state.stale_php_versions:
+            self._php_config_ready[version] = loop.run_in_executor(None, self._ensure_php_config, version)
+        self.state.stale_php_versions = set()
+
+    async def _answer(self, line):
+        kind, _, arg = line.partition('\t')
+        if kind == 'ping': return "ok\tpong"
+        await self._refresh()
+        try:
+            target = str(Path(arg).resolve()) if arg else ''
+        except Exception:
+            return "miss"
+        if kind == 'php':
+            row = self.state.resolve_php(target) if target else None
+            if not row: return "miss"
+            ready = self._php_config_ready.get(row[0])
+            if ready is not None and not await ready:
+                # Let the shim fall back to grazr.cli and retry the materialisation on the next query
+                if self._php_config_ready.get(row[0]) is ready:
+                    del self._php_config_ready[row[0]]
+                    self.state.stale_php_versions.add(row[0])
+                return "miss"
+            return "ok\t" + "\t".join(row) if Path(row[1]).is_file() else "miss"
+        if kind == 'node':
+            return "ok\t" + "\t".join(self.state.resolve_node(target)) if target else "miss"
+        return "miss"
+
+    async def _handle_client(self, reader, writer):
+        try:
+            raw = await asyncio.wait_for(reader.readline(), timeout=READ_TIMEOUT)
+            line = raw[:MAX_REQUEST_BYTES].decode('utf-8', errors='replace').rstrip('\n')
+            try:
+                reply = await self._answer(line)
+            except Exception as e:
+                logger.error(f"RESOLVER: Error answering {line!r}: {e}", exc_info=True)
+                reply = "miss"
+            writer.write((reply + "\n").encode('utf-8'))
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _socket_in_use(self):
+        """True if another resolver (e.g. the systemd unit) already answers on the socket."""
+        if not self.socket_path.exists(): return False
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        probe.settimeout(0.2)
+        try:
+            probe.connect(str(self.socket_path))
+            return True
+        except OSError:
+            return False
+        finally:
+            probe.close()
+
+    async def start(self):
+        """Binds the socket. Returns False if another resolver is already serving it."""
+        if not config.ensure_dir(self.socket_path.parent): return False
+        if self._socket_in_use():
+            logger.info(f"RESOLVER: Another resolver is already listening on {self.socket_path}.")
+            return False
+        self.socket_path.unlink(missing_ok=True)  # Stale socket from a crashed run
+        await self._refresh()
+        old_umask = os.umask(0o077)  # Socket is private to the user
+        try:
+            self._server = await asyncio.start_unix_server(self._handle_client, path=str(self.socket_path))
+        finally:
+            os.umask(old_umask)
+        logger.info(f"RESOLVER: Listening on {self.socket_path}")
+        return True
+
+    async def serve_forever(self):
+        if self._server is None and not await self.start(): return
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            self.socket_path.unlink(missing_ok=True)
+
+
+# --- In-process runner (GUI) ---
+_background = {"thread": None, "loop": None, "server": None}
+
+
+def start_resolver_in_background():
+    """Starts the resolver on its own asyncio loop in a daemon thread. Returns True if running."""
+    if not getattr(config, 'RESOLVER_ENABLED', False): return False
+    if _background["thread"] and _background["thread"].is_alive(): return True
+
+    loop = asyncio.new_event_loop()
+    server = ResolverServer()
+    started = threading.Event()
+    result = {"ok": False}
+
+    def _run():
+        asyncio.set_event_loop(loop)
+        try:
+            result["ok"] = loop.run_until_complete(server.start())
+        except Exception as e:
+            logger.error(f"RESOLVER: Failed to start: {e}", exc_info=True)
+        started.set()
+        if result["ok"]: loop.run_forever()
+        server.close()
+        loop.close()
+
+    thread = threading.Thread(target=_run, name="grazr-resolver", daemon=True)
+    thread.start()
+    started.wait(timeout=5)
+    if not result["ok"]: return False
+    _background.update(thread=thread, loop=loop, server=server)
+    return True
+
+
+def stop_resolver():
+    loop, thread = _background["loop"], _background["thread"]
+    if loop and thread and thread.is_alive():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=2)
+    _background.update(thread=None, loop=None, server=None)
+
+
+# --- Standalone entry point (user systemd unit) ---
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)-7s] %(name)s: %(message)s')
+    server = ResolverServer()
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,144 @@
+"""
+Parallel, dependency-aware start-up for "Start All" and autostart.
+
+Services are started as a graph instead of one worker task after another:
+    - every PHP-FPM version used by a site must be ready before Nginx starts,
+      so no site answers 502 in between;
+    - databases, Redis and MinIO have no dependencies and all start at once.
+A node starts as soon as its dependencies have finished. The start_* functions
+return only once their service is ready (see core/readiness.py), so each edge
+waits on readiness and nothing else. Cold start therefore takes roughly as long
+as the slowest dependency chain, not the sum of all starts.
+"""
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+# --- Import Core Config ---
+try:
+    from . import config
+except ImportError as e:
+    logger.error(f"ORCHESTRATOR: Could not import core.config: {e}", exc_info=True)
+
+    class ConfigDummy:
+        DEFAULT_PHP = "default"
+
+    config = ConfigDummy()
+# --- End Imports ---
+
+MAX_PARALLEL_STARTS = 8
+NGINX_START_TASK = "start_internal_nginx"
+
+
+def _node_key(task_name, data):
+    """Unique plan key for a start task: one node per service instance."""
+    if task_name == "start_php_fpm": return f"php-fpm-{data.get('version')}"
+    if task_name == "start_postgres": return f"postgres-{data.get('instance_id')}"
+    return task_name
+
+
+def php_versions_for_sites(sites_list=None):
+    """Distinct PHP versions the linked sites run on ("default" resolved), sorted."""
+    from ..managers.site_manager import load_sites
+    from ..managers.php_manager import get_default_php_version
+
+    default_version = get_default_php_version()
+    versions = set()
+    for site in sites_list if sites_list is not None else load_sites():
+        version = site.get('php_version') or config.DEFAULT_PHP
+        if version == config.DEFAULT_PHP: version = default_version
+        if version and version != config.DEFAULT_PHP: versions.add(str(version))
+    return sorted(versions)
+
+
+def build_start_plan(tasks, sites_list=None):
+    """
+    Builds the start graph for a list of worker start tasks.
+
+    Args:
+        tasks (list): [{"task_name": "start_mysql", "data": {}}, ...]
+        sites_list (list, optional): Sites used to find Nginx's PHP-FPM dependencies.
+
+    Returns:
+        dict: node key -> {"task_name", "data", "deps": set of node keys}
+    """
+    plan = {}
+    for task in tasks or []:
+        task_name, data = task.get("task_name"), dict(task.get("data") or {})
+        if not task_name: continue
+        plan.setdefault(_node_key(task_name, data), {"task_name": task_name, "data": data, "deps": set()})
+
+    nginx_node = plan.get(NGINX_START_TASK)
+    if nginx_node:
+        try:
+            php_versions = php_versions_for_sites(sites_list)
+        except Exception as e:
+            logger.warning(f"ORCHESTRATOR: Could not determine PHP versions used by sites: {e}")
+            php_versions = []
+        for version in php_versions:
+            fpm_data = {"version": version}
+            key = _node_key("start_php_fpm", fpm_data)
+            plan.setdefault(key, {"task_name": "start_php_fpm", "data": fpm_data, "deps": set()})
+            nginx_node["deps"].add(key)
+    return plan
+
+
+def run_start_plan(plan, run_task, on_result=None, max_workers=MAX_PARALLEL_STARTS):
+    """
+    Runs a plan from build_start_plan() on a thread pool.
+
+    A node is submitted once all of its dependencies have finished. If a dependency
+    failed, the node is still started (Nginx can serve the other sites); the failure
+    is logged. on_result is called from this (the calling) thread as nodes finish.
+
+    Args:
+        plan (dict): As returned by build_start_plan().
+        run_task (callable): run_task(task_name, data) -> (success, message).
+        on_result (callable, optional): on_result(task_name, data, success, message).
+        max_workers (int): Upper bound on concurrent starts.
+
+    Returns:
+        dict: node key -> (success, message)
+    """
+    results = {}
+    pending = dict(plan)
+    running = {}
+    started_at = time.monotonic()
+
+    def _finish(key, success, message):
+        results[key] = (success, message)
+        logger.info(f"ORCHESTRATOR: '{key}' finished after {time.monotonic() - started_at:.2f}s (Success={success}).")
+        if on_result:
+            node = plan[key]
+            on_result(node["task_name"], node["data"], success, message)
+
+    workers = max(1, min(max_workers, len(plan)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="grazr-start") as pool:
+        while pending or running:
+            for key, node in list(pending.items()):
+                deps = [dep for dep in node["deps"] if dep in plan]
+                if not all(dep in results for dep in deps): continue
+                failed_deps = [dep for dep in deps if not results[dep][0]]
+                if failed_deps:
+                    logger.warning(f"ORCHESTRATOR: Starting '{key}' although {failed_deps} failed.")
+                logger.info(f"ORCHESTRATOR: Starting '{key}' ({node['task_name']}).")
+                running[pool.submit(run_task, node["task_name"], node["data"])] = key
+                del pending[key]
+
+            if not running:  # Only nodes waiting on each other are left
+                for key in list(pending):
+                    _finish(key, False, f"Not started: dependency cycle involving {sorted(pending[key]['deps'])}")
+                break
+
+            done, _not_done = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                try:
+                    success, message = future.result()
+                except Exception as e:
+                    logger.error(f"ORCHESTRATOR: '{key}' raised: {e}", exc_info=True)
+                    success, message = False, f"Unexpected error: {type(e).__name__} - {e}"
+                _finish(key, bool(success), message)
+    return results
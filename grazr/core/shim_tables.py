@@ -0,0 +1,247 @@
+import os
+import tempfile
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# --- Import Core Config ---
+try:
+    from . import config
+except ImportError as e:
+    logger.error(f"SHIM_TABLES: Could not import core.config: {e}", exc_info=True)
+
+    class ConfigDummy:
+        CONFIG_DIR = Path(".")
+        PHP_RESOLUTION_TABLE_FILE = Path("php_resolution_err.tsv")
+        NODE_RESOLUTION_TABLE_FILE = Path("node_resolution_err.tsv")
+        NODE_VERSION_MAP_FILE = Path("node_versions_err.tsv")
+        NODE_VERSION_BIN_TEMPLATE = Path("node_err/v{version}/bin/node")
+        DEFAULT_PHP = "default"
+        DEFAULT_NODE = "system"
+
+        def ensure_dir(p):
+            try:
+                os.makedirs(p, exist_ok=True)
+                return True
+            except Exception:
+                return False
+
+    config = ConfigDummy()
+# --- End Imports ---
+
+# Key used in the first column of the fallback row (matches any directory).
+DEFAULT_ROW_KEY = "*"
+
+
+def _atomic_write_text(target_path: Path, content: str):
+    """
+    Writes content to target_path via tempfile + fsync + os.replace.
+    Unlike save_sites(), no copystat: the shims rely on the table's mtime being fresh.
+    """
+    temp_path_str = None
+    try:
+        with tempfile.NamedTemporaryFile('w', dir=target_path.parent, delete=False, encoding='utf-8',
+                                         prefix=f"{target_path.name}.") as temp_f:
+            temp_path_str = temp_f.name
+            temp_f.write(content)
+            temp_f.flush()
+            os.fsync(temp_f.fileno())
+        os.chmod(temp_path_str, 0o644)
+        os.replace(temp_path_str, target_path)
+        temp_path_str = None
+        return True
+    except Exception as e:
+        logger.error(f"SHIM_TABLES: Error writing {target_path}: {e}", exc_info=True)
+        return False
+    finally:
+        if temp_path_str and os.path.exists(temp_path_str):
+            try: os.unlink(temp_path_str)
+            except OSError: pass
+
+
+def _is_shell_safe(value: str):
+    """Table rows are tab/newline separated, so such characters cannot appear in a field."""
+    return '\t' not in value and '\n' not in value
+
+
+def _php_row_fields(version, php_paths_cache):
+    """Returns (version, active cli ini, active cli conf.d) as strings for a PHP version."""
+    if version not in php_paths_cache:
+        from ..managers.php_manager import get_php_version_paths
+        paths = get_php_version_paths(version) or {}
+        php_paths_cache[version] = (
+            version,
+            str(paths.get('active_cli_ini', '')),
+            str(paths.get('active_cli_confd', '')),
+        )
+    return php_paths_cache[version]
+
+
+def build_php_resolution_rows(sites_list):
+    """
+    Builds the rows of the PHP resolution table.
+
+    Each row is (site_root, php_version, active_cli_ini, active_cli_confd). Site roots are
+    resolved and sorted longest-first so the first prefix match in the shim is the
+    deepest site. A final '*' row carries the default PHP version, if one is bundled.
+    """
+    from ..managers.php_manager import get_default_php_version
+
+    default_version = get_default_php_version()
+    if default_version == config.DEFAULT_PHP: default_version = None  # No bundled PHP found
+
+    php_paths_cache = {}
+    site_rows = []
+    for site in sites_list or []:
+        site_root_str = site.get('path', '')
+        if not site_root_str: continue
+        try:
+            site_root = str(Path(site_root_str).resolve())
+        except Exception:
+            continue
+        version = site.get('php_version', config.DEFAULT_PHP)
+        if version == config.DEFAULT_PHP or version is None: version = default_version
+        if not version: continue
+        row = (site_root,) + _php_row_fields(str(version), php_paths_cache)
+        if all(_is_shell_safe(field) for field in row): site_rows.append(row)
+        else: logger.warning(f"SHIM_TABLES: Skipping site with unsupported characters in path: {site_root!r}")
+
+    site_rows.sort(key=lambda row: len(row[0]), reverse=True)
+    if default_version:
+        site_rows.append((DEFAULT_ROW_KEY,) + _php_row_fields(str(default_version), php_paths_cache))
+    return site_rows
+
+
+def write_php_resolution_table(sites_list=None):
+    """
+    Writes config.PHP_RESOLUTION_TABLE_FILE for php-shim.sh.
+
+    The file is a tab-separated table that the shim scans with bash builtins only.
+    The shim considers it stale when sites.json or the PHP bundles dir is newer,
+    and then falls back to grazr.cli.
+
+    Args:
+        sites_list (list, optional): Site dicts to use; loaded from sites.json when None.
+
+    Returns:
+        bool: True if the table was written.
+    """
+    if not config.ensure_dir(config.CONFIG_DIR): return False
+    try:
+        if sites_list is None:
+            from ..managers.site_manager import load_sites
+            sites_list = load_sites()
+        rows = build_php_resolution_rows(sites_list)
+    except Exception as e:
+        logger.error(f"SHIM_TABLES: Failed to build PHP resolution table: {e}", exc_info=True)
+        return False
+
+    lines = ["# Grazr PHP resolution table (generated, do not edit)",
+             "# site_root<TAB>php_version<TAB>cli_php_ini<TAB>cli_conf_d"]
+    lines.extend("\t".join(row) for row in rows)
+    if not _atomic_write_text(config.PHP_RESOLUTION_TABLE_FILE, "\n".join(lines) + "\n"): return False
+    logger.debug(f"SHIM_TABLES: Wrote {len(rows)} rows to {config.PHP_RESOLUTION_TABLE_FILE}")
+    return True
+
+
+# --- Node ---
+def build_node_resolution_rows(sites_list):
+    """
+    Rows (site_root, node_version) for sites that need Node, longest root first.
+    No default row: an unmatched directory means config.DEFAULT_NODE ("system").
+    """
+    rows = []
+    for site in sites_list or []:
+        if not site.get('needs_node') or not site.get('path'): continue
+        try:
+            site_root = str(Path(site['path']).resolve())
+        except Exception:
+            continue
+        row = (site_root, str(site.get('node_version') or config.DEFAULT_NODE))
+        if all(_is_shell_safe(field) for field in row): rows.append(row)
+    rows.sort(key=lambda row: len(row[0]), reverse=True)
+    return rows
+
+
+def _version_key(version):
+    try:
+        return tuple(int(part) for part in version.split('.'))
+    except ValueError:
+        return (-1,)
+
+
+def build_node_version_map():
+    """
+    Maps every way a site may name an installed Node version to its bin directory:
+    "20.11.1", "v20.11.1", "20.11", "20", plus "node"/"stable" for the newest.
+    Partial versions point at the newest matching install, as `nvm which` does.
+    Installed versions are read from the NODE_VERSION_BIN_TEMPLATE layout, not via nvm.
+    Named aliases such as "lts/iron" need nvm and are left to the shim's nvm fallback.
+    """
+    template = str(config.NODE_VERSION_BIN_TEMPLATE)
+    versions_dir = Path(template.format(version="0")).parent.parent.parent  # .../versions/node
+    installed = []
+    try:
+        for entry in versions_dir.iterdir():
+            version = entry.name[1:] if entry.name.startswith('v') else entry.name
+            node_bin = Path(template.format(version=version))
+            if node_bin.is_file() and os.access(node_bin, os.X_OK):
+                installed.append((version, str(node_bin.parent)))
+    except OSError:
+        return {}
+
+    version_map = {}
+    # Oldest first so newer versions overwrite the shared partial/alias keys
+    for version, bin_dir in sorted(installed, key=lambda item: _version_key(item[0])):
+        parts = version.split('.')
+        for key in (version, f"v{version}", '.'.join(parts[:2]), parts[0], f"v{parts[0]}", "node", "stable"):
+            version_map[key] = bin_dir
+    return version_map
+
+
+def write_node_resolution_table(sites_list=None):
+    """Writes config.NODE_RESOLUTION_TABLE_FILE (site_root<TAB>node_version) for node-shim.sh."""
+    if not config.ensure_dir(config.CONFIG_DIR): return False
+    try:
+        if sites_list is None:
+            from ..managers.site_manager import load_sites
+            sites_list = load_sites()
+        rows = build_node_resolution_rows(sites_list)
+    except Exception as e:
+        logger.error(f"SHIM_TABLES: Failed to build Node resolution table: {e}", exc_info=True)
+        return False
+    lines = ["# Grazr Node resolution table (generated, do not edit)",
+             "# site_root<TAB>node_version"]
+    lines.extend("\t".join(row) for row in rows)
+    return _atomic_write_text(config.NODE_RESOLUTION_TABLE_FILE, "\n".join(lines) + "\n")
+
+
+def write_node_version_map():
+    """Writes config.NODE_VERSION_MAP_FILE (version<TAB>bin_dir). Called after Node installs/uninstalls."""
+    if not config.ensure_dir(config.CONFIG_DIR): return False
+    version_map = build_node_version_map()
+    lines = ["# Grazr Node version map (generated, do not edit)",
+             "# version_or_alias<TAB>bin_dir"]
+    lines.extend(f"{key}\t{bin_dir}" for key, bin_dir in sorted(version_map.items())
+                 if _is_shell_safe(key) and _is_shell_safe(bin_dir))
+    if not _atomic_write_text(config.NODE_VERSION_MAP_FILE, "\n".join(lines) + "\n"): return False
+    logger.debug(f"SHIM_TABLES: Wrote {len(version_map)} Node version keys to {config.NODE_VERSION_MAP_FILE}")
+    return True
+
+
+def write_site_tables(sites_list=None):
+    """Regenerates the per-site tables (PHP and Node) from one site list."""
+    if sites_list is None:
+        from ..managers.site_manager import load_sites
+        sites_list = load_sites()
+    php_ok = write_php_resolution_table(sites_list)
+    node_ok = write_node_resolution_table(sites_list)
+    return php_ok and node_ok
+
+
+def refresh_all_shim_tables():
+    """Regenerates every shim table (GUI start-up, `grazr.cli --refresh-shim-tables`)."""
+    sites_ok = write_site_tables()
+    map_ok = write_node_version_map()
+    return sites_ok and map_ok
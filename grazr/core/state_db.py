@@ -0,0 +1,208 @@
+"""
+Optional SQLite storage for sites and configured services (config.STORAGE_BACKEND = "sqlite").
+
+Each record is stored as its JSON document plus a few indexed columns derived from
+it, so site_manager / services_config_manager keep working with plain dicts:
+
+    sites(id PK, resolved_path, domain_lc, data)     indexed by resolved_path, domain_lc
+    services(id PK, service_type, data)
+
+The database runs in WAL mode: the shims and other readers never block on, or see a
+half-written state from, the GUI writing. Saves are diffed against the stored rows,
+so changing one site writes one row. A per-kind generation counter in `meta` lets
+callers cache a full load and only re-read after another writer committed.
+"""
+import os
+import sys
+import json
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# --- Import Core Config ---
+try:
+    from . import config
+except ImportError as e:
+    logger.critical(f"STATE_DB: Failed to import core.config: {e}", exc_info=True)
+    sys.exit(1)
+# --- End Imports ---
+
+SCHEMA_VERSION = 1
+BUSY_TIMEOUT_MS = 5000
+KINDS = ("sites", "services")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sites (
+    id TEXT PRIMARY KEY,
+    resolved_path TEXT,
+    domain_lc TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sites_resolved_path ON sites(resolved_path);
+CREATE INDEX IF NOT EXISTS sites_domain_lc ON sites(domain_lc);
+CREATE TABLE IF NOT EXISTS services (
+    id TEXT PRIMARY KEY,
+    service_type TEXT,
+    data TEXT NOT NULL
+);
+"""
+
+_local = threading.local()  # sqlite3 connections are per thread
+
+
+def is_enabled():
+    return getattr(config, 'STORAGE_BACKEND', 'json') == 'sqlite'
+
+
+def _connect():
+    """Returns this thread's connection, creating the database and schema on first use."""
+    db_path = str(config.STATE_DB_FILE)
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and getattr(_local, 'db_path', None) == db_path: return conn
+    if not config.ensure_dir(config.STATE_DB_FILE.parent):
+        raise sqlite3.OperationalError(f"Cannot create directory for {db_path}")
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; WAL keeps it consistent
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        conn.executescript(_SCHEMA)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    _local.conn, _local.db_path = conn, db_path
+    return conn
+
+
+def _row_columns(kind, record):
+    """Indexed columns derived from a record dict."""
+    if kind == "sites":
+        path_str = record.get('path') or ''
+        try:
+            resolved_path = str(Path(path_str).resolve()) if path_str else None
+        except Exception:
+            resolved_path = None
+        domain = record.get('domain')
+        return {"resolved_path": resolved_path, "domain_lc": str(domain).lower() if domain else None}
+    return {"service_type": record.get('service_type')}
+
+
+def _get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def generation(kind):
+    """Counter bumped by every committed save of `kind`; cheap cache-validity check."""
+    return int(_get_meta(_connect(), f"generation:{kind}") or 0)
+
+
+def is_migrated(kind):
+    return _get_meta(_connect(), f"migrated:{kind}") is not None
+
+
+def load_records(kind):
+    """Returns all records of `kind` as dicts (unsorted)."""
+    if kind not in KINDS: raise ValueError(f"Unknown record kind: {kind}")
+    rows = _connect().execute(f"SELECT data FROM {kind}").fetchall()
+    return [json.loads(row[0]) for row in rows]
+
+
+def get_record(kind, record_id):
+    if kind not in KINDS: raise ValueError(f"Unknown record kind: {kind}")
+    row = _connect().execute(f"SELECT data FROM {kind} WHERE id = ?", (record_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def find_sites_by_paths(resolved_paths):
+    """Sites whose resolved root is one of resolved_paths, deepest root first (one indexed query)."""
+    resolved_paths = list(resolved_paths)
+    if not resolved_paths: return []
+    placeholders = ",".join("?" * len(resolved_paths))
+    rows = _connect().execute(
+        f"SELECT data FROM sites WHERE resolved_path IN ({placeholders}) "
+        f"ORDER BY length(resolved_path) DESC, rowid", resolved_paths).fetchall()
+    return [json.loads(row[0]) for row in rows]
+
+
+def find_site_by_domain(domain):
+    row = _connect().execute("SELECT data FROM sites WHERE domain_lc = ? ORDER BY rowid LIMIT 1",
+                             (str(domain).lower(),)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def save_records(kind, records):
+    """
+    Makes the stored `kind` rows equal to `records` (dicts with an 'id'), writing only the
+    rows that changed, in one IMMEDIATE transaction. Returns True on success.
+    """
+    if kind not in KINDS: raise ValueError(f"Unknown record kind: {kind}")
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        stored = dict(conn.execute(f"SELECT id, data FROM {kind}").fetchall())
+        wanted_ids = set()
+        changed = 0
+        for record in records:
+            record_id = record.get('id')
+            if not record_id: raise ValueError(f"{kind} record without 'id': {record!r}")
+            wanted_ids.add(record_id)
+            data = json.dumps(record, sort_keys=True)
+            if stored.get(record_id) == data: continue
+            columns = _row_columns(kind, record)
+            names = ["id", *columns, "data"]
+            conn.execute(
+                f"INSERT OR REPLACE INTO {kind} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                [record_id, *columns.values(), data])
+            changed += 1
+        removed_ids = [(record_id,) for record_id in stored if record_id not in wanted_ids]
+        if removed_ids: conn.executemany(f"DELETE FROM {kind} WHERE id = ?", removed_ids)
+        if changed or removed_ids:
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, '1') "
+                         "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+                         (f"generation:{kind}",))
+        conn.execute("COMMIT")
+        logger.debug(f"STATE_DB: Saved {kind}: {changed} written, {len(removed_ids)} removed.")
+        return True
+    except Exception as e:
+        if conn.in_transaction: conn.execute("ROLLBACK")
+        logger.error(f"STATE_DB: Error saving {kind}: {e}", exc_info=True)
+        return False
+
+
+def migrate_from_json(kind, records, json_path):
+    """
+    One-time import of `records` (already parsed from json_path by the owning manager).
+    The JSON file is renamed to *.migrated afterwards so there is a single source of truth.
+    """
+    if is_migrated(kind): return True
+    if records and not save_records(kind, records): return False
+    conn = _connect()
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (f"migrated:{kind}", str(json_path)))
+    if json_path.exists():
+        try:
+            os.replace(json_path, json_path.with_name(json_path.name + ".migrated"))
+        except OSError as e:
+            logger.warning(f"STATE_DB: Imported {json_path} but could not rename it: {e}")
+    logger.info(f"STATE_DB: Migrated {len(records)} {kind} from {json_path} to {config.STATE_DB_FILE}")
+    return True
+
+
+def export_json(kind, json_path):
+    """Writes `kind` back out in the JSON file format (for switching STORAGE_BACKEND back to json)."""
+    top_key = "sites" if kind == "sites" else "configured_services"
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({top_key: load_records(kind)}, f, indent=4)
+    return True
+
+
+# --- Standalone entry point: python -m grazr.core.state_db --export ---
+if __name__ == "__main__":
+    if sys.argv[1:] != ["--export"]:
+        print("Usage: python -m grazr.core.state_db --export   (writes sites.json and services.json from the DB)")
+        sys.exit(2)
+    export_json("sites", config.SITES_FILE)
+    export_json("services", config.SERVICES_CONFIG_FILE)
+    print(f"Exported {config.STATE_DB_FILE} to {config.SITES_FILE} and {config.SERVICES_CONFIG_FILE}")
@@ -0,0 +1,171 @@
+"""
+Bounded, priority-aware executor for worker tasks.
+
+Tasks used to run one after another on the worker's QThread, so a long `nvm install`
+blocked every Start/Stop click behind it. The executor runs them concurrently:
+    - at most `max_workers` tasks run at once, each on its own daemon thread;
+    - every task sits in a priority lane. Queued tasks are dispatched lane by lane,
+      LANE_LONG tasks are capped at LANE_LIMITS, and RESERVED_INTERACTIVE_WORKERS
+      threads are kept free for LANE_INTERACTIVE, so quick actions never wait on installs;
+    - a task declares the resources it touches ("site:<path>", "php:<version>",
+      "service:<id>"...). A task is only dispatched once none of its resources is held
+      by a running task or claimed by an earlier queued one, so tasks on the same
+      site/version/service still run in submission order;
+    - queued tasks can be cancelled. Running tasks always finish.
+
+Code that must serialise a short critical section across all tasks (e.g. reloading
+Nginx) uses resource_lock(name) instead of blocking a whole task.
+"""
+import itertools
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, dispatched in this order
+LANE_INTERACTIVE = 0  # Status checks, start/stop of a single service
+LANE_DEFAULT = 1      # Site, SSL and PHP configuration changes
+LANE_LONG = 2         # Downloads and installs
+
+DEFAULT_MAX_WORKERS = 4
+RESERVED_INTERACTIVE_WORKERS = 1
+LANE_LIMITS = {LANE_LONG: 1}
+
+NGINX_RELOAD_LOCK = "nginx-reload"
+
+_resource_locks = {}
+_resource_locks_guard = threading.Lock()
+
+
+def resource_lock(name):
+    """Returns the process-wide re-entrant lock for `name`, creating it on first use."""
+    with _resource_locks_guard:
+        lock = _resource_locks.get(name)
+        if lock is None:
+            lock = _resource_locks[name] = threading.RLock()
+        return lock
+
+
+class _Task:
+    __slots__ = ("task_id", "name", "data", "func", "lane", "resources", "on_cancel")
+
+    def __init__(self, task_id, name, data, func, lane, resources, on_cancel):
+        self.task_id = task_id
+        self.name = name
+        self.data = data
+        self.func = func
+        self.lane = lane
+        self.resources = frozenset(resources or ())
+        self.on_cancel = on_cancel
+
+
+class TaskExecutor:
+    """Runs submitted callables concurrently, honouring lanes and resource keys."""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self.max_workers = max(1, int(max_workers))
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._queued = []        # In submission order; _dispatch() applies the lanes
+        self._running = {}       # task_id -> _Task
+        self._held = set()       # Resource keys of running tasks
+        self._shutdown = False
+
+    # --- Submission and cancellation ---
+    def submit(self, name, data, func, lane=LANE_DEFAULT, resources=(), on_cancel=None):
+        """
+        Queues func(name, data) and returns its task id (None after shutdown()).
+
+        Args:
+            lane (int): LANE_INTERACTIVE, LANE_DEFAULT or LANE_LONG.
+            resources (iterable): Keys of the resources the task modifies.
+            on_cancel (callable, optional): on_cancel(name, data), called if the task is
+                cancelled before it started.
+        """
+        with self._cond:
+            if self._shutdown:
+                logger.warning(f"TASK_EXECUTOR: Rejecting '{name}', executor is shut down.")
+                return None
+            task = _Task(next(self._ids), name, data, func, lane, resources, on_cancel)
+            self._queued.append(task)
+            logger.debug(f"TASK_EXECUTOR: Queued #{task.task_id} '{name}' (lane {lane}, resources {sorted(task.resources)}).")
+            self._dispatch()
+            return task.task_id
+
+    def cancel(self, task_id):
+        """Cancels a queued task. Returns False if it is already running or finished."""
+        return bool(self._cancel_where(lambda task: task.task_id == task_id))
+
+    def cancel_queued(self, name=None, data=None):
+        """Cancels all queued tasks (optionally only those matching name and data). Returns the count."""
+        return self._cancel_where(lambda task: (name is None or task.name == name)
+                                  and (data is None or task.data == data))
+
+    def _cancel_where(self, predicate):
+        with self._cond:
+            cancelled = [task for task in self._queued if predicate(task)]
+            self._queued = [task for task in self._queued if task not in cancelled]
+            if cancelled: self._dispatch()  # A cancelled task may have been blocking others
+        for task in cancelled:
+            logger.info(f"TASK_EXECUTOR: Cancelled queued task #{task.task_id} '{task.name}'.")
+            if task.on_cancel:
+                try:
+                    task.on_cancel(task.name, task.data)
+                except Exception as e:
+                    logger.error(f"TASK_EXECUTOR: on_cancel for '{task.name}' raised: {e}", exc_info=True)
+        return len(cancelled)
+
+    def shutdown(self, wait_timeout=None):
+        """Cancels queued tasks and stops accepting new ones. Optionally waits for running tasks."""
+        with self._cond:
+            self._shutdown = True
+        self.cancel_queued()
+        if wait_timeout is not None:
+            with self._cond:
+                return self._cond.wait_for(lambda: not self._running, wait_timeout)
+        return True
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._queued) + len(self._running)
+
+    # --- Scheduling ---
+    def _has_capacity(self, lane):
+        if len(self._running) >= self.max_workers: return False
+        in_lane = sum(1 for task in self._running.values() if task.lane == lane)
+        if in_lane >= LANE_LIMITS.get(lane, self.max_workers): return False
+        if lane != LANE_INTERACTIVE:
+            background = sum(1 for task in self._running.values() if task.lane != LANE_INTERACTIVE)
+            if background >= self.max_workers - RESERVED_INTERACTIVE_WORKERS: return False
+        return True
+
+    def _dispatch(self):
+        """Starts every queued task that may run now. Caller holds self._cond."""
+        # Lanes only reorder tasks whose resources don't overlap: a task waits for every
+        # running task and every earlier queued task that shares one of its resources.
+        claimed = set(self._held)
+        ready = []
+        for task in self._queued:
+            if not task.resources & claimed: ready.append(task)
+            claimed |= task.resources
+        for task in sorted(ready, key=lambda t: (t.lane, t.task_id)):
+            if len(self._running) >= self.max_workers: break
+            if not self._has_capacity(task.lane): continue
+            self._queued.remove(task)
+            self._running[task.task_id] = task
+            self._held |= task.resources
+            threading.Thread(target=self._run, args=(task,), daemon=True,
+                             name=f"grazr-task-{task.task_id}").start()
+
+    def _run(self, task):
+        logger.debug(f"TASK_EXECUTOR: Running #{task.task_id} '{task.name}'.")
+        try:
+            task.func(task.name, task.data)
+        except Exception as e:
+            logger.error(f"TASK_EXECUTOR: Task #{task.task_id} '{task.name}' raised: {e}", exc_info=True)
+        finally:
+            with self._cond:
+                del self._running[task.task_id]
+                self._held -= task.resources
+                self._dispatch()
+                self._cond.notify_all()
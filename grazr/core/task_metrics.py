@@ -0,0 +1,146 @@
+"""
+Timing metrics for worker tasks.
+
+Every task run by the Worker is recorded here: wall time, outcome, and the duration
+of its sub-steps (hosts edit, Nginx config write, Nginx reload, PHP-FPM start...).
+Records live in an in-memory ring buffer of config.TASK_METRICS_SIZE entries and are
+mirrored to config.TASK_METRICS_FILE after every task, so `grazr.cli --slow-tasks`
+can show them without talking to the running GUI.
+
+Sub-steps are attributed to the task running on the current thread:
+
+    with task_metrics.track_task("install_nginx", detail=path) as record:
+        with task_metrics.step("nginx_write"): ...
+        record["success"] = True
+
+step() outside of a tracked task is a no-op, so managers can be instrumented freely.
+"""
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# --- Import Core Config ---
+try:
+    from . import config
+except ImportError as e:
+    logger.error(f"TASK_METRICS: Could not import core.config: {e}", exc_info=True)
+
+    class ConfigDummy:
+        TASK_METRICS_SIZE = 200
+        TASK_METRICS_FILE = None
+
+    config = ConfigDummy()
+# --- End Imports ---
+
+_records = deque(maxlen=getattr(config, 'TASK_METRICS_SIZE', 200))
+_records_lock = threading.Lock()
+_local = threading.local()
+
+
+@contextmanager
+def track_task(task_name, detail=None, timeout=None):
+    """
+    Records one task execution. The yielded record is a dict; set its "success" and
+    "message" before leaving the block. Exceptions are recorded as failures and re-raised.
+    """
+    record = {
+        "task": task_name, "detail": detail, "started_at": time.time(), "duration": None,
+        "success": False, "message": "", "timeout": timeout, "over_timeout": False, "steps": [],
+    }
+    parent = getattr(_local, "record", None)  # A task may run another task inline
+    _local.record = record
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["success"], record["message"] = False, f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _local.record = parent
+        record["duration"] = round(time.perf_counter() - started, 4)
+        if timeout and record["duration"] > timeout:
+            record["over_timeout"] = True
+            logger.warning(f"TASK_METRICS: '{task_name}' took {record['duration']:.1f}s, over its {timeout}s budget.")
+        _append(record)
+
+
+@contextmanager
+def step(name):
+    """Times a sub-step of the task running on this thread (no-op outside of track_task)."""
+    record = getattr(_local, "record", None)
+    if record is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record["steps"].append({"name": name, "duration": round(time.perf_counter() - started, 4)})
+
+
+def _append(record):
+    with _records_lock:
+        _records.append(record)
+        snapshot = list(_records)
+    _save_snapshot(snapshot)
+
+
+def _save_snapshot(snapshot):
+    path = getattr(config, 'TASK_METRICS_FILE', None)
+    if not path: return
+    try:
+        config.ensure_dir(path.parent)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_name, path)
+    except Exception as e:
+        logger.debug(f"TASK_METRICS: Could not write {path}: {e}")
+
+
+# --- Queries ---
+def recent_records(from_file=False):
+    """Recorded tasks, oldest first. from_file reads the snapshot of another process (the GUI)."""
+    if not from_file:
+        with _records_lock:
+            return list(_records)
+    path = getattr(config, 'TASK_METRICS_FILE', None)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, TypeError, ValueError):
+        return []
+
+
+def slowest(limit=10, task_name=None, from_file=False):
+    """The `limit` slowest recorded tasks (optionally only task_name), slowest first."""
+    records = [r for r in recent_records(from_file) if task_name is None or r.get("task") == task_name]
+    return sorted(records, key=lambda r: r.get("duration") or 0, reverse=True)[:limit]
+
+
+def format_steps(record):
+    """"hosts 0.41s, nginx_write 0.01s, nginx_reload 0.02s" for a record."""
+    return ", ".join(f"{s['name']} {s['duration']:.2f}s" for s in record.get("steps") or [])
+
+
+def format_report(records):
+    """Plain-text table of records, one line per task."""
+    if not records: return "No task timings recorded yet."
+    lines = [f"{'DURATION':>9}  {'RESULT':<7} {'FINISHED':<19}  TASK (DETAIL): STEPS"]
+    for r in records:
+        finished = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime((r.get("started_at") or 0) + (r.get("duration") or 0)))
+        result = "ok" if r.get("success") else "FAILED"
+        if r.get("over_timeout"): result += "*"
+        detail = f" ({r['detail']})" if r.get("detail") else ""
+        steps = format_steps(r)
+        lines.append(f"{r.get('duration') or 0:>8.2f}s  {result:<7} {finished:<19}  {r.get('task')}{detail}"
+                     + (f": {steps}" if steps else ""))
+    if any(r.get("over_timeout") for r in records): lines.append("* exceeded the task's timeout budget")
+    return "\n".join(lines)
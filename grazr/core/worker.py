@@ -1,6 +1,7 @@
 from PySide6.QtCore import QObject, Signal, Slot
 import traceback
 import time
+import contextlib
 from pathlib import Path
 import logging
 
@@ -10,11 +11,12 @@ logger = logging.getLogger(__name__)
 try:
     # Managers (now in ../managers relative to core)
     from ..managers.nginx_manager import install_nginx_site, uninstall_nginx_site
-    from ..managers.nginx_manager import start_internal_nginx, stop_internal_nginx
-    from ..managers.php_manager import (start_php_fpm, stop_php_fpm, restart_php_fpm,
+    from ..managers.nginx_manager import start_internal_nginx, stop_internal_nginx, reload_internal_nginx
+    from ..managers.nginx_manager import set_nginx_profile
+    from ..managers.php_manager import (start_php_fpm, stop_php_fpm, reload_php_fpm,
                                         enable_extension, disable_extension, configure_extension,
-                                        set_ini_value)
-    from ..managers.site_manager import update_site_settings, remove_site, get_site_settings
+                                        set_ini_values)
+    from ..managers.site_manager import update_site_settings, update_many, remove_site, get_site_settings
     from ..managers.ssl_manager import generate_certificate, delete_certificate
     from ..managers.mysql_manager import start_mysql, stop_mysql
     from ..managers.postgres_manager import start_postgres, stop_postgres
@@ -24,6 +26,9 @@ try:
     from .system_utils import run_root_helper_action
     from ..core import config
     from ..managers.services_config_manager import get_service_config_by_id
+    from .service_orchestrator import build_start_plan, run_start_plan
+    from .task_executor import TaskExecutor, LANE_INTERACTIVE, LANE_DEFAULT, LANE_LONG
+    from . import task_metrics
 
 except ImportError as e:
     logger.error(f"WORKER: Failed to import dependencies: {e}", exc_info=True)
@@ -33,14 +38,17 @@ except ImportError as e:
     def uninstall_nginx_site(*args, **kwargs): return False, "Not imported"
     def start_internal_nginx(*args, **kwargs): return False, "Not imported"
     def stop_internal_nginx(*args, **kwargs): return True, "Not imported"
+    def reload_internal_nginx(*args, **kwargs): return False, "Not imported"
+    def set_nginx_profile(*args, **kwargs): return False, "Not imported"
     def start_php_fpm(*args, **kwargs): return False
     def stop_php_fpm(*args, **kwargs): return True
-    def restart_php_fpm(*args, **kwargs): return False
-    def set_ini_value(*args, **kwargs): return False
+    def reload_php_fpm(*args, **kwargs): return False
+    def set_ini_values(version, settings, sapis=("cli", "fpm")): return {sapi: False for sapi in sapis}
     def enable_extension(*args, **kwargs): return False, "Not Imported"
     def disable_extension(*args, **kwargs): return False, "Not Imported"
     def configure_extension(*a): return False, "NI - configure_extension dummy"
     def update_site_settings(*args, **kwargs): return False
+    def update_many(*args, **kwargs): return False
     def remove_site(*args, **kwargs): return False
     def get_site_settings(*args, **kwargs): return None
     def generate_certificate(*args, **kwargs): return False, "Not imported"
@@ -57,411 +65,571 @@ except ImportError as e:
     def uninstall_node_version(*a): return False, "NI"
     def run_root_helper_action(*args, **kwargs): return False, "Not imported"
     def get_service_config_by_id(id_str): return None  # Dummy
+    def build_start_plan(*args, **kwargs): return {}
+    def run_start_plan(*args, **kwargs): return {}
+    LANE_INTERACTIVE, LANE_DEFAULT, LANE_LONG = 0, 1, 2
+
+    class TaskExecutor:  # Dummy: runs tasks inline
+        def __init__(self, *args, **kwargs): pass
+        def submit(self, name, data, func, **kwargs): func(name, data); return None
+        def cancel_queued(self, *args, **kwargs): return 0
+        def shutdown(self, *args, **kwargs): return True
+
+    class TaskMetricsDummy:
+        @staticmethod
+        def track_task(*args, **kwargs): return contextlib.nullcontext({})
+        @staticmethod
+        def step(name): return contextlib.nullcontext()
+    task_metrics = TaskMetricsDummy()
     class ConfigDummyFallback:
         NGINX_PROCESS_ID = "err-nginx"; AVAILABLE_BUNDLED_SERVICES = {}; SYSTEM_DNSMASQ_SERVICE_NAME = "dnsmasq.service"
 
     config = ConfigDummyFallback()
 
 
+# --- Task Registry ---
+# Every worker task is declared once with register_task(): the handler, the data keys
+# it requires, its priority lane, the resources it modifies and its time budget.
+# Handlers are Worker methods: handler(self, task_name, data) returning
+# (success, message) or (success, message, context_updates).
+TIMEOUT_SERVICE = 90   # Seconds; start/stop wait for readiness (MySQL allows 60s)
+TIMEOUT_CONFIG = 120   # Site, SSL and PHP configuration (includes an FPM restart)
+TIMEOUT_INSTALL = 900  # Downloads and installs
+
+TASKS = {}
+
+
+class TaskSpec:
+    """Declaration of one worker task."""
+    __slots__ = ("name", "handler", "inputs", "lane", "resources", "timeout")
+
+    def __init__(self, name, handler, inputs, lane, resources, timeout):
+        self.name = name
+        self.handler = handler
+        self.inputs = tuple(inputs)
+        self.lane = lane
+        self.resources = resources  # callable(data) -> set of resource keys, or None
+        self.timeout = timeout
+
+
+def register_task(*names, inputs=(), lane=LANE_DEFAULT, resources=None, timeout=TIMEOUT_CONFIG):
+    """Decorator registering a Worker method as the handler of the given task name(s)."""
+    def decorator(func):
+        for name in names:
+            TASKS[name] = TaskSpec(name, func, inputs, lane, resources, timeout)
+        return func
+    return decorator
+
+
+def _site_key(path):
+    try:
+        return f"site:{Path(path).expanduser().resolve()}"
+    except (OSError, RuntimeError):
+        return f"site:{path}"
+
+
+def _site_path_resources(data):
+    return {_site_key(data["path"])} if data.get("path") else set()
+
+
+def _site_info_resources(data):
+    path = (data.get("site_info") or {}).get("path")
+    return {_site_key(path)} if path else set()
+
+
+def _php_version_resources(data):
+    return {f"php:{data['version']}"} if data.get("version") else set()
+
+
+def _service_resources(service_id):
+    return lambda data: {f"service:{service_id}"}
+
+
+def _postgres_resources(data):
+    return {f"service:postgres-{data['instance_id']}"} if data.get("instance_id") else set()
+
+
+def _start_services_resources(data):
+    # From the plan, not the raw list: starting Nginx also starts the PHP-FPM versions its sites use
+    keys = set()
+    for node in build_start_plan(data.get("tasks") or []).values():
+        keys |= task_resources(node["task_name"], node["data"])
+    return keys
+
+
+def _nvm_resources(data):
+    return {"nvm"}  # NVM works on one shared directory tree
+
+
+def task_resources(task_name: str, data: dict):
+    """Resource keys a task modifies; tasks sharing a key never run at the same time."""
+    spec = TASKS.get(task_name)
+    if not spec or not spec.resources: return set()
+    return set(spec.resources(data or {}))
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, (str, list, dict)) and not value)
+
+
+def _task_detail(data: dict):
+    """Short description of what a task acts on, for timing records."""
+    for key in ("path", "version", "instance_id", "new_domain", "profile"):
+        if data.get(key): return str(data[key])
+    if (data.get("site_info") or {}).get("domain"): return data["site_info"]["domain"]
+    if data.get("site_paths"): return f"{len(data['site_paths'])} sites"
+    if data.get("tasks"): return f"{len(data['tasks'])} services"
+    return None
+
+
 class Worker(QObject):
     """
-    Worker object that performs tasks in a separate thread.
-    Emits resultReady signal when a task is complete.
+    Dispatches tasks to a TaskExecutor, which runs them concurrently on its own threads.
+    Emits resultReady (from the executing thread) when a task is complete or cancelled.
     """
     resultReady = Signal(str, dict, bool, str) # task_name, context_data, success, message
 
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.executor = TaskExecutor()
+
     @Slot(str, dict)
     def doWork(self, task_name: str, data: dict):
-        local_success: bool = False
-        local_message: str = f"Unknown task '{task_name}'."
-        context_data: dict = data.copy() 
-        action: str = "" # Initialize action variable, used in some blocks
+        spec = TASKS.get(task_name)
+        lane = spec.lane if spec else LANE_DEFAULT
+        logger.info(f"WORKER: Queuing task '{task_name}' (lane {lane}) with data {data}")
+        self.executor.submit(task_name, data, self._execute, lane=lane,
+                             resources=task_resources(task_name, data), on_cancel=self._on_cancelled)
 
+    def cancel_queued(self, task_name=None, data=None):
+        """Cancels queued (not yet running) tasks; each emits a failed resultReady. Thread-safe."""
+        return self.executor.cancel_queued(task_name, data)
+
+    def shutdown(self, wait_timeout=None):
+        """Cancels queued tasks and rejects new ones; optionally waits for running tasks."""
+        return self.executor.shutdown(wait_timeout)
+
+    def _execute(self, task_name: str, data: dict):
         logger.info(f"WORKER: Starting task '{task_name}' with data {data}")
+        local_success, local_message, context_data = self._run_task(task_name, data)
+        logger.info(f"WORKER: Emitting resultReady signal for task '{task_name}' (Success={local_success}) with context {context_data}")
+        self.resultReady.emit(task_name, context_data, local_success, local_message)
 
-        try:
-            # --- Site and Nginx Tasks ---
-            if task_name == "uninstall_nginx":
-                path = data.get("path")
-                site_info = get_site_settings(path) 
-                domain = site_info.get("domain") if site_info else None
-                results_log = [] 
-                overall_success = True 
-                if path:
-                    if domain: 
-                        logger.info(f"WORKER: Removing host '{domain}'...")
-                        rm_ok, rm_msg = run_root_helper_action(action="remove_host_entry", domain=domain)
-                        results_log.append(f"HostsRm:{'OK' if rm_ok else 'Fail'}")
-                    else: 
-                        results_log.append("HostsRm:Skipped (no domain)")
-                    
-                    logger.info(f"WORKER: Calling uninstall_nginx_site for '{path}'...")
-                    ngx_ok, ngx_msg = uninstall_nginx_site(path)
-                    results_log.append(f"NginxUninstall:{'OK' if ngx_ok else 'Fail'}")
-                    if not ngx_ok: 
-                        overall_success = False
-                    
-                    local_success = overall_success
-                    local_message = f"Uninstall Site: {' | '.join(results_log)}"
-                else: 
-                    local_success = False
-                    local_message = "Missing 'path' for uninstall_nginx."
-
-            elif task_name == "install_nginx": 
-                results_log = []  
-                overall_success = False 
-
-                path = data.get("path")
-                if path:
-                    logger.info(f"WORKER: Calling install_nginx_site for '{path}'...")
-                    ngx_ok, ngx_msg = install_nginx_site(path)
-                    results_log.append(f"NginxInstall:{'OK' if ngx_ok else 'Fail'}")
-                    
-                    if not ngx_ok:
-                        overall_success = False 
-                    else:
-                        overall_success = True 
-
-                    if overall_success: 
-                        site_info = get_site_settings(path)
-                        domain = site_info.get("domain") if site_info else None
-                        if domain:
-                            logger.info(f"WORKER: Adding host '{domain}'...")
-                            add_ok, add_msg = run_root_helper_action(action="add_host_entry", domain=domain, ip="127.0.0.1")
-                            results_log.append(f"HostsAdd:{'OK' if add_ok else 'Fail'}")
-                            if not add_ok:
-                                overall_success = False 
-                        else: 
-                            results_log.append("HostsAdd:Skipped (no domain)")
-                    else: 
-                        results_log.append("HostsAdd:Skipped (Nginx install failed)")
-                    
-                    local_success = overall_success
-                    local_message = f"Install Site: {' | '.join(results_log)}"
-                else: 
-                    local_success = False 
-                    local_message = "Missing 'path' for install_nginx. Nginx and Hosts steps skipped."
-            
-            elif task_name == "start_internal_nginx":
-                local_success, local_message = start_internal_nginx()
-            elif task_name == "stop_internal_nginx":
-                local_success, local_message = stop_internal_nginx()
-            
-            elif task_name == "start_php_fpm":
-                version = data.get("version")
-                if version:
-                    local_success = start_php_fpm(version)
-                    local_message = f"PHP FPM {version} start attempt finished."
-                else:
-                    local_success = False
-                    local_message = "Missing 'version' for start_php_fpm."
-            
-            elif task_name == "stop_php_fpm":
-                version = data.get("version")
-                if version:
-                    local_success = stop_php_fpm(version)
-                    local_message = f"PHP FPM {version} stop attempt finished."
-                else:
-                    local_success = False
-                    local_message = "Missing 'version' for stop_php_fpm."
-            
-            elif task_name == "update_site_domain": 
-                site_info = data.get("site_info")
-                new_domain = data.get("new_domain")
-                if not site_info or not new_domain:
-                    local_success = False
-                    local_message = "Missing data for update_site_domain."
-                else:
-                    path = site_info.get('path')
-                    old_domain = site_info.get('domain')
-                    results_log = []
-                    overall_success = True
-                    if not path or not old_domain:
-                        local_success = False
-                        local_message = "Missing path or old_domain in site_info."
-                    else:
-                        logger.info(f"WORKER: Update domain for site '{path}': from '{old_domain}' to '{new_domain}'")
-                        if not update_site_settings(path, {"domain": new_domain}):
-                            results_log.append("Store:Fail")
-                            overall_success = False
-                        else:
-                            results_log.append("Store:OK")
-                        
-                        if overall_success and old_domain:
-                            rm_ok, rm_msg = run_root_helper_action("remove_host_entry", domain=old_domain)
-                            results_log.append(f"HostsRm:{'OK' if rm_ok else 'Fail'}")
-                            # Not critical for overall_success if old host removal fails, but good to log
-
-                        if overall_success:
-                            add_ok, add_msg = run_root_helper_action("add_host_entry", domain=new_domain, ip="127.0.0.1")
-                            results_log.append(f"HostsAdd:{'OK' if add_ok else 'Fail'}")
-                            if not add_ok:
-                                overall_success = False
-                        
-                        if overall_success:
-                            ngx_ok, ngx_msg = install_nginx_site(path)
-                            results_log.append(f"Nginx:{'OK' if ngx_ok else 'Fail'}")
-                            if not ngx_ok:
-                                overall_success = False
-                        else: # If store, host rm, or host add failed
-                            results_log.append("Nginx:Skipped")
-                        
-                        local_success = overall_success
-                        local_message = f"Update Domain: {' | '.join(results_log)}"
-            
-            elif task_name == "set_site_php": 
-                site_info = data.get("site_info")
-                php_v = data.get("new_php_version")
-                if not site_info or not php_v:
-                    local_success = False
-                    local_message = "Missing data for set_site_php."
-                else:
-                    path = site_info.get('path')
-                    if not path:
-                        local_success = False
-                        local_message = "Missing path in site_info for set_site_php."
-                    else:
-                        logger.info(f"WORKER: Set PHP for site '{path}' to '{php_v}'")
-                        results_log = []
-                        overall_success = True
-                        
-                        storage_ok = update_site_settings(path, {"php_version": php_v})
-                        if not storage_ok:
-                            results_log.append("Store:Fail")
-                            overall_success = False
-                        else:
-                            results_log.append("Store:OK")
-                        
-                        if overall_success:
-                            ngx_ok, ngx_msg = install_nginx_site(path) # Re-install Nginx config to use new PHP
-                            results_log.append(f"Nginx:{'OK' if ngx_ok else 'Fail'}")
-                            if not ngx_ok:
-                                overall_success = False
-                        else:
-                            results_log.append("Nginx:Skipped")
-                            
-                        local_success = overall_success
-                        local_message = f"Set PHP: {' | '.join(results_log)}"
-            
-            elif task_name == "save_php_ini": 
-                version = data.get("version")
-                settings = data.get("settings_dict")
-                if not version or not settings:
-                    local_success = False
-                    local_message = "Missing data for save_php_ini."
-                else:
-                    logger.info(f"WORKER: Saving INI settings for PHP {version}")
-                    results_log = []
-                    overall_success = True
-                    for k, v in settings.items():
-                        set_ok_cli = set_ini_value(version, k, v, sapi="cli")
-                        set_ok_fpm = set_ini_value(version, k, v, sapi="fpm") 
-                        if not (set_ok_cli and set_ok_fpm):
-                            results_log.append(f"Set {k}:Fail (CLI:{set_ok_cli}, FPM:{set_ok_fpm})")
-                            overall_success = False
-                        else:
-                            results_log.append(f"Set {k}:OK")
-                    
-                    if overall_success:
-                        logger.info(f"WORKER: Restarting PHP-FPM {version} after INI save...")
-                        rst_ok = restart_php_fpm(version)
-                        results_log.append(f"Restart:{'OK' if rst_ok else 'Fail'}")
-                        if not rst_ok:
-                            overall_success = False
-                    else:
-                        results_log.append("Restart:Skipped")
-                        
-                    local_success = overall_success
-                    local_message = f"Save INI: {' | '.join(results_log)}"
-            
-            elif task_name == "enable_ssl": 
-                site_info = data.get("site_info")
-                if not site_info:
-                    local_success = False
-                    local_message = "Missing site_info for enable_ssl."
-                else:
-                    domain = site_info.get('domain')
-                    path = site_info.get('path')
-                    results = []
-                    overall_ok = True
-                    
-                    if not domain or not path:
-                        local_success = False
-                        local_message = "Missing domain or path in site_info for enable_ssl."
-                        overall_ok = False # Prevent further steps
-                    
-                    if overall_ok:
-                        logger.info(f"WORKER: Enabling SSL for {domain}")
-                        cert_ok, cert_msg = generate_certificate(domain)
-                        results.append(f"Cert:{'OK' if cert_ok else 'Fail: ' + str(cert_msg)}")
-                        if not cert_ok:
-                            overall_ok = False
-                    
-                    store_ok_temp = False 
-                    if overall_ok:
-                        store_ok_temp = update_site_settings(path, {"https": True})
-                        results.append(f"Store:{'OK' if store_ok_temp else 'Fail'}")
-                        if not store_ok_temp:
-                            overall_ok = False
-                    elif domain and path : # Log skip if cert failed
-                        results.append("Store:Skipped (Cert generation failed)")
-
-                    if overall_ok:
-                        ngx_ok, ngx_msg = install_nginx_site(path)
-                        results.append(f"Nginx:{'OK' if ngx_ok else 'Fail'}")
-                        if not ngx_ok:
-                            overall_ok = False
-                    elif domain and path : # Log skip if cert or store failed
-                        results.append("Nginx:Skipped (Cert generation or Store update failed)")
-                            
-                    local_success = overall_ok
-                    local_message = f"Enable SSL: {' | '.join(results)}"
-            
-            elif task_name == "disable_ssl": 
-                site_info = data.get("site_info")
-                if not site_info:
-                    local_success = False
-                    local_message = "Missing site_info for disable_ssl."
-                else:
-                    domain = site_info.get('domain')
-                    path = site_info.get('path')
-                    results = []
-                    overall_ok = True # Assume success unless a critical step fails
-                    
-                    if not domain or not path:
-                        local_success = False
-                        local_message = "Missing domain or path in site_info for disable_ssl."
-                        overall_ok = False
-
-                    if overall_ok:
-                        logger.info(f"WORKER: Disabling SSL for {domain}")
-                        store_ok = update_site_settings(path, {"https": False})
-                        results.append(f"Store:{'OK' if store_ok else 'Fail'}")
-                        if not store_ok:
-                            overall_ok = False # If storing the new https=false state fails, it's a problem
-                    
-                    # Attempt to delete certificate regardless of store_ok, but log its status
-                    cert_del_ok, cert_del_msg = delete_certificate(domain) 
-                    results.append(f"DelCert:{'OK' if cert_del_ok else 'Fail'}")
-                    # Failure to delete cert might not be critical for overall "disable SSL" flow if store & Nginx update
-                    
-                    if overall_ok: # Only update Nginx if storing https=false was OK
-                        ngx_ok, ngx_msg = install_nginx_site(path)
-                        results.append(f"Nginx:{'OK' if ngx_ok else 'Fail'}")
-                        if not ngx_ok:
-                            overall_ok = False # If Nginx update fails, then SSL isn't truly disabled
-                    else:
-                        results.append("Nginx:Skipped (Store update failed)")
-                            
-                    local_success = overall_ok
-                    local_message = f"Disable SSL: {' | '.join(results)}"
-            
-            elif task_name == "toggle_php_extension": 
-                version = data.get("version")
-                ext_name = data.get("extension_name")
-                enable_state = data.get("enable_state")
-                if not version or not ext_name or enable_state is None:
-                    local_success = False
-                    local_message = "Missing data for toggle_php_extension."
-                else:
-                    action = "Enabling" if enable_state else "Disabling" 
-                    logger.info(f"WORKER: {action} extension '{ext_name}' for PHP {version}...")
-                    if enable_state:
-                        local_success, local_message = enable_extension(version, ext_name)
-                    else:
-                        local_success, local_message = disable_extension(version, ext_name)
-                    logger.info(f"WORKER: {action} task returned: success={local_success}, msg='{local_message}'")
-            
-            elif task_name == "configure_php_extension": 
-                version = data.get("version")
-                ext_name = data.get("extension_name")
-                logger.debug(f"WORKER: configure_php_extension handler started. v={version}, ext={ext_name}")
-                if not version or not ext_name:
-                    local_success = False
-                    local_message = "Missing data for configure_php_extension."
-                else:
-                    local_success, local_message = configure_extension(version, ext_name)
-                logger.debug(f"WORKER: configure_extension returned: success={local_success}, msg='{local_message}'")
-            
-            elif task_name == "start_mysql":
-                local_success = start_mysql()
-                local_message = "Bundled MySQL start attempt finished."
-            elif task_name == "stop_mysql":
-                local_success = stop_mysql()
-                local_message = "Bundled MySQL stop attempt finished."
-            
-            elif task_name == "start_redis":
-                local_success = start_redis()
-                local_message = "Bundled Redis start attempt finished."
-            elif task_name == "stop_redis":
-                local_success = stop_redis()
-                local_message = "Bundled Redis stop attempt finished."
-            
-            elif task_name == "start_minio":
-                local_success = start_minio()
-                local_message = "Bundled MinIO start attempt finished."
-            elif task_name == "stop_minio":
-                local_success = stop_minio()
-                local_message = "Bundled MinIO stop attempt finished."
-            
-            elif task_name == "start_postgres" or task_name == "stop_postgres":
-                instance_id = data.get("instance_id") 
-                action = "start" if task_name == "start_postgres" else "stop" 
-                if not instance_id:
-                    local_success = False
-                    local_message = f"Missing 'instance_id' for {task_name}."
-                    logger.error(local_message)
-                else:
-                    service_instance_config = get_service_config_by_id(instance_id)
-                    if not service_instance_config:
-                        local_success = False
-                        local_message = f"Could not load config for PostgreSQL instance ID '{instance_id}'."
-                        logger.error(local_message)
+    def _on_cancelled(self, task_name: str, data: dict):
+        self.resultReady.emit(task_name, dict(data), False, f"Task '{task_name}' was cancelled before it started.")
+
+    def _run_task(self, task_name: str, data: dict):
+        """Runs one task and returns (success, message, context_data); doWork() emits the result."""
+        local_success: bool = False
+        local_message: str = f"Unknown task '{task_name}'."
+        context_data: dict = data.copy()
+        spec = TASKS.get(task_name)
+
+        with task_metrics.track_task(task_name, detail=_task_detail(data),
+                                     timeout=spec.timeout if spec else None) as record:
+            try:
+                if spec:
+                    missing = [key for key in spec.inputs if _is_missing(data.get(key))]
+                    if missing:
+                        local_message = f"Missing {', '.join(repr(k) for k in missing)} for {task_name}."
+                        logger.error(f"WORKER: {local_message}")
                     else:
-                        logger.info(f"WORKER: Calling {task_name} for instance: {service_instance_config.get('name', instance_id)}")
-                        if task_name == "start_postgres":
-                            local_success = start_postgres(service_instance_config)
-                        else: # stop_postgres
-                            local_success = stop_postgres(service_instance_config)
-                        local_message = f"PostgreSQL instance '{service_instance_config.get('name', instance_id)}' {action} attempt finished."
-            
-            elif task_name == "install_node": 
-                version = data.get("version")
-                if not version:
-                    local_success = False
-                    local_message = "Missing version for install_node."
-                else:
-                    local_success, local_message = install_node_version(version)
-            
-            elif task_name == "uninstall_node": 
-                version = data.get("version")
-                if not version:
-                    local_success = False
-                    local_message = "Missing version for uninstall_node."
-                else:
-                    local_success, local_message = uninstall_node_version(version)
-            
-            elif task_name == "run_helper": 
-                action_arg = data.get("action") # Renamed from 'action' to avoid conflict
-                service_arg = data.get("service_name") 
-                if action_arg in ["status", "is-active", "is-enabled", "is-failed"] and service_arg:
-                    logger.info(f"WORKER: Calling run_root_helper_action: {action_arg} {service_arg}...")
-                    local_success, local_message = run_root_helper_action(action=action_arg, service_name=service_arg)
-                else:
-                    local_success = False
-                    local_message = "Unsupported action/service for run_helper."
-
-            logger.info(f"WORKER: Task '{task_name}' computation finished.")
-
-        except Exception as e:
-            logger.error(f"WORKER: EXCEPTION during task '{task_name}' for data {data}", exc_info=True)
-            local_success = False 
-            local_message = f"Unexpected error: {type(e).__name__} - {e}"
-
-        finally:
-            # Ensure context_data includes instance_id for PostgreSQL tasks for UI refresh
-            if task_name in ["start_postgres", "stop_postgres"] and "instance_id" in data:
-                context_data["instance_id"] = data["instance_id"]
-            
-            logger.info(f"WORKER: Emitting resultReady signal for task '{task_name}' (Success={local_success}) with context {context_data}")
-            self.resultReady.emit(task_name, context_data, local_success, local_message)
+                        result = spec.handler(self, task_name, data)
+                        local_success, local_message = result[0], result[1]
+                        if len(result) > 2: context_data.update(result[2])
+                logger.info(f"WORKER: Task '{task_name}' computation finished.")
+
+            except Exception as e:
+                logger.error(f"WORKER: EXCEPTION during task '{task_name}' for data {data}", exc_info=True)
+                local_success = False
+                local_message = f"Unexpected error: {type(e).__name__} - {e}"
+            record["success"], record["message"] = bool(local_success), local_message
+
+        # Ensure context_data includes instance_id for PostgreSQL tasks for UI refresh
+        if task_name in ["start_postgres", "stop_postgres"] and "instance_id" in data:
+            context_data["instance_id"] = data["instance_id"]
+        return local_success, local_message, context_data
+
+    # --- Site and Nginx Tasks ---
+    @register_task("uninstall_nginx", inputs=("path",), resources=_site_path_resources)
+    def _task_uninstall_nginx(self, task_name, data):
+        path = data["path"]
+        site_info = get_site_settings(path)
+        domain = site_info.get("domain") if site_info else None
+        results_log = []
+        overall_success = True
+        if domain:
+            logger.info(f"WORKER: Removing host '{domain}'...")
+            with task_metrics.step("hosts"):
+                rm_ok, rm_msg = run_root_helper_action(action="remove_host_entry", domain=domain)
+            results_log.append(f"HostsRm:{'OK' if rm_ok else 'Fail'}")
+        else:
+            results_log.append("HostsRm:Skipped (no domain)")
+
+        logger.info(f"WORKER: Calling uninstall_nginx_site for '{path}'...")
+        ngx_ok, ngx_msg = uninstall_nginx_site(path)
+        results_log.append(f"NginxUninstall:{'OK' if ngx_ok else 'Fail'}")
+        if not ngx_ok:
+            overall_success = False
+        return overall_success, f"Uninstall Site: {' | '.join(results_log)}"
+
+    @register_task("install_nginx", inputs=("path",), resources=_site_path_resources)
+    def _task_install_nginx(self, task_name, data):
+        path = data["path"]
+        results_log = []
+        logger.info(f"WORKER: Calling install_nginx_site for '{path}'...")
+        ngx_ok, ngx_msg = install_nginx_site(path)
+        results_log.append(f"NginxInstall:{'OK' if ngx_ok else 'Fail'}")
+        overall_success = bool(ngx_ok)
+
+        if overall_success:
+            site_info = get_site_settings(path)
+            domain = site_info.get("domain") if site_info else None
+            if domain:
+                logger.info(f"WORKER: Adding host '{domain}'...")
+                with task_metrics.step("hosts"):
+                    add_ok, add_msg = run_root_helper_action(action="add_host_entry", domain=domain, ip="127.0.0.1")
+                results_log.append(f"HostsAdd:{'OK' if add_ok else 'Fail'}")
+                if not add_ok:
+                    overall_success = False
+            else:
+                results_log.append("HostsAdd:Skipped (no domain)")
+        else:
+            results_log.append("HostsAdd:Skipped (Nginx install failed)")
+        return overall_success, f"Install Site: {' | '.join(results_log)}"
+
+    @register_task("start_internal_nginx", "stop_internal_nginx", lane=LANE_INTERACTIVE,
+                   resources=_service_resources("nginx"), timeout=TIMEOUT_SERVICE)
+    def _task_internal_nginx(self, task_name, data):
+        if task_name == "start_internal_nginx":
+            return start_internal_nginx()
+        return stop_internal_nginx()
+
+    @register_task("set_nginx_profile", inputs=("profile",), resources=_service_resources("nginx"))
+    def _task_set_nginx_profile(self, task_name, data):
+        logger.info(f"WORKER: Setting Nginx performance profile '{data['profile']}'...")
+        return set_nginx_profile(data["profile"])
+
+    @register_task("update_site_domain", inputs=("site_info", "new_domain"), resources=_site_info_resources)
+    def _task_update_site_domain(self, task_name, data):
+        site_info = data["site_info"]
+        new_domain = data["new_domain"]
+        path = site_info.get('path')
+        old_domain = site_info.get('domain')
+        if not path or not old_domain:
+            return False, "Missing path or old_domain in site_info."
+
+        results_log = []
+        overall_success = True
+        logger.info(f"WORKER: Update domain for site '{path}': from '{old_domain}' to '{new_domain}'")
+        with task_metrics.step("store"):
+            store_ok = update_site_settings(path, {"domain": new_domain})
+        if not store_ok:
+            results_log.append("Store:Fail")
+            overall_success = False
+        else:
+            results_log.append("Store:OK")
+
+        if overall_success and old_domain:
+            with task_metrics.step("hosts"):
+                rm_ok, rm_msg = run_root_helper_action("remove_host_entry", domain=old_domain)
+            results_log.append(f"HostsRm:{'OK' if rm_ok else 'Fail'}")
+            # Not critical for overall_success if old host removal fails, but good to log
+
+        if overall_success:
+            with task_metrics.step("hosts"):
+                add_ok, add_msg = run_root_helper_action("add_host_entry", domain=new_domain, ip="127.0.0.1")
+            results_log.append(f"HostsAdd:{'OK' if add_ok else 'Fail'}")
+            if not add_ok:
+                overall_success = False
+
+        if overall_success:
+            ngx_ok, ngx_msg = install_nginx_site(path)
+            results_log.append(f"Nginx:{'OK' if ngx_ok else 'Fail'}")
+            if not ngx_ok:
+                overall_success = False
+        else: # If store, host rm, or host add failed
+            results_log.append("Nginx:Skipped")
+        return overall_success, f"Update Domain: {' | '.join(results_log)}"
+
+    @register_task("set_site_php", inputs=("site_info", "new_php_version"), resources=_site_info_resources)
+    def _task_set_site_php(self, task_name, data):
+        path = data["site_info"].get('path')
+        php_v = data["new_php_version"]
+        if not path:
+            return False, "Missing path in site_info for set_site_php."
+
+        logger.info(f"WORKER: Set PHP for site '{path}' to '{php_v}'")
+        results_log = []
+        overall_success = True
+        with task_metrics.step("store"):
+            storage_ok = update_site_settings(path, {"php_version": php_v})
+        if not storage_ok:
+            results_log.append("Store:Fail")
+            overall_success = False
+        else:
+            results_log.append("Store:OK")
+
+        if overall_success:
+            ngx_ok, ngx_msg = install_nginx_site(path) # Re-install Nginx config to use new PHP
+            results_log.append(f"Nginx:{'OK' if ngx_ok else 'Fail'}")
+            if not ngx_ok:
+                overall_success = False
+        else:
+            results_log.append("Nginx:Skipped")
+        return overall_success, f"Set PHP: {' | '.join(results_log)}"
+
+    @register_task("set_site_php_pool", inputs=("site_info",), resources=_site_info_resources)
+    def _task_set_site_php_pool(self, task_name, data):
+        path = data["site_info"].get('path')
+        php_pool = data.get("php_pool") or None  # None/{} puts the site back on the shared pool
+        if not path:
+            return False, "Missing path in site_info for set_site_php_pool."
+
+        logger.info(f"WORKER: Set PHP-FPM pool for site '{path}' to {php_pool}")
+        results_log = []
+        with task_metrics.step("store"):
+            overall_success = update_site_settings(path, {"php_pool": php_pool})
+        results_log.append(f"Store:{'OK' if overall_success else 'Fail'}")
+
+        if overall_success:
+            ngx_ok, ngx_msg = install_nginx_site(path)  # Writes the pool, reloads FPM, routes Nginx to it
+            results_log.append(f"Nginx:{'OK' if ngx_ok else 'Fail'}")
+            overall_success = ngx_ok
+        else:
+            results_log.append("Nginx:Skipped")
+        return overall_success, f"Set PHP pool: {' | '.join(results_log)}"
+
+    @register_task("set_sites_php", inputs=("site_paths", "new_php_version"),
+                   resources=lambda data: {_site_key(path) for path in data.get("site_paths") or []})
+    def _task_set_sites_php(self, task_name, data):
+        site_paths = data["site_paths"]
+        php_v = data["new_php_version"]
+        logger.info(f"WORKER: Set PHP for {len(site_paths)} site(s) to '{php_v}'")
+        results_log = []
+        # One sites.json write for the whole batch
+        with task_metrics.step("store"):
+            overall_success = update_many({path: {"php_version": php_v} for path in site_paths})
+        results_log.append(f"Store:{'OK' if overall_success else 'Fail'}")
+
+        if overall_success:
+            failed_sites = []
+            for path in site_paths:
+                ngx_ok, ngx_msg = install_nginx_site(path, reload=False)
+                if not ngx_ok: failed_sites.append(Path(path).name)
+            results_log.append(f"Nginx:{'OK' if not failed_sites else 'Fail (' + ', '.join(failed_sites) + ')'}")
+            # One reload for the whole batch
+            reload_ok, reload_msg = reload_internal_nginx()
+            results_log.append(f"Reload:{'OK' if reload_ok else 'Fail'}")
+            overall_success = not failed_sites and reload_ok
+        else:
+            results_log.append("Nginx:Skipped")
+        return overall_success, f"Set PHP ({len(site_paths)} sites): {' | '.join(results_log)}"
+
+    # --- SSL Tasks ---
+    @register_task("enable_ssl", inputs=("site_info",), resources=_site_info_resources)
+    def _task_enable_ssl(self, task_name, data):
+        domain = data["site_info"].get('domain')
+        path = data["site_info"].get('path')
+        if not domain or not path:
+            return False, "Missing domain or path in site_info for enable_ssl."
+
+        results = []
+        logger.info(f"WORKER: Enabling SSL for {domain}")
+        with task_metrics.step("cert"):
+            cert_ok, cert_msg = generate_certificate(domain)
+        results.append(f"Cert:{'OK' if cert_ok else 'Fail: ' + str(cert_msg)}")
+        overall_ok = bool(cert_ok)
+
+        if overall_ok:
+            with task_metrics.step("store"):
+                store_ok = update_site_settings(path, {"https": True})
+            results.append(f"Store:{'OK' if store_ok else 'Fail'}")
+            if not store_ok:
+                overall_ok = False
+        else: # Log skip if cert failed
+            results.append("Store:Skipped (Cert generation failed)")
+
+        if overall_ok:
+            ngx_ok, ngx_msg = install_nginx_site(path)
+            results.append(f"Nginx:{'OK' if ngx_ok else 'Fail'}")
+            if not ngx_ok:
+                overall_ok = False
+        else: # Log skip if cert or store failed
+            results.append("Nginx:Skipped (Cert generation or Store update failed)")
+        return overall_ok, f"Enable SSL: {' | '.join(results)}"
+
+    @register_task("disable_ssl", inputs=("site_info",), resources=_site_info_resources)
+    def _task_disable_ssl(self, task_name, data):
+        domain = data["site_info"].get('domain')
+        path = data["site_info"].get('path')
+        if not domain or not path:
+            return False, "Missing domain or path in site_info for disable_ssl."
+
+        results = []
+        logger.info(f"WORKER: Disabling SSL for {domain}")
+        with task_metrics.step("store"):
+            store_ok = update_site_settings(path, {"https": False})
+        results.append(f"Store:{'OK' if store_ok else 'Fail'}")
+        overall_ok = bool(store_ok) # If storing the new https=false state fails, it's a problem
+
+        # Attempt to delete certificate regardless of store_ok, but log its status
+        with task_metrics.step("cert"):
+            cert_del_ok, cert_del_msg = delete_certificate(domain)
+        results.append(f"DelCert:{'OK' if cert_del_ok else 'Fail'}")
+        # Failure to delete cert might not be critical for overall "disable SSL" flow if store & Nginx update
+
+        if overall_ok: # Only update Nginx if storing https=false was OK
+            ngx_ok, ngx_msg = install_nginx_site(path)
+            results.append(f"Nginx:{'OK' if ngx_ok else 'Fail'}")
+            if not ngx_ok:
+                overall_ok = False # If Nginx update fails, then SSL isn't truly disabled
+        else:
+            results.append("Nginx:Skipped (Store update failed)")
+        return overall_ok, f"Disable SSL: {' | '.join(results)}"
+
+    # --- PHP Tasks ---
+    @register_task("start_php_fpm", "stop_php_fpm", inputs=("version",), lane=LANE_INTERACTIVE,
+                   resources=_php_version_resources, timeout=TIMEOUT_SERVICE)
+    def _task_php_fpm(self, task_name, data):
+        version = data["version"]
+        if task_name == "start_php_fpm":
+            return start_php_fpm(version), f"PHP FPM {version} start attempt finished."
+        return stop_php_fpm(version), f"PHP FPM {version} stop attempt finished."
+
+    @register_task("save_php_ini", inputs=("version", "settings_dict"), resources=_php_version_resources)
+    def _task_save_php_ini(self, task_name, data):
+        version = data["version"]
+        settings = data["settings_dict"]
+        logger.info(f"WORKER: Saving INI settings for PHP {version}")
+        results_log = []
+        overall_success = True
+        with task_metrics.step("ini_write"):
+            set_results = set_ini_values(version, settings, sapis=("cli", "fpm"))
+        results_log.append(f"Set {', '.join(settings)}")
+        for sapi, set_ok in set_results.items():
+            results_log.append(f"{sapi.upper()}:{'OK' if set_ok else 'Fail'}")
+            if not set_ok: overall_success = False
+
+        if overall_success:
+            logger.info(f"WORKER: Reloading PHP-FPM {version} after INI save...")
+            with task_metrics.step("fpm_reload"):
+                reload_ok = reload_php_fpm(version)
+            results_log.append(f"Reload:{'OK' if reload_ok else 'Fail'}")
+            if not reload_ok:
+                overall_success = False
+        else:
+            results_log.append("Reload:Skipped")
+        return overall_success, f"Save INI: {' | '.join(results_log)}"
+
+    @register_task("toggle_php_extension", inputs=("version", "extension_name", "enable_state"),
+                   resources=_php_version_resources)
+    def _task_toggle_php_extension(self, task_name, data):
+        version = data["version"]
+        ext_name = data["extension_name"]
+        enable_state = data["enable_state"]
+        action = "Enabling" if enable_state else "Disabling"
+        logger.info(f"WORKER: {action} extension '{ext_name}' for PHP {version}...")
+        if enable_state:
+            local_success, local_message = enable_extension(version, ext_name)
+        else:
+            local_success, local_message = disable_extension(version, ext_name)
+        logger.info(f"WORKER: {action} task returned: success={local_success}, msg='{local_message}'")
+        return local_success, local_message
+
+    @register_task("configure_php_extension", inputs=("version", "extension_name"),
+                   resources=_php_version_resources)
+    def _task_configure_php_extension(self, task_name, data):
+        version = data["version"]
+        ext_name = data["extension_name"]
+        logger.debug(f"WORKER: configure_php_extension handler started. v={version}, ext={ext_name}")
+        local_success, local_message = configure_extension(version, ext_name)
+        logger.debug(f"WORKER: configure_extension returned: success={local_success}, msg='{local_message}'")
+        return local_success, local_message
+
+    # --- Bundled Service Tasks ---
+    @register_task("start_mysql", "stop_mysql", lane=LANE_INTERACTIVE,
+                   resources=_service_resources("mysql"), timeout=TIMEOUT_SERVICE)
+    def _task_mysql(self, task_name, data):
+        if task_name == "start_mysql":
+            return start_mysql(), "Bundled MySQL start attempt finished."
+        return stop_mysql(), "Bundled MySQL stop attempt finished."
+
+    @register_task("start_redis", "stop_redis", lane=LANE_INTERACTIVE,
+                   resources=_service_resources("redis"), timeout=TIMEOUT_SERVICE)
+    def _task_redis(self, task_name, data):
+        if task_name == "start_redis":
+            return start_redis(), "Bundled Redis start attempt finished."
+        return stop_redis(), "Bundled Redis stop attempt finished."
+
+    @register_task("start_minio", "stop_minio", lane=LANE_INTERACTIVE,
+                   resources=_service_resources("minio"), timeout=TIMEOUT_SERVICE)
+    def _task_minio(self, task_name, data):
+        if task_name == "start_minio":
+            return start_minio(), "Bundled MinIO start attempt finished."
+        return stop_minio(), "Bundled MinIO stop attempt finished."
+
+    @register_task("start_postgres", "stop_postgres", inputs=("instance_id",), lane=LANE_INTERACTIVE,
+                   resources=_postgres_resources, timeout=TIMEOUT_SERVICE)
+    def _task_postgres(self, task_name, data):
+        instance_id = data["instance_id"]
+        action = "start" if task_name == "start_postgres" else "stop"
+        service_instance_config = get_service_config_by_id(instance_id)
+        if not service_instance_config:
+            message = f"Could not load config for PostgreSQL instance ID '{instance_id}'."
+            logger.error(message)
+            return False, message
+
+        logger.info(f"WORKER: Calling {task_name} for instance: {service_instance_config.get('name', instance_id)}")
+        if task_name == "start_postgres":
+            local_success = start_postgres(service_instance_config)
+        else: # stop_postgres
+            local_success = stop_postgres(service_instance_config)
+        return local_success, f"PostgreSQL instance '{service_instance_config.get('name', instance_id)}' {action} attempt finished."
+
+    @register_task("start_services", lane=LANE_INTERACTIVE, resources=_start_services_resources,
+                   timeout=2 * TIMEOUT_SERVICE)
+    def _task_start_services(self, task_name, data):
+        """
+        Starts data["tasks"] ([{"task_name", "data"}, ...]) concurrently via the service
+        orchestrator. Each finished service is reported through resultReady as if it had
+        been its own task, so the pages refresh service by service.
+        """
+        tasks = data.get("tasks") or []
+        plan = build_start_plan(tasks)
+        if not plan:
+            return True, "No services to start.", {"services": [], "failed": []}
+
+        def _report(task_name, task_data, ok, message):
+            logger.info(f"WORKER: Emitting resultReady signal for task '{task_name}' (Success={ok}) from start_services")
+            self.resultReady.emit(task_name, dict(task_data), ok, message)
+
+        started_at = time.monotonic()
+        results = run_start_plan(plan, lambda t, d: self._run_task(t, d)[:2], on_result=_report)
+        failed = [key for key, (ok, _msg) in results.items() if not ok]
+        elapsed = time.monotonic() - started_at
+        message = f"Started {len(results) - len(failed)}/{len(results)} services in {elapsed:.1f}s"
+        if failed: message += f" (failed: {', '.join(failed)})"
+        return not failed, message, {"services": list(plan), "failed": failed}
+
+    # --- Node Tasks ---
+    @register_task("install_node", inputs=("version",), lane=LANE_LONG, resources=_nvm_resources,
+                   timeout=TIMEOUT_INSTALL)
+    def _task_install_node(self, task_name, data):
+        return install_node_version(data["version"])
+
+    @register_task("uninstall_node", inputs=("version",), lane=LANE_LONG, resources=_nvm_resources,
+                   timeout=TIMEOUT_INSTALL)
+    def _task_uninstall_node(self, task_name, data):
+        return uninstall_node_version(data["version"])
+
+    # --- System Tasks ---
+    @register_task("run_helper", inputs=("action", "service_name"), lane=LANE_INTERACTIVE,
+                   timeout=TIMEOUT_SERVICE)
+    def _task_run_helper(self, task_name, data):
+        action_arg = data["action"] # Renamed from 'action' to avoid conflict
+        service_arg = data["service_name"]
+        if action_arg not in ["status", "is-active", "is-enabled", "is-failed"]:
+            return False, "Unsupported action/service for run_helper."
+        logger.info(f"WORKER: Calling run_root_helper_action: {action_arg} {service_arg}...")
+        return run_root_helper_action(action=action_arg, service_name=service_arg)
@@ -47,6 +47,7 @@ class ColorLogFormatter(logging.Formatter):
 # --- Attempt to import config first for logging setup ---
 try:
     from grazr.core import config
+    config.ensure_base_dirs()  # GUI start-up is the main bootstrap point
 except ImportError as e:
     print(f"FATAL: Failed to import core.config: {e}", file=sys.stderr)
     config = None
@@ -142,6 +143,12 @@ def application_cleanup():
     logger.info("MAIN_APP: Starting application cleanup...")
 
     global main_window_instance
+    worker = getattr(main_window_instance, 'worker', None)
+    if worker and hasattr(worker, 'shutdown'):
+        logger.info("MAIN_APP: Cancelling queued worker tasks...")
+        if not worker.shutdown(wait_timeout=2):  # Running tasks are daemon threads; don't block exit on them
+            logger.warning("MAIN_APP: Some worker tasks were still running at exit.")
+
     if main_window_instance and hasattr(main_window_instance, 'thread') and main_window_instance.thread.isRunning():
         logger.info("MAIN_APP: Quitting worker thread...")
         main_window_instance.thread.quit()
@@ -161,6 +168,12 @@ def application_cleanup():
     else:
         logger.warning("MAIN_APP: Process manager or stop_all_processes not available for cleanup.")
 
+    try:
+        from grazr.core import resolver_daemon
+        resolver_daemon.stop_resolver()
+    except Exception as e:
+        logger.warning(f"MAIN_APP: Error stopping shim resolver: {e}")
+
     logger.info("MAIN_APP: Application cleanup finished.")
 
 # --- Main Application Execution ---
@@ -201,6 +214,7 @@ if __name__ == "__main__":
         show_action = QAction("Show/Hide Window")
         start_all_action = QAction("Start All Services")
         stop_all_action = QAction("Stop All Services")
+        diagnostics_action = QAction("Diagnostics...")
         quit_action = QAction("Quit Grazr")
 
         quit_action.triggered.connect(app.quit)
@@ -210,6 +224,8 @@ if __name__ == "__main__":
         tray_menu.addAction(start_all_action)
         tray_menu.addAction(stop_all_action)
         tray_menu.addSeparator()
+        tray_menu.addAction(diagnostics_action)
+        tray_menu.addSeparator()
         tray_menu.addAction(quit_action)
 
         tray_icon.setContextMenu(tray_menu)
@@ -225,6 +241,20 @@ if __name__ == "__main__":
     if style_sheet_content: app.setStyleSheet(style_sheet_content)
     logger.info("Applied global stylesheet.")
 
+    # --- Refresh Shim Resolution Tables (PHP bundles may have changed since last run) ---
+    try:
+        from grazr.core import shim_tables
+        shim_tables.refresh_all_shim_tables()
+    except Exception as e:
+        logger.warning(f"Could not refresh shim resolution tables: {e}")
+
+    # --- Start Optional Shim Resolver (skipped if the systemd user unit already serves it) ---
+    try:
+        from grazr.core import resolver_daemon
+        if resolver_daemon.start_resolver_in_background(): logger.info("Shim resolver started.")
+    except Exception as e:
+        logger.warning(f"Could not start shim resolver: {e}")
+
     # --- Create the Main Window ---
     logger.info("Creating MainWindow instance...")
     try:
@@ -244,6 +274,7 @@ if __name__ == "__main__":
         show_action.triggered.connect(window.toggle_visibility)
         start_all_action.triggered.connect(window.on_start_all_services_clicked)
         stop_all_action.triggered.connect(window.on_stop_all_services_clicked)
+        diagnostics_action.triggered.connect(window.show_diagnostics)
         tray_icon.activated.connect(lambda reason: window.toggle_visibility() if reason == QSystemTrayIcon.ActivationReason.Trigger else None)
 
         # --- Connect Application Cleanup Logic ---
@@ -17,6 +17,9 @@ except ImportError as e:
         def start_process(*args, **kwargs): return False
         def stop_process(*args, **kwargs): return True
         def get_process_status(*args, **kwargs): return "stopped"
+        def wait_until_running(*args, **kwargs): return "stopped"
+        def wait_until_ready(*args, **kwargs): return "stopped"
+        def get_ready_status(*args, **kwargs): return "stopped"
         def get_process_pid(*args, **kwargs): return None
     process_manager = ProcessManagerDummy()
     class ConfigDummy: # Define necessary constants used locally
@@ -102,11 +105,9 @@ def start_minio():
         print(f"MinIO Manager Error: Failed to issue start command via Process Manager.")
         return False # Popen itself failed
 
-    # If launch command was issued, verify status after a delay
-    # process_manager now uses Popen.poll() for this process_id
-    print(f"MinIO Manager: Launch command issued. Verifying process status...")
-    time.sleep(1.5) # Give MinIO a bit longer to potentially fail
-    status = process_manager.get_process_status(process_id)
+    # MinIO writes no PID file; its health endpoint answers once the API is usable
+    print(f"MinIO Manager: Launch command issued. Waiting for the health endpoint...")
+    status = process_manager.wait_until_ready(process_id, "minio", timeout=15, port=api_port)
 
     if status != "running":
          print(f"MinIO Manager Error: {process_id} not running after start (Status: {status}). Check log: {log_path}")
@@ -131,7 +132,7 @@ def stop_minio(): # (Unchanged - process_manager handles the Popen logic)
 def get_minio_status():
      """Gets the status of the bundled MinIO process via process_manager."""
      process_id = config.MINIO_PROCESS_ID
-     return process_manager.get_process_status(process_id)
+     return process_manager.get_ready_status(process_id, "minio", port=config.MINIO_API_PORT)
 
 def get_minio_version():
      """Gets the bundled MinIO server version by running the binary."""
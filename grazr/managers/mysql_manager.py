@@ -248,8 +248,9 @@ def start_mysql():
 
     if success:
         print(f"MySQL Manager: Start command issued. Verifying status...")
-        time.sleep(2.5) # Give MySQL more time
-        status = process_manager.get_process_status(process_id)
+        # Returns once mysqld accepts connections on its socket or exits; first start-up can be slow
+        status = process_manager.wait_until_ready(process_id, "mysql", timeout=60,
+                                                  socket_path=config.INTERNAL_MYSQL_SOCK_FILE)
         if status != "running": print(f"MySQL Error: {process_id} failed (Status:{status}). Log:{log_path}"); return False
         else: print(f"MySQL Manager Info: {process_id} confirmed running."); return True
     else: print(f"MySQL Manager: Failed start command."); return False
@@ -270,7 +271,7 @@ def stop_mysql():
 def get_mysql_status():
      """Gets the status of the bundled MySQL process via process_manager."""
      process_id = config.MYSQL_PROCESS_ID
-     return process_manager.get_process_status(process_id)
+     return process_manager.get_ready_status(process_id, "mysql", socket_path=config.INTERNAL_MYSQL_SOCK_FILE)
 
 # --- Example Usage ---
 if __name__ == "__main__":
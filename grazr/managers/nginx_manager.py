@@ -7,6 +7,12 @@ import shutil
 import re
 import tempfile
 import logging
+import threading
+import contextlib
+import hashlib
+from collections import OrderedDict
+
+from . import nginx_templates
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +22,19 @@ try:
     from ..core import config
     # Import process manager from core
     from ..core import process_manager
+    from ..core.task_executor import resource_lock, NGINX_RELOAD_LOCK
+    from ..core import task_metrics
     # Import other managers using relative paths within managers package
-    from .site_manager import get_site_settings
+    from .site_manager import get_site_settings, load_sites
     from .php_manager import (
         start_php_fpm,
         get_php_fpm_socket_path,
         detect_bundled_php_versions,
-        get_default_php_version
+        get_default_php_version,
+        site_pool_name,
+        get_site_pool_socket_path,
+        apply_site_pools,
+        request_php_fpm_reload
         )
     from .ssl_manager import get_cert_path, get_key_path, check_certificates_exist
 except ImportError as e:
@@ -33,22 +45,82 @@ except ImportError as e:
          def start_process(*args, **kwargs): return False
          def stop_process(*args, **kwargs): return True
          def get_process_status(*args, **kwargs): return "stopped"
+         def wait_until_running(*args, **kwargs): return "stopped"
+         def wait_until_ready(*args, **kwargs): return "stopped"
+         def get_ready_status(*args, **kwargs): return "stopped"
          def get_process_pid(*args, **kwargs): return None
      process_manager = ProcessManagerDummy()
+     NGINX_RELOAD_LOCK = "nginx-reload"
+     def resource_lock(name): return threading.RLock()
+     class TaskMetricsDummy:
+         @staticmethod
+         def step(name): return contextlib.nullcontext()
+     task_metrics = TaskMetricsDummy()
      def get_site_settings(*args, **kwargs): return None
+     def load_sites(): return []
      def start_php_fpm(*args, **kwargs): return True
      def get_php_fpm_socket_path(*args, **kwargs): return "/tmp/php.sock"
      def detect_bundled_php_versions(): return ["8.3"]
      def get_default_php_version(): return "8.3"
+     def site_pool_name(domain): return f"site-{domain}"
+     def get_site_pool_socket_path(*args, **kwargs): return None
+     def apply_site_pools(*args, **kwargs): return True, "Not imported", False
+     def request_php_fpm_reload(*args, **kwargs): return True
      def get_cert_path(d): return Path(f"/tmp/{d}.pem")
      def get_key_path(d): return Path(f"/tmp/{d}-key.pem")
      def check_certificates_exist(d): return True
      # Dummy config constants if config import fails
-     class ConfigDummy: CONFIG_DIR=Path.home()/'error'; BUNDLES_DIR=Path.home()/'error'; NGINX_PROCESS_ID="error"; SITE_TLD="err"; DEFAULT_PHP="err"; INTERNAL_NGINX_PID_FILE=Path("/tmp/err.pid"); NGINX_BINARY=Path("/err"); INTERNAL_NGINX_CONF_FILE=Path("/err"); INTERNAL_LOG_DIR=CONFIG_DIR/'logs'; INTERNAL_NGINX_ERROR_LOG=INTERNAL_LOG_DIR/'err.log'; INTERNAL_NGINX_ACCESS_LOG=INTERNAL_LOG_DIR/'err.log'; BUNDLED_NGINX_CONF_DIR=BUNDLES_DIR/'err'; INTERNAL_SITES_ENABLED=CONFIG_DIR/'err'; INTERNAL_NGINX_TEMP_DIR=CONFIG_DIR/'err'; INTERNAL_CLIENT_BODY_TEMP=INTERNAL_NGINX_TEMP_DIR/'err'; INTERNAL_PROXY_TEMP=INTERNAL_NGINX_TEMP_DIR/'err'; INTERNAL_FASTCGI_TEMP=INTERNAL_NGINX_TEMP_DIR/'err'; INTERNAL_UWSGI_TEMP=INTERNAL_NGINX_TEMP_DIR/'err'; INTERNAL_SCGI_TEMP=INTERNAL_NGINX_TEMP_DIR/'err'; INTERNAL_SITES_AVAILABLE=CONFIG_DIR/'err';
+     class ConfigDummy: CONFIG_DIR=Path.home()/'error'; BUNDLES_DIR=Path.home()/'error'; NGINX_PROCESS_ID="error"; SITE_TLD="err"; DEFAULT_PHP="err"; INTERNAL_NGINX_PID_FILE=Path("/tmp/err.pid"); NGINX_BINARY=Path("/err"); INTERNAL_NGINX_CONF_FILE=Path("/err"); INTERNAL_LOG_DIR=CONFIG_DIR/'logs'; INTERNAL_NGINX_ERROR_LOG=INTERNAL_LOG_DIR/'err.log'; INTERNAL_NGINX_ACCESS_LOG=INTERNAL_LOG_DIR/'err.log'; BUNDLED_NGINX_CONF_DIR=BUNDLES_DIR/'err'; INTERNAL_SITES_ENABLED=CONFIG_DIR/'err'; INTERNAL_NGINX_TEMP_DIR=CONFIG_DIR/'err'; INTERNAL_CLIENT_BODY_TEMP=INTERNAL_NGINX_TEMP_DIR/'err'; INTERNAL_PROXY_TEMP=INTERNAL_NGINX_TEMP_DIR/'err'; INTERNAL_FASTCGI_TEMP=INTERNAL_NGINX_TEMP_DIR/'err'; INTERNAL_UWSGI_TEMP=INTERNAL_NGINX_TEMP_DIR/'err'; INTERNAL_SCGI_TEMP=INTERNAL_NGINX_TEMP_DIR/'err'; INTERNAL_SITES_AVAILABLE=CONFIG_DIR/'err'; INTERNAL_NGINX_STAGING_DIR=CONFIG_DIR/'err'; NGINX_SITE_MODE="files"; NGINX_SITE_MAP_CONF_NAME="00-grazr-site-map.conf"; NGINX_PHP_UPSTREAMS_CONF_NAME="00-grazr-php-upstreams.conf";
      config = ConfigDummy()
 
-def _get_default_nginx_config_content():
-    """Generates the content for the main internal nginx.conf file."""
+# --- Performance Profiles (main nginx.conf) ---
+# worker_connections is derived from the open-files limit (a proxied request holds two
+# descriptors) and capped at max_connections. raise_nofile sets worker_rlimit_nofile to
+# the hard limit, which an unprivileged master may raise its workers to.
+NGINX_PROFILE_DEFAULT = "default"
+NGINX_PROFILES = {
+    "default": {
+        "label": "Default", "description": "Balanced settings for everyday development.",
+        "worker_processes": "auto", "max_connections": 4096, "raise_nofile": False, "multi_accept": False,
+        "open_file_cache": "max=2000 inactive=20s", "open_file_cache_valid": "2s",
+        "fastcgi_buffers": "16 16k", "fastcgi_buffer_size": "32k", "gzip_comp_level": 5,
+        "reuseport": False, "access_log_buffer": "buffer=32k flush=5s", "keepalive_requests": 1000,
+    },
+    "load-test": {
+        "label": "Load test", "description": "Keeps Nginx out of the way when benchmarking an app: more connections, longer caches, cheap gzip.",
+        "worker_processes": "auto", "max_connections": 65535, "raise_nofile": True, "multi_accept": True,
+        "open_file_cache": "max=10000 inactive=60s", "open_file_cache_valid": "30s",
+        "fastcgi_buffers": "32 32k", "fastcgi_buffer_size": "64k", "gzip_comp_level": 1,
+        "reuseport": True, "access_log_buffer": "buffer=64k flush=5s", "keepalive_requests": 10000,
+    },
+    "low-memory": {
+        "label": "Low memory", "description": "One worker and small buffers for machines short on RAM.",
+        "worker_processes": "1", "max_connections": 512, "raise_nofile": False, "multi_accept": False,
+        "open_file_cache": None, "open_file_cache_valid": None,
+        "fastcgi_buffers": "8 8k", "fastcgi_buffer_size": "16k", "gzip_comp_level": 1,
+        "reuseport": False, "access_log_buffer": "buffer=8k flush=5s", "keepalive_requests": 100,
+    },
+}
+NGINX_GZIP_TYPES = ("text/plain text/css text/xml text/javascript application/javascript application/json "
+                    "application/xml application/rss+xml application/manifest+json image/svg+xml")
+NGINX_MAX_NOFILE = 1048576  # Used when the hard limit is unlimited
+_PROFILE_MARKER_RE = re.compile(r'^# Grazr performance profile: (\S+)', re.MULTILINE)
+
+
+def _nofile_limits():
+    """(soft, hard) RLIMIT_NOFILE of this process, which Nginx inherits; unlimited -> NGINX_MAX_NOFILE."""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (ImportError, ValueError, OSError):
+        return 1024, 1024
+    if hard < 0 or hard > NGINX_MAX_NOFILE: hard = NGINX_MAX_NOFILE
+    if soft < 0 or soft > hard: soft = hard
+    return soft, hard
+
+
+def _get_default_nginx_config_content(profile_name=NGINX_PROFILE_DEFAULT):
+    """Generates the content for the main internal nginx.conf file with a performance profile."""
     # Ensure directories exist using helper from config
     config.ensure_dir(config.LOG_DIR)
     config.ensure_dir(config.RUN_DIR) # Ensure run dir exists for PID file
@@ -76,16 +148,32 @@ def _get_default_nginx_config_content():
     uwsgi_temp_path = str(config.INTERNAL_UWSGI_TEMP.resolve())
     scgi_temp_path = str(config.INTERNAL_SCGI_TEMP.resolve())
 
+    profile = NGINX_PROFILES.get(profile_name) or NGINX_PROFILES[NGINX_PROFILE_DEFAULT]
+    soft_nofile, hard_nofile = _nofile_limits()
+    nofile = hard_nofile if profile["raise_nofile"] else soft_nofile
+    worker_connections = max(256, min(profile["max_connections"], nofile // 2))
+    rlimit_line = f"worker_rlimit_nofile {nofile};\n" if profile["raise_nofile"] else ""
+    multi_accept_line = "    multi_accept on;\n" if profile["multi_accept"] else ""
+    if profile["open_file_cache"]:
+        open_file_cache_lines = (f"    open_file_cache {profile['open_file_cache']};\n"
+                                 f"    open_file_cache_valid {profile['open_file_cache_valid']};\n"
+                                 "    open_file_cache_min_uses 1;\n"
+                                 "    open_file_cache_errors on;\n")
+    else:
+        open_file_cache_lines = "    open_file_cache off;\n"
+    reuseport = " reuseport" if profile["reuseport"] else ""
+
     # Basic Nginx configuration
-    content = f"""
+    content = f"""# Grazr performance profile: {profile_name if profile_name in NGINX_PROFILES else NGINX_PROFILE_DEFAULT}
+# Generated by Grazr (worker_connections from open-files limit {nofile})
 {user}
-worker_processes auto;
-pid {pid_path}; # <<< Use path from config
+worker_processes {profile['worker_processes']};
+{rlimit_line}pid {pid_path}; # <<< Use path from config
 error_log {error_log_path} warn;
 
 events {{
-    worker_connections 1024;
-}}
+    worker_connections {worker_connections};
+{multi_accept_line}}}
 
 http {{
     include       "{mime_types_path}";
@@ -95,14 +183,20 @@ http {{
                       '$status $body_bytes_sent "$http_referer" '
                       '"$http_user_agent" "$http_x_forwarded_for"';
 
-    access_log {access_log_path} main;
+    access_log {access_log_path} main {profile['access_log_buffer']};
 
     sendfile        on;
     tcp_nopush      on;
     tcp_nodelay     on;
     keepalive_timeout  65;
+    keepalive_requests {profile['keepalive_requests']};
     types_hash_max_size 2048;
 
+{open_file_cache_lines}
+    fastcgi_buffering on;
+    fastcgi_buffers {profile['fastcgi_buffers']};
+    fastcgi_buffer_size {profile['fastcgi_buffer_size']};
+
     # Specify temp paths
     client_body_temp_path {client_body_path};
     proxy_temp_path {proxy_temp_path};
@@ -112,14 +206,19 @@ http {{
 
     gzip  on;
     gzip_disable "msie6"; # Disable gzip for old IE6
+    gzip_comp_level {profile['gzip_comp_level']};
+    gzip_min_length 1024;
+    gzip_vary on;
+    gzip_proxied any;
+    gzip_types {NGINX_GZIP_TYPES};
 
     # Include enabled site configurations
     include {sites_enabled_path}/*.conf;
 
     # Default server (optional - catches requests to unknown hosts)
     server {{
-        listen 80 default_server;
-        listen [::]:80 default_server;
+        listen 80 default_server{reuseport};
+        listen [::]:80 default_server{reuseport};
         server_name _;
         # return 444; # Or return a default page/message
         root /var/www/html; # Standard default root
@@ -130,6 +229,15 @@ http {{
 """
     return content
 
+def _nginx_env():
+    """Environment for running the bundled binary (its libraries on LD_LIBRARY_PATH, if bundled)."""
+    nginx_lib_path = config.BUNDLES_DIR / 'nginx/lib/x86_64-linux-gnu' # Adjust arch if needed
+    env = os.environ.copy()
+    ld = env.get('LD_LIBRARY_PATH', '')
+    if nginx_lib_path.is_dir():
+        env['LD_LIBRARY_PATH'] = f"{nginx_lib_path.resolve()}{os.pathsep}{ld}" if ld else str(nginx_lib_path.resolve())
+    return env
+
 def get_nginx_version():
     """Gets the installed Nginx version by running the binary."""
     if not config.NGINX_BINARY.is_file():
@@ -140,13 +248,7 @@ def get_nginx_version():
     version_string = "N/A"
 
     try:
-        # Set LD_LIBRARY_PATH if needed, similar to start_internal_nginx
-        nginx_lib_path = config.BUNDLES_DIR / 'nginx/lib/x86_64-linux-gnu' # Adjust arch if needed
-        env = os.environ.copy()
-        ld = env.get('LD_LIBRARY_PATH', '')
-        if nginx_lib_path.is_dir():
-             env['LD_LIBRARY_PATH'] = f"{nginx_lib_path.resolve()}{os.pathsep}{ld}" if ld else str(nginx_lib_path.resolve())
-
+        env = _nginx_env()
         print(f"Nginx Manager: Running '{' '.join(command)}' to get version...")
         # Use stderr=subprocess.PIPE, text=True
         result = subprocess.run(command, capture_output=True, text=True, check=False, env=env, timeout=5)
@@ -244,117 +346,69 @@ def ensure_internal_nginx_structure():
         print(f"Nginx Manager FATAL: Error ensuring Nginx structure: {e}")
         return False
 
-def generate_site_config(site_info, php_socket_path):
+def _site_docroot(site_info):
+    """Site path joined with its docroot_relative (site root if that is missing); None if the site is gone."""
+    site_path = Path(site_info['path'])
+    if not site_path.is_dir():
+        return None
+    root_path = (site_path / (site_info.get('docroot_relative') or '.')).resolve()
+    if not root_path.is_dir():
+        print(f"Nginx Manager Warning: Calculated docroot '{root_path}' not found for {site_info.get('domain')}. Falling back to site root '{site_path}'.")
+        root_path = site_path.resolve()
+    return root_path
+
+
+def generate_site_config(site_info, php_version):
     """
-    Generates Nginx server block config string, including HTTPS if enabled.
-    Uses bundled includes and correct raw string for PHP block.
+    Renders the Nginx server block(s) for a site from its template profile
+    (see nginx_templates.py), including HTTPS if enabled and certificates exist.
 
     Args:
         site_info (dict): Dictionary containing site settings (path, domain, https, etc.).
-        php_socket_path (str): Absolute path to the PHP FPM socket for this site.
+        php_version (str): Resolved PHP version; PHP is passed to its shared upstream,
+            or to the site's own pool upstream if it has a php_pool setting.
 
     Returns:
         str: The generated Nginx configuration string, or empty string on error.
     """
-    # --- Start of Function - Ensure this function is replaced entirely ---
     if not site_info or 'path' not in site_info or 'domain' not in site_info:
         print("Configurator Error: Invalid site_info passed to generate_site_config")
         return ""
 
-    site_path_str = site_info['path']
     domain = site_info['domain']
-    https_enabled = site_info.get('https', False)
-
-    site_path = Path(site_path_str)
-
-    if not site_path.is_dir():
-        print(f"Configurator Error: Site path is not a directory: {site_path_str}")
+    root_path = _site_docroot(site_info)
+    if root_path is None:
+        print(f"Configurator Error: Site path is not a directory: {site_info['path']}")
         return ""
 
-    # --- Determine Document Root using stored setting
-    # Default to '.' (site root) if setting is missing
-    docroot_relative = site_info.get('docroot_relative', '.')
-    root_path = (site_path / docroot_relative).resolve()  # Calculate full path
-
-    # Verify the calculated document root exists, fallback to site root if not
-    if not root_path.is_dir():
-        print(f"Nginx Manager Warning: Calculated docroot '{root_path}' not found for {domain}. Falling back to site root '{site_path}'.")
-        root_path = site_path.resolve()
+    profile = nginx_templates.profile_for_site(site_info, root_path)
+    values = {
+        "domain": domain,
+        "root": nginx_templates.quote_path(root_path),
+        "access_log": nginx_templates.quote_path((config.LOG_DIR / f"{domain}.access.log").resolve()),
+        "error_log": nginx_templates.quote_path((config.LOG_DIR / f"{domain}.error.log").resolve()),
+        "fastcgi_pass": _site_fastcgi_pass(site_info, php_version),
+        "fastcgi_params": nginx_templates.quote_path((config.BUNDLED_NGINX_CONF_SUBDIR / 'fastcgi_params').resolve()),
+        "proxy_port": site_info.get('proxy_port') or "",
+    }
+    if profile == nginx_templates.PROFILE_PROXY and not str(values["proxy_port"]).isdigit():
+        print(f"Configurator Error: Site {domain} uses the proxy template but has no valid proxy_port.")
+        return ""
 
-    public_root = site_path / 'public'; root_path = public_root if public_root.is_dir() else site_path
-    root_path_str = str(root_path).replace('\\', '\\\\').replace('"', '\\"')
-    # Use config.LOG_DIR (ensure this was fixed based on previous error)
-    access_log_path = str((config.LOG_DIR / f"{domain}.access.log").resolve())
-    error_log_path = str((config.LOG_DIR / f"{domain}.error.log").resolve())
-    php_socket_path_str = str(Path(php_socket_path).resolve())
-    # Use config.BUNDLED_NGINX_CONF_SUBDIR
-    bundled_fastcgi_params_path = str((config.BUNDLED_NGINX_CONF_SUBDIR / 'fastcgi_params').resolve())
-
-    # --- PHP Location Block (Raw F-String - THE FIX IS HERE) ---
-    php_location_block = rf"""
-    location ~ \.php$ {{
-        try_files $uri =404;
-        fastcgi_split_path_info ^(.+\.php)(/.+)$;
-        fastcgi_pass unix:{php_socket_path_str};
-        fastcgi_index index.php;
-        fastcgi_param SCRIPT_FILENAME $document_root$fastcgi_script_name;
-        include "{bundled_fastcgi_params_path}";
-    }}"""
-    # --- END FIX ---
-
-    # --- HTTP Server Block ---
-    http_server_block = ""
+    https_enabled = bool(site_info.get('https', False))
     if https_enabled:
-        # If HTTPS, HTTP block just redirects
-        http_server_block = rf"""
-server {{
-    listen 80; listen [::]:80; server_name {domain};
-    access_log off; error_log "{error_log_path}" warn;
-    return 301 https://$host$request_uri;
-}}"""
-    else:
-        # If not HTTPS, serve directly on HTTP
-        http_server_block = rf"""
-server {{
-    listen 80; listen [::]:80; server_name {domain}; root "{root_path_str}"; index index.php index.html index.htm;
-    access_log "{access_log_path}"; error_log "{error_log_path}" warn; charset utf-8;
-    location / {{ try_files $uri $uri/ /index.php?$query_string; }} location ~ /\. {{ deny all; }}
-    {php_location_block}
-}}"""
-
-    # --- HTTPS Server Block ---
-    https_server_block = ""
-    if https_enabled:
-        cert_path = get_cert_path(domain); key_path = get_key_path(domain)
         if check_certificates_exist(domain):
-            cert_path_str = str(cert_path.resolve()); key_path_str = str(key_path.resolve())
-            https_server_block = rf"""
-
-server {{
-    listen 443 ssl http2; listen [::]:443 ssl http2; server_name {domain}; root "{root_path_str}"; index index.php index.html index.htm;
-    access_log "{access_log_path}"; error_log "{error_log_path}" warn; charset utf-8;
-    ssl_certificate "{cert_path_str}"; ssl_certificate_key "{key_path_str}"; ssl_protocols TLSv1.2 TLSv1.3; ssl_prefer_server_ciphers off;
-    location / {{ try_files $uri $uri/ /index.php?$query_string; }} location ~ /\. {{ deny all; }}
-    {php_location_block}
-}}"""
+            values["cert"] = nginx_templates.quote_path(get_cert_path(domain).resolve())
+            values["key"] = nginx_templates.quote_path(get_key_path(domain).resolve())
         else:
             print(f"Nginx Config Warning: HTTPS enabled for {domain}, but cert files missing. Reverting HTTP block.")
-            # Revert HTTP block if certs missing
-            http_server_block = rf"""
-server {{ listen 80; listen [::]:80; server_name {domain}; root "{root_path_str}"; index index.php index.html index.htm;
-    access_log "{access_log_path}"; error_log "{error_log_path}" warn; charset utf-8;
-    location / {{ try_files $uri $uri/ /index.php?$query_string; }} location ~ /\. {{ deny all; }}
-    {php_location_block}
-}}"""
-
-    # --- Combine Blocks ---
-    full_config = rf"""# Configuration for {domain} generated by Grazr
-# HTTPS Enabled: {https_enabled}
-
-{http_server_block}
-{https_server_block}
-"""
-    return full_config
+            https_enabled = False
+
+    try:
+        return nginx_templates.render_site_config(profile, values, https=https_enabled)
+    except KeyError as e:
+        print(f"Configurator Error: Could not render template '{profile}' for {domain}: missing {e}")
+        return ""
 
 
 # --- Nginx Process Control Functions (using process_manager) ---
@@ -369,6 +423,9 @@ def start_internal_nginx():
         logger.info("Nginx already running.")
         return True, "Nginx already running."
 
+    # Bring site configs in line with the current templates; only changed sites are written
+    sync_all_site_configs()
+
     nginx_binary = config.NGINX_BINARY
     nginx_conf = config.INTERNAL_NGINX_CONF_FILE
     pid_file = config.INTERNAL_NGINX_PID_FILE
@@ -399,15 +456,83 @@ def start_internal_nginx():
         log_file_path=str(log_file.resolve()) # Log stdout/stderr here
     )
 
-    # REMOVED immediate status check here. Rely on subsequent refresh.
     if success:
-        logger.info("Nginx start command issued successfully.")
-        return True, "Nginx start initiated." # Report success of issuing command
+        # Returns once Nginx accepts connections; a bad config exits instead
+        if process_manager.wait_until_ready(config.NGINX_PROCESS_ID, "nginx", timeout=5,
+                                            port=_nginx_http_port()) != "running":
+            msg = f"Nginx failed to start. Check log: {log_file}"
+            logger.error(msg)
+            return False, msg
+        logger.info("Nginx started successfully.")
+        return True, "Nginx started."
     else:
         logger.error("Failed to issue start command for Nginx.")
         return False, "Failed to issue start command for Nginx."
 
 
+def get_nginx_profile():
+    """Performance profile of the current nginx.conf, or None if it predates profiles (or was hand-written)."""
+    try:
+        match = _PROFILE_MARKER_RE.search(config.INTERNAL_NGINX_CONF_FILE.read_text(encoding='utf-8'))
+    except OSError:
+        return NGINX_PROFILE_DEFAULT  # Created with the default profile on first start
+    return match.group(1) if match and match.group(1) in NGINX_PROFILES else None
+
+
+def set_nginx_profile(profile_name):
+    """
+    Re-renders nginx.conf with a performance profile (see NGINX_PROFILES), validates it
+    against the enabled sites, swaps it in and reloads Nginx if it is running.
+
+    Returns:
+        tuple: (bool success, str message)
+    """
+    if profile_name not in NGINX_PROFILES:
+        return False, f"Unknown Nginx performance profile '{profile_name}'."
+    if not ensure_internal_nginx_structure():
+        return False, "Internal Nginx structure check failed or prerequisite files missing."
+    label = NGINX_PROFILES[profile_name]["label"]
+    conf_file = config.INTERNAL_NGINX_CONF_FILE
+    content = _get_default_nginx_config_content(profile_name)
+    try:
+        if conf_file.read_text(encoding='utf-8') == content:
+            return True, f"Nginx profile '{label}' is already active."
+    except OSError:
+        pass
+
+    with resource_lock(NGINX_RELOAD_LOCK):
+        with task_metrics.step("nginx_validate"):
+            valid, valid_msg = validate_site_configs({}, master_content=content)
+        if not valid:
+            msg = f"Nginx profile '{label}' failed validation; nginx.conf left unchanged. {valid_msg}"
+            logger.error(msg)
+            return False, msg
+        with task_metrics.step("nginx_write"):
+            try:
+                _write_file_atomic(conf_file, content)
+            except OSError as e:
+                msg = f"Could not write {conf_file}: {e}"
+                logger.error(msg)
+                return False, msg
+    logger.info(f"Nginx performance profile set to '{profile_name}'.")
+
+    if process_manager.get_process_status(config.NGINX_PROCESS_ID) != "running":
+        return True, f"Nginx profile '{label}' saved; it applies when Nginx starts."
+    success_reload, msg_reload = reload_internal_nginx()
+    if not success_reload:
+        return False, f"Nginx profile '{label}' saved BUT Nginx reload failed: {msg_reload}"
+    return True, f"Nginx profile '{label}' applied and Nginx reloaded."
+
+
+def _nginx_http_port():
+    return getattr(config, 'AVAILABLE_BUNDLED_SERVICES', {}).get("nginx", {}).get("default_port", 80)
+
+
+def get_nginx_status():
+    """Status of the internal Nginx: "running" only once it accepts connections."""
+    return process_manager.get_ready_status(config.NGINX_PROCESS_ID, "nginx", port=_nginx_http_port())
+
+
 def stop_internal_nginx():
     """Stops internal Nginx via process_manager (SIGQUIT)."""
     # Uses constants from config module
@@ -416,48 +541,551 @@ def stop_internal_nginx():
     # Let process manager handle PID removal if stopped successfully
     return ok, msg
 
-def reload_internal_nginx():
-    """Reloads internal Nginx config by sending SIGHUP."""
-    # Uses constants from config module
-    print("Attempting reload..."); pid = process_manager.get_process_pid(config.NGINX_PROCESS_ID)
-    if pid is None: msg = "Cannot reload: Not running."; print(f"Error: {msg}"); return False, msg
-    print(f"Sending SIGHUP to PID {pid}...");
-    try: os.kill(pid, signal.SIGHUP); msg = "SIGHUP sent."; print(f"Info: {msg}"); return True, msg
-    except Exception as e: msg = f"SIGHUP failed: {e}"; print(f"Error: {msg}"); return False, msg
+# --- Coalesced Reloads ---
+# Every site change used to SIGHUP Nginx on its own; a batch of 30 sites meant 30 reloads,
+# each forking new workers and dropping keepalive connections. Reload requests are now
+# collected for NGINX_RELOAD_DEBOUNCE_SECONDS after the last one (at most
+# NGINX_RELOAD_MAX_DELAY after the first), validated once with `nginx -t` and applied
+# with a single SIGHUP. Every caller gets a ticket for the reload that covers its change.
+NGINX_RELOAD_DEBOUNCE_SECONDS = 0.15
+NGINX_RELOAD_MAX_DELAY = 1.0
+NGINX_RELOAD_WAIT_TIMEOUT = 30  # Seconds reload_internal_nginx() waits for its ticket
+NGINX_CONFIG_TEST_TIMEOUT = 15
+
+
+class ReloadTicket:
+    """Handle on a pending reload; wait() returns (success, message) once it has run."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.result = None
+
+    def _resolve(self, success, message):
+        self.result = (success, message)
+        self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            return False, f"Timed out after {timeout}s waiting for the Nginx reload."
+        return self.result
+
+
+class _ReloadScheduler:
+    """Debounces reload requests onto one background thread (started on first use)."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = []         # Tickets for the next reload
+        self._first_request = None
+        self._last_request = None
+        self._thread = None
+
+    def request(self):
+        ticket = ReloadTicket()
+        with self._cond:
+            now = time.monotonic()
+            if not self._pending: self._first_request = now
+            self._last_request = now
+            self._pending.append(ticket)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="grazr-nginx-reload")
+                self._thread.start()
+            self._cond.notify_all()
+        return ticket
+
+    def _next_batch(self):
+        """Blocks until a batch is due; returns its tickets. Requests made later go to the next batch."""
+        with self._cond:
+            while True:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                due = min(self._last_request + NGINX_RELOAD_DEBOUNCE_SECONDS,
+                          self._first_request + NGINX_RELOAD_MAX_DELAY)
+                remaining = due - time.monotonic()
+                if remaining <= 0:
+                    batch, self._pending = self._pending, []
+                    return batch
+                self._cond.wait(remaining)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                success, message = _test_and_reload()
+            except Exception as e:
+                logger.error(f"Nginx reload failed: {e}", exc_info=True)
+                success, message = False, f"Reload failed: {e}"
+            if len(batch) > 1: message += f" ({len(batch)} changes coalesced)"
+            for ticket in batch: ticket._resolve(success, message)
+
+
+_reload_scheduler = _ReloadScheduler()
+
+
+def test_nginx_config(conf_file=None):
+    """Runs `nginx -t -c conf_file` (default: the internal nginx.conf). Returns (success, message)."""
+    conf_file = conf_file or config.INTERNAL_NGINX_CONF_FILE
+    command = [str(config.NGINX_BINARY), '-t', '-c', str(conf_file)]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=NGINX_CONFIG_TEST_TIMEOUT,
+                                env=_nginx_env())
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return False, f"nginx -t could not run: {e}"
+    if result.returncode != 0:
+        return False, f"nginx -t failed: {(result.stderr or result.stdout).strip()}"
+    return True, "Configuration test passed."
+
+
+def _test_and_reload():
+    """Validates the config and sends one SIGHUP. Runs on the scheduler thread only."""
+    with resource_lock(NGINX_RELOAD_LOCK):
+        pid = process_manager.get_process_pid(config.NGINX_PROCESS_ID)
+        if pid is None: msg = "Cannot reload: Not running."; logger.error(msg); return False, msg
+        test_ok, test_msg = test_nginx_config()
+        if not test_ok:
+            logger.error(f"Not reloading Nginx: {test_msg}")  # The running config stays in place
+            return False, test_msg
+        logger.info(f"Sending SIGHUP to Nginx PID {pid}...")
+        try: os.kill(pid, signal.SIGHUP); return True, "SIGHUP sent."
+        except Exception as e: msg = f"SIGHUP failed: {e}"; logger.error(msg); return False, msg
+
+
+def request_nginx_reload():
+    """Schedules a coalesced reload and returns its ReloadTicket without waiting."""
+    return _reload_scheduler.request()
+
+
+def reload_internal_nginx(timeout=NGINX_RELOAD_WAIT_TIMEOUT):
+    """Reloads internal Nginx config and waits for the (possibly shared) reload to finish."""
+    with task_metrics.step("nginx_reload"):
+        return request_nginx_reload().wait(timeout)
+
+
+# --- Staged Site Config Validation ---
+# A new or changed site config is first validated in a staging copy of the live tree:
+# config.INTERNAL_NGINX_STAGING_DIR/<tmp>/sites-enabled holds every enabled site with the
+# change applied, and a staged nginx.conf includes that directory instead of the live one.
+# Only if `nginx -t -c <staged nginx.conf>` passes is the site file swapped into
+# sites-available/sites-enabled (rename, so Nginx never reads a half-written file).
+# A broken config therefore never reaches the live tree, and the other sites keep running.
+# Failed validations are remembered by the hash of everything the test read, so retrying
+# the same broken config answers from the cache instead of running nginx -t again.
+NGINX_FAILED_CONFIG_CACHE_SIZE = 64
+_INCLUDED_FILE_RE = re.compile(r'^\s*(?:include|ssl_certificate|ssl_certificate_key)\s+"?([^";\s]+)', re.MULTILINE)
+
+_failed_config_cache = OrderedDict()  # staged-set hash -> nginx -t error
+_failed_config_cache_lock = threading.Lock()
+
+
+def _staged_sites(changes):
+    """{filename: content} of the enabled sites as they will be after the changes."""
+    sites = {}
+    if config.INTERNAL_SITES_ENABLED.is_dir():
+        for conf in sorted(config.INTERNAL_SITES_ENABLED.glob('*.conf')):
+            try:
+                sites[conf.name] = conf.read_text(encoding='utf-8')
+            except OSError as e:  # Dangling symlink etc.: the live test would fail the same way
+                logger.warning(f"Skipping unreadable site config {conf} while staging: {e}")
+    for config_filename, config_content in changes.items():
+        if config_content is None: sites.pop(config_filename, None)
+        else: sites[config_filename] = config_content
+    return sites
+
+
+def _staged_set_hash(master_content, sites):
+    """Hash of the staged configs plus the state of the files they include (certs, params)."""
+    digest = hashlib.sha256(master_content.encode('utf-8'))
+    referenced = set()
+    for name, content in sorted(sites.items()):
+        digest.update(f"\0{name}\0".encode('utf-8')); digest.update(content.encode('utf-8'))
+        referenced.update(_INCLUDED_FILE_RE.findall(content))
+    for path in sorted(referenced):
+        try: st = os.stat(path); digest.update(f"\0{path}:{st.st_mtime_ns}:{st.st_size}".encode('utf-8'))
+        except OSError: digest.update(f"\0{path}:missing".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def validate_site_config(config_filename, config_content):
+    """
+    Validates the live tree with one site file replaced (or removed, if config_content
+    is None) against a staged master config. Returns (success, message).
+    """
+    return validate_site_configs({config_filename: config_content})
+
+
+def validate_site_configs(changes, master_content=None):
+    """
+    validate_site_config() for several files at once: changes is {filename: content or None}.
+    master_content replaces the live nginx.conf in the staged tree (see set_nginx_profile()).
+    """
+    changed_names = ", ".join(sorted(changes)) or "nginx.conf"
+    if not config.NGINX_BINARY.is_file():
+        logger.warning(f"Nginx binary not found at {config.NGINX_BINARY}; skipping config validation.")
+        return True, "Validation skipped (no Nginx binary)."
+    try:
+        if master_content is None: master_content = config.INTERNAL_NGINX_CONF_FILE.read_text(encoding='utf-8')
+    except OSError as e:
+        return False, f"Cannot read {config.INTERNAL_NGINX_CONF_FILE}: {e}"
+    live_include = f"include {config.INTERNAL_SITES_ENABLED.resolve()}/*.conf;"
+    if live_include not in master_content:
+        logger.warning(f"'{live_include}' not found in nginx.conf; validating against the default master config.")
+        master_content = _get_default_nginx_config_content()
+
+    sites = _staged_sites(changes)
+    set_hash = _staged_set_hash(master_content, sites)
+    with _failed_config_cache_lock:
+        cached_error = _failed_config_cache.get(set_hash)
+    if cached_error is not None:
+        logger.info(f"Config for '{changed_names}' already failed validation (cached): {cached_error}")
+        return False, f"{cached_error} (cached result)"
+
+    config.ensure_dir(config.INTERNAL_NGINX_STAGING_DIR)
+    stage_dir = Path(tempfile.mkdtemp(prefix="stage-", dir=config.INTERNAL_NGINX_STAGING_DIR))
+    try:
+        staged_enabled = stage_dir / 'sites-enabled'
+        staged_enabled.mkdir()
+        for name, content in sites.items():
+            (staged_enabled / name).write_text(content, encoding='utf-8')
+        staged_master = stage_dir / 'nginx.conf'
+        staged_master.write_text(master_content.replace(live_include, f"include {staged_enabled}/*.conf;"),
+                                 encoding='utf-8')
+        ok, msg = test_nginx_config(staged_master)
+    finally:
+        shutil.rmtree(stage_dir, ignore_errors=True)
+
+    if not ok:
+        msg = msg.replace(str(stage_dir / 'sites-enabled'), str(config.INTERNAL_SITES_ENABLED))
+        with _failed_config_cache_lock:
+            _failed_config_cache[set_hash] = msg
+            while len(_failed_config_cache) > NGINX_FAILED_CONFIG_CACHE_SIZE:
+                _failed_config_cache.popitem(last=False)
+    return ok, msg
+
+
+def _write_file_atomic(path, content):
+    """Writes content to path through a temporary file and os.replace()."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.chmod(tmp_name, 0o644) # Set standard permissions
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _swap_site_config(available_path, enabled_path, config_content):
+    """Atomically replaces the site file and points its sites-enabled symlink at it."""
+    enabled_path.parent.mkdir(parents=True, exist_ok=True)
+    _write_file_atomic(available_path, config_content)
+
+    if enabled_path.is_symlink() and os.readlink(enabled_path) == str(available_path):
+        return False  # Link already correct
+    if enabled_path.exists() and not enabled_path.is_symlink():
+        print(f"Nginx Manager Warning: Replacing unexpected non-symlink file at {enabled_path}")
+    tmp_link = enabled_path.with_name(f".{enabled_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_link.unlink(missing_ok=True)
+    os.symlink(available_path, tmp_link)
+    os.replace(tmp_link, enabled_path)
+    return True
+
+
+def _site_config_is_current(available_path, enabled_path, config_content):
+    """True if the config on disk has exactly this content and is enabled."""
+    try:
+        on_disk = available_path.read_bytes()
+    except OSError:
+        return False
+    if hashlib.sha256(on_disk).digest() != hashlib.sha256(config_content.encode('utf-8')).digest():
+        return False
+    try:
+        return enabled_path.is_symlink() and os.readlink(enabled_path) == str(available_path)
+    except OSError:
+        return False
+
+
+def _remove_site_config(available_path, enabled_path):
+    """Removes a site's sites-enabled symlink and its sites-available file."""
+    if enabled_path.is_symlink() or enabled_path.exists(): enabled_path.unlink()
+    available_path.unlink(missing_ok=True)
+
+
+def _apply_config_changes(changes, label):
+    """
+    Validates {filename: content or None} as one staged change, then swaps the files in
+    (None removes the file). Returns (success, message).
+    """
+    with resource_lock(NGINX_RELOAD_LOCK):
+        with task_metrics.step("nginx_validate"):
+            valid, valid_msg = validate_site_configs(changes)
+        if not valid:
+            msg = f"{label} failed validation; live config left unchanged. {valid_msg}"
+            print(f"Nginx Manager Error: {msg}")
+            return False, msg
+        with task_metrics.step("nginx_write"):
+            try:
+                for name, content in sorted(changes.items()):
+                    available_path = config.INTERNAL_SITES_AVAILABLE / name
+                    enabled_path = config.INTERNAL_SITES_ENABLED / name
+                    if content is None: _remove_site_config(available_path, enabled_path)
+                    else: _swap_site_config(available_path, enabled_path, content)
+            except OSError as e:
+                msg = f"Nginx file operation failed for {label.lower()}: {e}"
+                print(f"Nginx Manager Error: {msg}")
+                return False, msg
+    return True, f"{label} applied."
+
+
+# --- Shared PHP-FPM Upstreams ---
+NGINX_FASTCGI_KEEPALIVE = 4  # Idle FPM connections per Nginx worker and version; each one holds an FPM child
+
+
+def _sites_with_php_version(exclude_path=None):
+    """(site, resolved PHP version) for every linked site, resolving DEFAULT_PHP once."""
+    excluded = str(Path(exclude_path).resolve()) if exclude_path else None
+    default_php = None
+    for site in load_sites():
+        if excluded and site.get('path') and str(Path(site['path']).resolve()) == excluded: continue
+        version = site.get('php_version') or config.DEFAULT_PHP
+        if version == config.DEFAULT_PHP:
+            default_php = default_php or get_default_php_version()
+            version = default_php
+        yield site, str(version) if version else None
+
+
+def _php_upstream_versions(extra_versions=()):
+    """Installed PHP versions plus every version a site uses (so no site references a missing upstream)."""
+    versions = set(detect_bundled_php_versions())
+    versions.update(v for v in extra_versions if v)
+    versions.update(version for _site, version in _sites_with_php_version() if version)
+    return sorted(versions)
+
+
+def _site_fastcgi_pass(site_info, php_version):
+    """Upstream a site's PHP requests go to: its own pool's if it has a php_pool setting, else the shared one."""
+    if not php_version: return ""
+    if site_info.get('php_pool'):
+        return nginx_templates.php_pool_upstream_name(php_version, site_pool_name(site_info['domain']))
+    return nginx_templates.php_upstream_name(php_version)
+
+
+def _apply_php_upstreams(extra_versions=(), exclude_path=None):
+    """
+    Writes the shared `upstream php<version>` file (plus one upstream per per-site pool)
+    if the PHP versions, site pools or their sockets changed. Returns (success, message, changed).
+    """
+    name = config.NGINX_PHP_UPSTREAMS_CONF_NAME
+    available_path = config.INTERNAL_SITES_AVAILABLE / name
+    enabled_path = config.INTERNAL_SITES_ENABLED / name
+    sockets = {}
+    for version in _php_upstream_versions(extra_versions):
+        socket_path = get_php_fpm_socket_path(version)
+        if socket_path: sockets[version] = nginx_templates.quote_path(Path(socket_path).resolve())
+    pool_sockets = {}
+    for site, version in _sites_with_php_version(exclude_path):
+        if not (version and site.get('php_pool') and site.get('domain')): continue
+        socket_path = get_site_pool_socket_path(version, site['domain'])
+        if socket_path:
+            pool_sockets[(version, site_pool_name(site['domain']))] = nginx_templates.quote_path(Path(socket_path).resolve())
+    content = nginx_templates.render_php_upstreams(sockets, NGINX_FASTCGI_KEEPALIVE, pool_sockets)
+    if _site_config_is_current(available_path, enabled_path, content):
+        return True, "PHP upstreams unchanged.", False
+    success, msg = _apply_config_changes({name: content}, "PHP upstreams update")
+    if not success:
+        return False, msg, False
+    msg = f"PHP upstreams updated ({', '.join(sorted(sockets)) or 'none'}; {len(pool_sockets)} site pools)."
+    print(f"Nginx Manager Info: {msg}")
+    return True, msg, True
+
+
+# --- Per-Site PHP-FPM Pools ---
+def _apply_site_pools(exclude_path=None):
+    """
+    Brings every installed PHP version's generated site pools in line with the sites'
+    php_pool settings, then reloads each FPM whose pools changed - once per version, and
+    coalesced with reloads requested concurrently (see php_manager.request_php_fpm_reload()).
+    Runs before the upstreams/site configs that route to the pools' sockets.
+
+    Returns:
+        tuple: (bool success, str message, bool changed)
+    """
+    pools = {}  # version -> {domain: php_pool setting}
+    for site, version in _sites_with_php_version(exclude_path):
+        if version and site.get('php_pool') and site.get('domain'):
+            pools.setdefault(version, {})[site['domain']] = site['php_pool']
+    errors, changed_versions = [], []
+    with task_metrics.step("fpm_pools"):
+        for version in sorted(set(detect_bundled_php_versions()) | set(pools)):
+            ok, msg, changed = apply_site_pools(version, pools.get(version, {}))
+            if not ok: errors.append(msg)
+            if changed: changed_versions.append(version)
+        for version in changed_versions:
+            if not request_php_fpm_reload(version): errors.append(f"PHP-FPM {version} reload failed.")
+    if errors:
+        return False, " ".join(errors), bool(changed_versions)
+    if not changed_versions:
+        return True, "Site PHP pools unchanged.", False
+    return True, f"Site PHP pools updated for PHP {', '.join(changed_versions)}.", True
+
+
+# --- Mapped Site Mode ---
+def _site_map_enabled():
+    return getattr(config, 'NGINX_SITE_MODE', 'files') == "mapped"
+
+
+def _site_uses_map(site_info):
+    """True if, in mapped mode, the site is served by the generic server instead of its own file."""
+    if not _site_map_enabled() or site_info.get('https'): return False
+    domain = site_info.get('domain') or ""
+    if not domain.endswith(f".{config.SITE_TLD}"): return False
+    root_path = _site_docroot(site_info) if site_info.get('path') else None
+    if root_path is None: return False
+    return nginx_templates.profile_for_site(site_info, root_path) in nginx_templates.MAPPED_PROFILES
+
+
+def _render_site_map(sites):
+    """The site map config for the given (mapped) sites."""
+    default_php = None
+    entries = []
+    for site in sites:
+        root_path = _site_docroot(site)
+        profile = nginx_templates.profile_for_site(site, root_path)
+        fastcgi_pass = ""
+        if nginx_templates.profile_uses_php(profile):
+            version = site.get('php_version') or config.DEFAULT_PHP
+            if version == config.DEFAULT_PHP:
+                default_php = default_php or get_default_php_version()
+                version = default_php
+            fastcgi_pass = _site_fastcgi_pass(site, version)
+        entries.append({"domain": site['domain'], "root": nginx_templates.quote_path(root_path),
+                        "profile": profile, "fastcgi_pass": fastcgi_pass})
+    return nginx_templates.render_site_map(entries, {
+        "tld": config.SITE_TLD,
+        "access_log": nginx_templates.quote_path((config.LOG_DIR / "mapped-sites.access.log").resolve()),
+        "error_log": nginx_templates.quote_path((config.LOG_DIR / "mapped-sites.error.log").resolve()),
+        "fastcgi_params": nginx_templates.quote_path((config.BUNDLED_NGINX_CONF_SUBDIR / 'fastcgi_params').resolve()),
+    })
+
+
+def _apply_site_map(exclude_path=None):
+    """
+    Brings the site map in line with the site list (in "files" mode: removes a leftover
+    map). Sites served from the map lose their own server block file in the same
+    validated swap. Nothing is written if the map is already current.
+
+    Args:
+        exclude_path (str, optional): Site being removed; left out of the map.
+
+    Returns:
+        tuple: (bool success, str message, bool changed)
+    """
+    map_name = config.NGINX_SITE_MAP_CONF_NAME
+    available_path = config.INTERNAL_SITES_AVAILABLE / map_name
+    enabled_path = config.INTERNAL_SITES_ENABLED / map_name
+    excluded = str(Path(exclude_path).resolve()) if exclude_path else None
+    mapped = [site for site in load_sites()
+              if site.get('path') and str(Path(site['path']).resolve()) != excluded and _site_uses_map(site)]
+
+    changes = {}
+    with task_metrics.step("nginx_render"):
+        content = _render_site_map(mapped) if mapped else None
+    if content is None:
+        if available_path.exists() or enabled_path.is_symlink(): changes[map_name] = None
+    elif not _site_config_is_current(available_path, enabled_path, content):
+        changes[map_name] = content
+    for site in mapped:  # Their own files would take precedence over the generic server
+        own_name = f"{site['domain']}.conf"
+        if (config.INTERNAL_SITES_ENABLED / own_name).is_symlink() or (config.INTERNAL_SITES_AVAILABLE / own_name).exists():
+            changes[own_name] = None
+    if not changes:
+        return True, f"Site map unchanged ({len(mapped)} mapped sites).", False
+
+    success, msg = _apply_config_changes(changes, "Site map update")
+    if not success:
+        return False, msg, False
+    msg = f"Site map updated ({len(mapped)} mapped sites)."
+    print(f"Nginx Manager Info: {msg}")
+    return True, msg, True
 
 
 # --- Site Configuration Functions ---
-def install_nginx_site(site_path_str):
+def install_nginx_site(site_path_str, reload=True):
     """
     Configures and installs/updates the internal Nginx site config for a given path.
     Reads site settings (domain, php, https) from site_manager, ensures the correct
-    PHP FPM is running, generates the appropriate Nginx config (HTTP/HTTPS),
-    writes the file, creates/updates the symlink, and reloads Nginx.
+    PHP FPM is running, renders the site's Nginx config, and - only if the rendered
+    config differs from the one on disk - validates it, swaps it in and reloads Nginx.
 
     Args:
         site_path_str (str): Absolute path to the site directory.
+        reload (bool): False skips the reload, for callers that batch several sites
+            and call reload_internal_nginx() once afterwards.
 
     Returns:
         tuple: (bool success, str message)
     """
+    success, message, changed = _configure_site(site_path_str)
+    if not success or not changed:
+        return success, message
+    if not reload:
+        return True, f"{message.rstrip('.')}; reload pending."
+
+    # Step 7: Reload Internal Nginx
+    print("Nginx Manager: Triggering internal Nginx reload...")
+    success_reload, msg_reload = reload_internal_nginx() # Shared with other site changes made at the same time
+
+    if not success_reload:
+         # If reload fails, the config files are written but Nginx isn't using them.
+         msg = f"{message.rstrip('.')} BUT Nginx reload failed: {msg_reload}"
+         print(f"Nginx Manager Warning: {msg}")
+         return False, msg # Treat reload failure as overall failure for install task
+    msg = f"{message.rstrip('.')} and Nginx reloaded."
+    print(f"Nginx Manager Info: {msg}")
+    return True, msg # Final success
+
+
+def _ensure_site_php_fpm(php_version):
+    """Starts PHP-FPM for a site's version (no-op if already running). Returns True if it is up."""
+    print(f"Nginx Manager: Ensuring PHP-FPM {php_version} is running...")
+    # start_php_fpm returns True if already running or launch command succeeded
+    with task_metrics.step("fpm_start"):
+        php_started_ok = start_php_fpm(php_version)
+    if php_started_ok:  # On failure start_php_fpm already logged the details
+        print(f"Nginx Manager Info: PHP-FPM {php_version} start command issued or already running.")
+    return php_started_ok
+
+
+def _configure_site(site_path_str, apply_shared=True):
+    """
+    Steps 1-6 of install_nginx_site(). Returns (success, message, changed), where
+    changed is False when the rendered config was already in place (nothing written).
+    apply_shared=False leaves the PHP upstreams and the site map to the caller
+    (see sync_all_site_configs()) and starts PHP-FPM only if the site's config changed.
+    """
     print(f"Nginx Manager: Configuring internal Nginx site for: {site_path_str}")
 
     # Step 1: Ensure base Nginx structure exists (conf file, dirs)
     if not ensure_internal_nginx_structure():
-        return False, "Internal Nginx structure check failed or prerequisite files missing."
+        return False, "Internal Nginx structure check failed or prerequisite files missing.", False
 
     site_path = Path(site_path_str)
     if not site_path.is_dir():
         msg = f"Site path '{site_path_str}' is not a valid directory."
         print(f"Nginx Manager Error: {msg}")
-        return False, msg
+        return False, msg, False
 
     # Step 2: Get full site settings (incl. https, php_version, domain)
     site_settings = get_site_settings(site_path_str)
     if not site_settings:
         msg = f"Could not load settings for site '{site_path_str}' from site manager."
         print(f"Nginx Manager Error: {msg}")
-        return False, msg
+        return False, msg, False
 
     # Determine paths using domain from settings
     domain = site_settings.get("domain")
@@ -476,80 +1104,122 @@ def install_nginx_site(site_path_str):
         if not php_version_to_use:
              msg = "Cannot configure site: No bundled PHP versions detected for default."
              print(f"Nginx Manager Error: {msg}")
-             return False, msg
+             return False, msg, False
         print(f"Nginx Manager Info: Site '{domain}' uses default PHP, resolved to: {php_version_to_use}")
     else:
         php_version_to_use = php_version_setting
         print(f"Nginx Manager Info: Site '{domain}' configured for PHP version: {php_version_to_use}")
 
-    php_socket_path = get_php_fpm_socket_path(php_version_to_use)
-
-    # Step 4: Ensure required PHP-FPM process is running
-    print(f"Nginx Manager: Ensuring PHP-FPM {php_version_to_use} is running...")
-    # start_php_fpm returns True if already running or launch command succeeded
-    php_started_ok = start_php_fpm(php_version_to_use)
-    if not php_started_ok:
-        # Note: start_php_fpm already prints detailed errors if launch fails
-        msg = f"Failed to start required PHP-FPM version {php_version_to_use}. Cannot configure site."
-        # print(f"Nginx Manager Error: {msg}") # Redundant logging? php_manager logged it.
-        return False, msg
-    print(f"Nginx Manager Info: PHP-FPM {php_version_to_use} start command issued or already running.")
-
-    # Step 5: Generate Nginx Config string (handles HTTPS based on site_settings)
-    config_content = generate_site_config(site_settings, php_socket_path)
+    # Site pools before FPM starts, so a fresh FPM comes up with them (a running one is reloaded)
+    if apply_shared:
+        pools_ok, pools_msg, _pools_changed = _apply_site_pools()
+        if not pools_ok:
+            return False, pools_msg, False
+
+    # Step 4: Ensure required PHP-FPM process is running. The sync path (apply_shared=False)
+    # only does this once the site's config actually changed (see below), so a plain
+    # Nginx start does not launch an FPM for every version the sites use.
+    if apply_shared and not _ensure_site_php_fpm(php_version_to_use):
+        return False, f"Failed to start required PHP-FPM version {php_version_to_use}. Cannot configure site.", False
+
+    # Shared files first: the site config references its PHP upstream by name.
+    # Mapped mode also updates the site map (adds/removes this site's entry).
+    shared_changed = False
+    if apply_shared:
+        upstreams_ok, upstreams_msg, shared_changed = _apply_php_upstreams((php_version_to_use,))
+        if not upstreams_ok:
+            return False, upstreams_msg, False
+        if _site_map_enabled():
+            map_ok, map_msg, map_changed = _apply_site_map()
+            if not map_ok:
+                return False, map_msg, False
+            shared_changed = shared_changed or map_changed
+    if _site_uses_map(site_settings):
+        if shared_changed:
+            return True, f"Site '{domain}' (PHP {php_version_to_use}) configured in the site map.", True
+        return True, f"Site '{domain}' (PHP {php_version_to_use}) site map entry unchanged; nothing to write or reload.", False
+
+    # Step 5: Render the site's template (handles HTTPS based on site_settings)
+    with task_metrics.step("nginx_render"):
+        config_content = generate_site_config(site_settings, php_version_to_use)
     if not config_content:
         msg = f"Failed to generate Nginx config content for '{domain}'"
         print(f"Nginx Manager Error: {msg}")
-        return False, msg
-
-    # Step 6: Write config file and create/update symlink
-    try:
-        print(f"Nginx Manager: Writing config to {available_path}")
-        available_path.parent.mkdir(parents=True, exist_ok=True)
-        available_path.write_text(config_content, encoding='utf-8')
-        os.chmod(available_path, 0o644) # Set standard permissions
-        print("Nginx Manager: Config file written.")
-
-        link_created = False
-        enabled_path.parent.mkdir(parents=True, exist_ok=True)
-        if enabled_path.is_symlink():
-            if os.readlink(enabled_path) != str(available_path):
-                enabled_path.unlink()
-                os.symlink(available_path, enabled_path); link_created = True
-        elif enabled_path.exists():
-             print(f"Nginx Manager Warning: Removing unexpected non-symlink file at {enabled_path}")
-             enabled_path.unlink()
-             os.symlink(available_path, enabled_path); link_created = True
-        else:
-            os.symlink(available_path, enabled_path); link_created = True
-
-        if link_created: print(f"Nginx Manager: Symlink created/verified: {enabled_path}")
-        else: print(f"Nginx Manager: Symlink already exists correctly: {enabled_path}")
-
-    except Exception as e:
-        msg = f"Nginx file operation failed for {domain}: {e}"
-        print(f"Nginx Manager Error: {msg}")
-        available_path.unlink(missing_ok=True) # Attempt cleanup
-        return False, msg
+        return False, msg, False
+    if _site_config_is_current(available_path, enabled_path, config_content):
+        if shared_changed:
+            return True, f"Site '{domain}' (PHP {php_version_to_use}) config unchanged; shared Nginx config updated.", True
+        msg = f"Site '{domain}' (PHP {php_version_to_use}) config unchanged; nothing to write or reload."
+        print(f"Nginx Manager Info: {msg}")
+        return True, msg, False
+
+    # Step 6: Validate against a staged copy of the tree, then swap the file and symlink in.
+    # Holding the reload lock keeps concurrent site changes and reloads from interleaving.
+    with resource_lock(NGINX_RELOAD_LOCK):
+        with task_metrics.step("nginx_validate"):
+            valid, valid_msg = validate_site_config(config_filename, config_content)
+        if not valid:
+            msg = f"Nginx config for '{domain}' failed validation; live config left unchanged. {valid_msg}"
+            print(f"Nginx Manager Error: {msg}")
+            return False, msg, False
+        with task_metrics.step("nginx_write"):
+            try:
+                print(f"Nginx Manager: Writing config to {available_path}")
+                link_created = _swap_site_config(available_path, enabled_path, config_content)
+                if link_created: print(f"Nginx Manager: Symlink created/verified: {enabled_path}")
+                else: print(f"Nginx Manager: Symlink already exists correctly: {enabled_path}")
+            except Exception as e:
+                msg = f"Nginx file operation failed for {domain}: {e}"
+                print(f"Nginx Manager Error: {msg}")
+                return False, msg, False
     # --- End file operations ---
+    if not apply_shared and not _ensure_site_php_fpm(php_version_to_use):
+        return False, f"Site '{domain}' configured, but PHP-FPM {php_version_to_use} failed to start.", True
 
-    # Step 7: Reload Internal Nginx
-    print("Nginx Manager: Triggering internal Nginx reload...")
-    success_reload, msg_reload = reload_internal_nginx() # Uses process_manager+os.kill
+    https_msg = " with HTTPS" if site_settings.get("https") else ""
+    return True, f"Site '{domain}' (PHP {php_version_to_use}{https_msg}) configured.", True
 
-    if not success_reload:
-         # If reload fails, the config files are written but Nginx isn't using them.
-         msg = f"Site '{domain}' configured BUT Nginx reload failed: {msg_reload}"
-         print(f"Nginx Manager Warning: {msg}")
-         return False, msg # Treat reload failure as overall failure for install task
-    else:
-        https_msg = " with HTTPS" if site_settings.get("https") else ""
-        msg = f"Site '{domain}' (PHP {php_version_to_use}{https_msg}) configured and Nginx reloaded."
-        print(f"Nginx Manager Info: {msg}")
-        return True, msg # Final success
 
-def uninstall_nginx_site(site_path_str):
-    """Removes internal Nginx site config/symlink and reloads."""
+def sync_all_site_configs():
+    """
+    Re-renders the config of every linked site and rewrites only those that changed
+    (e.g. after a Grazr update changed a template). Unchanged sites cost a render and
+    a hash compare. Reloads Nginx once if anything changed and it is running.
+
+    Returns:
+        tuple: (bool all_ok, int changed_count)
+    """
+    all_ok, changed_count = True, 0
+    pools_ok, pools_msg, _pools_changed = _apply_site_pools()  # FPM side; reloaded there, not counted for Nginx
+    if not pools_ok:
+        all_ok = False
+        logger.warning(f"Could not sync the site PHP pools: {pools_msg}")
+    upstreams_ok, upstreams_msg, upstreams_changed = _apply_php_upstreams()  # Before the sites referencing them
+    if not upstreams_ok:
+        all_ok = False
+        logger.warning(f"Could not sync the Nginx PHP upstreams: {upstreams_msg}")
+    changed_count += int(upstreams_changed)
+    for site in load_sites():
+        if not site.get('path'): continue
+        success, message, changed = _configure_site(site['path'], apply_shared=False)
+        if not success:
+            all_ok = False
+            logger.warning(f"Could not sync Nginx config for {site.get('domain')}: {message}")
+        changed_count += int(changed)
+    map_ok, map_msg, map_changed = _apply_site_map()  # Once for all sites; also removes a map left from mapped mode
+    if not map_ok:
+        all_ok = False
+        logger.warning(f"Could not sync the Nginx site map: {map_msg}")
+    changed_count += int(map_changed)
+    logger.info(f"Nginx site configs synced: {changed_count} changed.")
+    if changed_count and process_manager.get_process_status(config.NGINX_PROCESS_ID) == "running":
+        success_reload, _msg = reload_internal_nginx()
+        all_ok = all_ok and success_reload
+    return all_ok, changed_count
+
+
+def uninstall_nginx_site(site_path_str, reload=True):
+    """Removes internal Nginx site config/symlink and reloads (unless reload=False)."""
     # Uses constants from config module
     print(f"Removing internal Nginx site config for: {site_path_str}")
     if not ensure_internal_nginx_structure(): return False, "Internal structure check failed"
@@ -563,6 +1233,17 @@ def uninstall_nginx_site(site_path_str):
         if available_path.is_file(): available_path.unlink(); changed = True; print("Removed config file.")
     except OSError as e: errors = True; print(f"Error removing file: {e}")
     if errors: return False, f"Errors removing files for '{domain}'."
+    if _site_map_enabled():
+        map_ok, map_msg, map_changed = _apply_site_map(exclude_path=site_path_str)
+        if not map_ok: return False, map_msg
+        changed = changed or map_changed
+    if site_settings and site_settings.get('php_pool'):  # Its pool and upstream go with it
+        upstreams_ok, upstreams_msg, upstreams_changed = _apply_php_upstreams(exclude_path=site_path_str)
+        if not upstreams_ok: return False, upstreams_msg
+        changed = changed or upstreams_changed
+        pools_ok, pools_msg, _pools_changed = _apply_site_pools(exclude_path=site_path_str)
+        if not pools_ok: print(f"Nginx Manager Warning: {pools_msg}")
+    if changed and not reload: return True, f"Site {domain} config removed; reload pending."
     if changed:
         print("Config files removed. Triggering reload..."); success_reload, msg_reload = reload_internal_nginx()
         if not success_reload: return True, f"Files removed, but reload failed: {msg_reload}" # Warn
@@ -0,0 +1,368 @@
+"""
+Nginx server block templates for linked sites.
+
+Each site is rendered from one profile:
+    - "laravel":   front controller (Laravel, Statamic, Yii2, Craft and unknown PHP sites)
+    - "symfony":   front controller that only executes index.php
+    - "wordpress": pretty permalinks via /index.php?$args
+    - "static":    plain files, no PHP
+    - "spa":       plain files, unknown paths fall back to /index.html
+    - "proxy":     reverse proxy to a local (Node) dev server on the site's proxy_port
+
+The profile comes from the site's "nginx_template" setting, or is derived from its
+detected framework_type when that setting is "auto".
+
+Rendering is plain substitution into fixed templates (no timestamps, no dict-order
+dependent output), so the same settings always produce byte-identical configs. That
+is what lets install_nginx_site() skip the write and the reload for unchanged sites.
+
+In "mapped" site mode (config.NGINX_SITE_MODE) plain-HTTP sites using one of
+MAPPED_PROFILES are not rendered one server block each: render_site_map() emits
+`map $host` tables (docroot, FastCGI target, try_files fallback) plus one generic
+server block that serves every mapped host.
+
+PHP is reached through one shared `upstream php<version>` block per PHP version
+(render_php_upstreams()), with keepalive connections to PHP-FPM. A site with its own
+FPM pool gets its own `upstream php<version>-<pool>` block instead. Site configs and
+the site map only reference the upstream name.
+"""
+from pathlib import Path
+
+PROFILE_AUTO = "auto"
+PROFILE_LARAVEL = "laravel"
+PROFILE_SYMFONY = "symfony"
+PROFILE_WORDPRESS = "wordpress"
+PROFILE_STATIC = "static"
+PROFILE_SPA = "spa"
+PROFILE_PROXY = "proxy"
+DEFAULT_PROFILE = PROFILE_LARAVEL
+
+# Detected framework_type (see site_manager._detect_framework_info) -> profile
+FRAMEWORK_PROFILES = {
+    "Laravel": PROFILE_LARAVEL,
+    "Statamic": PROFILE_LARAVEL,
+    "Yii2": PROFILE_LARAVEL,
+    "CraftCMS": PROFILE_LARAVEL,
+    "Symfony": PROFILE_SYMFONY,
+    "WordPress": PROFILE_WORDPRESS,
+}
+
+# --- Location Templates (str.format: literal braces are doubled) ---
+_PHP_LOCATION = r"""
+    location ~ \.php$ {{
+        try_files $uri =404;
+        fastcgi_split_path_info ^(.+\.php)(/.+)$;
+        fastcgi_pass {fastcgi_pass};
+        fastcgi_keep_conn on;
+        fastcgi_index index.php;
+        fastcgi_param SCRIPT_FILENAME $document_root$fastcgi_script_name;
+        include "{fastcgi_params}";
+    }}
+"""
+
+_LARAVEL_LOCATIONS = r"""
+    location / {{
+        try_files $uri $uri/ /index.php?$query_string;
+    }}
+""" + _PHP_LOCATION
+
+_SYMFONY_LOCATIONS = r"""
+    location / {{
+        try_files $uri /index.php$is_args$args;
+    }}
+
+    location ~ ^/index\.php(/|$) {{
+        fastcgi_split_path_info ^(.+\.php)(/.*)$;
+        fastcgi_pass {fastcgi_pass};
+        fastcgi_keep_conn on;
+        include "{fastcgi_params}";
+        fastcgi_param SCRIPT_FILENAME $realpath_root$fastcgi_script_name;
+        fastcgi_param DOCUMENT_ROOT $realpath_root;
+        internal;
+    }}
+
+    location ~ \.php$ {{
+        return 404;
+    }}
+"""
+
+_WORDPRESS_LOCATIONS = r"""
+    location / {{
+        try_files $uri $uri/ /index.php?$args;
+    }}
+
+    location = /favicon.ico {{ log_not_found off; access_log off; }}
+    location = /robots.txt {{ log_not_found off; access_log off; }}
+""" + _PHP_LOCATION
+
+_STATIC_LOCATIONS = r"""
+    location / {{
+        try_files $uri $uri/ =404;
+    }}
+"""
+
+_SPA_LOCATIONS = r"""
+    location / {{
+        try_files $uri $uri/ /index.html;
+    }}
+"""
+
+_PROXY_LOCATIONS = r"""
+    location / {{
+        proxy_pass http://127.0.0.1:{proxy_port};
+        proxy_http_version 1.1;
+        proxy_set_header Host $host;
+        proxy_set_header X-Real-IP $remote_addr;
+        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto $scheme;
+        proxy_set_header Upgrade $http_upgrade;
+        proxy_set_header Connection "upgrade";
+    }}
+"""
+
+# profile -> (label, uses PHP, index files, location template)
+PROFILES = {
+    PROFILE_LARAVEL: ("Front controller (Laravel, Statamic, Yii2, Craft)", True, "index.php index.html index.htm", _LARAVEL_LOCATIONS),
+    PROFILE_SYMFONY: ("Symfony", True, "index.php", _SYMFONY_LOCATIONS),
+    PROFILE_WORDPRESS: ("WordPress", True, "index.php index.html index.htm", _WORDPRESS_LOCATIONS),
+    PROFILE_STATIC: ("Static files", False, "index.html index.htm", _STATIC_LOCATIONS),
+    PROFILE_SPA: ("Single-page app", False, "index.html", _SPA_LOCATIONS),
+    PROFILE_PROXY: ("Proxy to Node dev server", False, "index.html", _PROXY_LOCATIONS),
+}
+
+# Profiles the generic mapped server can serve -> try_files fallback for `location /`
+MAPPED_NOT_FOUND_URI = "/.grazr-not-found"
+MAPPED_PROFILES = {
+    PROFILE_LARAVEL: "/index.php?$query_string",
+    PROFILE_WORDPRESS: "/index.php?$args",
+    PROFILE_STATIC: MAPPED_NOT_FOUND_URI,
+    PROFILE_SPA: "/index.html",
+}
+
+# --- Server Block Templates ---
+_SERVER_COMMON = r"""    root "{root}";
+    index {index};
+    access_log "{access_log}";
+    error_log "{error_log}" warn;
+    charset utf-8;
+
+    location ~ /\. {{
+        deny all;
+    }}
+"""
+
+_HTTP_SERVER = r"""server {{
+    listen 80;
+    listen [::]:80;
+    server_name {domain};
+{common}{locations}}}
+"""
+
+_HTTPS_SERVER = r"""server {{
+    listen 443 ssl http2;
+    listen [::]:443 ssl http2;
+    server_name {domain};
+    ssl_certificate "{cert}";
+    ssl_certificate_key "{key}";
+    ssl_protocols TLSv1.2 TLSv1.3;
+    ssl_prefer_server_ciphers off;
+{common}{locations}}}
+"""
+
+_REDIRECT_SERVER = r"""server {{
+    listen 80;
+    listen [::]:80;
+    server_name {domain};
+    access_log off;
+    error_log "{error_log}" warn;
+    return 301 https://$host$request_uri;
+}}
+"""
+
+
+def quote_path(path):
+    """Escapes a path for use inside a double-quoted Nginx string."""
+    return str(path).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def profile_uses_php(profile):
+    return PROFILES.get(profile, PROFILES[DEFAULT_PROFILE])[1]
+
+
+def profile_for_site(site_info, docroot_path=None):
+    """
+    Picks the template profile for a site.
+
+    An explicit "nginx_template" setting wins. Otherwise the detected framework decides;
+    sites of unknown type whose docroot has an index.html but no index.php are static.
+    """
+    requested = (site_info or {}).get("nginx_template") or PROFILE_AUTO
+    if requested in PROFILES: return requested
+    framework = (site_info or {}).get("framework_type") or ""
+    if framework in FRAMEWORK_PROFILES: return FRAMEWORK_PROFILES[framework]
+    if docroot_path is not None:
+        docroot = Path(docroot_path)
+        if (docroot / "index.html").is_file() and not (docroot / "index.php").is_file():
+            return PROFILE_STATIC
+    return DEFAULT_PROFILE
+
+
+def render_site_config(profile, values, https=False):
+    """
+    Renders the complete config for one site.
+
+    Args:
+        profile (str): A key of PROFILES.
+        values (dict): domain, root, access_log, error_log and, depending on the
+            profile, fastcgi_pass + fastcgi_params (PHP) or proxy_port (proxy).
+            cert and key are required when https is True.
+        https (bool): Serve on 443 and redirect plain HTTP.
+
+    Returns:
+        str: The config text.
+
+    Raises:
+        KeyError: Unknown profile or a value the profile needs is missing.
+    """
+    label, _uses_php, index, locations = PROFILES[profile]
+    common = _SERVER_COMMON.format(index=index, **values)
+    blocks = [f"# Configuration for {values['domain']} generated by Grazr\n"
+              f"# Template: {profile} ({label}); HTTPS: {bool(https)}\n"]
+    if https:
+        blocks.append(_REDIRECT_SERVER.format(**values))
+        blocks.append(_HTTPS_SERVER.format(common=common, locations=locations.format(**values), **values))
+    else:
+        blocks.append(_HTTP_SERVER.format(common=common, locations=locations.format(**values), **values))
+    return "\n".join(blocks)
+
+
+_SITE_MAP = r"""# Site map generated by Grazr from the site list. Do not edit; changes are overwritten.
+# Sites: {site_count}
+map_hash_max_size 16384;
+map_hash_bucket_size 128;
+
+log_format grazr_mapped '$host $remote_addr - $remote_user [$time_local] "$request" '
+                        '$status $body_bytes_sent "$http_referer" "$http_user_agent"';
+
+map $host $grazr_root {{
+    default "";
+{root_entries}}}
+
+map $host $grazr_fastcgi {{
+    default "";
+{fastcgi_entries}}}
+
+map $host $grazr_fallback {{
+    default "{not_found}";
+{fallback_entries}}}
+
+server {{
+    listen 80;
+    listen [::]:80;
+    server_name ~\.{tld_regex}$;
+    root $grazr_root;
+    index index.php index.html index.htm;
+    access_log "{access_log}" grazr_mapped;
+    error_log "{error_log}" warn;
+    charset utf-8;
+
+    if ($grazr_root = "") {{
+        return 404;
+    }}
+
+    location ~ /\. {{
+        deny all;
+    }}
+
+    location / {{
+        try_files $uri $uri/ $grazr_fallback;
+    }}
+
+    location = {not_found} {{
+        internal;
+        return 404;
+    }}
+
+    location ~ \.php$ {{
+        if ($grazr_fastcgi = "") {{
+            return 404;
+        }}
+        try_files $uri =404;
+        fastcgi_split_path_info ^(.+\.php)(/.+)$;
+        fastcgi_pass $grazr_fastcgi;
+        fastcgi_keep_conn on;
+        fastcgi_index index.php;
+        fastcgi_param SCRIPT_FILENAME $document_root$fastcgi_script_name;
+        include "{fastcgi_params}";
+    }}
+}}
+"""
+
+
+def render_site_map(entries, values):
+    """
+    Renders the mapped-mode config: the $host maps and the generic server block.
+
+    Args:
+        entries (list): One dict per site: domain, root, profile (a key of
+            MAPPED_PROFILES) and fastcgi_pass (an upstream name, "" for sites without PHP).
+        values (dict): tld, access_log, error_log, fastcgi_params.
+
+    Returns:
+        str: The config text (entries are sorted by domain).
+    """
+    root_entries, fastcgi_entries, fallback_entries = [], [], []
+    for entry in sorted(entries, key=lambda e: e["domain"]):
+        domain = entry["domain"]
+        root_entries.append(f'    {domain} "{entry["root"]}";\n')
+        if entry.get("fastcgi_pass"):
+            fastcgi_entries.append(f'    {domain} "{entry["fastcgi_pass"]}";\n')
+        fallback = MAPPED_PROFILES[entry["profile"]]
+        if fallback != MAPPED_NOT_FOUND_URI:
+            fallback_entries.append(f'    {domain} "{fallback}";\n')
+    tld_regex = "".join(f"\\{c}" if not c.isalnum() else c for c in values["tld"])
+    return _SITE_MAP.format(
+        site_count=len(entries), root_entries="".join(root_entries),
+        fastcgi_entries="".join(fastcgi_entries), fallback_entries="".join(fallback_entries),
+        not_found=MAPPED_NOT_FOUND_URI, tld_regex=tld_regex, access_log=values["access_log"],
+        error_log=values["error_log"], fastcgi_params=values["fastcgi_params"],
+    )
+
+
+_PHP_UPSTREAM = r"""upstream {name} {{
+    server "unix:{socket}";
+    keepalive {keepalive};
+}}
+"""
+
+
+def php_upstream_name(version):
+    """Name of the shared upstream for a PHP version ("php8.3")."""
+    return f"php{version}"
+
+
+def php_pool_upstream_name(version, pool_name):
+    """Name of the upstream for a site's own FPM pool ("php8.3-site-myapp_test")."""
+    return f"{php_upstream_name(version)}-{pool_name}"
+
+
+def render_php_upstreams(sockets, keepalive, pool_sockets=None):
+    """
+    Renders one upstream block per PHP version, plus one per per-site FPM pool.
+
+    Args:
+        sockets (dict): PHP version -> escaped PHP-FPM socket path.
+        keepalive (int): Idle connections each Nginx worker keeps open per upstream.
+        pool_sockets (dict, optional): (PHP version, pool name) -> escaped socket path.
+
+    Returns:
+        str: The config text (versions, then pools, sorted).
+    """
+    blocks = ["# PHP-FPM upstreams generated by Grazr, one per PHP version and site pool. Do not edit.\n"]
+    for version in sorted(sockets):
+        blocks.append(_PHP_UPSTREAM.format(name=php_upstream_name(version), socket=sockets[version],
+                                           keepalive=keepalive))
+    for version, pool_name in sorted(pool_sockets or {}):
+        blocks.append(_PHP_UPSTREAM.format(name=php_pool_upstream_name(version, pool_name),
+                                           socket=pool_sockets[(version, pool_name)], keepalive=keepalive))
+    return "\n".join(blocks)
@@ -171,6 +171,15 @@ def list_installed_node_versions():
              print("Node Manager Warning: Could not sort installed versions numerically.")
     return versions
 
+def _refresh_node_version_map():
+    """Rewrites the version -> bin dir map the node/npm/npx shims exec from (no nvm.sh)."""
+    try:
+        from ..core import shim_tables
+        if not shim_tables.write_node_version_map():
+            print("Node Manager Warning: Could not refresh Node version map; shims will fall back to nvm.")
+    except Exception as e:
+        print(f"Node Manager Warning: Could not refresh Node version map: {e}")
+
 def install_node_version(version):
     """
     Installs a specific Node.js version using the bundled NVM.
@@ -187,6 +196,7 @@ def install_node_version(version):
     # Basic validation? NVM handles invalid versions.
     print(f"Node Manager: Attempting to install Node.js version '{version}'...")
     success, output = _run_nvm_command(["install", version])
+    _refresh_node_version_map()
     # Check if binary path exists after install attempt
     if success:
          node_path = get_node_bin_path(version) # Use helper to check path
@@ -215,6 +225,7 @@ def uninstall_node_version(version):
 
     print(f"Node Manager: Attempting to uninstall Node.js version '{version}'...")
     success, output = _run_nvm_command(["uninstall", version])
+    _refresh_node_version_map()
     # Check if binary path is gone after uninstall attempt
     if success:
          node_path = get_node_bin_path(version)
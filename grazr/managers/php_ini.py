@@ -0,0 +1,92 @@
+"""
+Line-preserving model of a php.ini file.
+
+IniDocument keeps every line of the file as it was read (comments, blank lines,
+section headers, ordering), plus an index of the active directives by lower-cased
+key, so lookups are O(1) and writing the document back only changes the lines of
+the keys that were set.
+
+Like PHP itself, the last active occurrence of a key wins and section headers are
+ignored, except for the per-directory/per-host [PATH=...] and [HOST=...] sections,
+whose directives do not apply globally and are left out of the index.
+"""
+import re
+
+_DIRECTIVE_RE = re.compile(r"^\s*([^;#=\[\s][^=]*?)\s*=(.*)$")
+_SECTION_RE = re.compile(r"^\s*\[([^\]]*)\]")
+
+
+def _parse_value(raw):
+    """'"128M" ; comment' -> 128M. Unquoted values end at the first ';'."""
+    value = raw.strip()
+    if value[:1] in ('"', "'"):
+        closing = value.find(value[0], 1)
+        if closing != -1: return value[1:closing]
+    return value.split(';', 1)[0].strip()
+
+
+class IniDocument:
+    """A parsed php.ini. Not thread-safe; treat cached instances as read-only and copy() to edit."""
+
+    def __init__(self, text=""):
+        self.lines = text.splitlines()
+        self._reindex()
+
+    def _reindex(self):
+        self._index = {}  # lower-cased key -> line numbers of its active occurrences
+        self._first_scoped = None  # Line of the first [PATH=]/[HOST=] section; new keys go before it
+        scoped = False
+        for number, line in enumerate(self.lines):
+            section = _SECTION_RE.match(line)
+            if section:
+                scoped = section.group(1).strip().upper().startswith(("PATH=", "HOST="))
+                if scoped and self._first_scoped is None: self._first_scoped = number
+                continue
+            if scoped: continue
+            match = _DIRECTIVE_RE.match(line)
+            if match: self._index.setdefault(match.group(1).lower(), []).append(number)
+
+    def copy(self):
+        clone = IniDocument.__new__(IniDocument)
+        clone.lines = list(self.lines)
+        clone._index = {key: list(numbers) for key, numbers in self._index.items()}
+        clone._first_scoped = self._first_scoped
+        return clone
+
+    def __contains__(self, key):
+        return key.lower() in self._index
+
+    def get(self, key, default=None):
+        numbers = self._index.get(key.lower())
+        if not numbers: return default
+        return _parse_value(_DIRECTIVE_RE.match(self.lines[numbers[-1]]).group(2))
+
+    def get_many(self, keys):
+        """{key: value or None} for each of keys."""
+        return {key: self.get(key) for key in keys}
+
+    def set(self, key, value):
+        """
+        Rewrites every active occurrence of key as "key = value", or adds it at the end of
+        the global part of the file: before the first [PATH=]/[HOST=] section, whose
+        directives would not apply globally (adding a [PHP] header to a file without any
+        directive yet). Returns True if the text changed.
+        """
+        new_line = f"{key} = {value}"
+        numbers = self._index.get(key.lower())
+        if numbers:
+            changed = any(self.lines[n] != new_line for n in numbers)
+            for n in numbers: self.lines[n] = new_line
+            return changed
+        if not any(line.strip().lower() == "[php]" for line in self.lines) and \
+                not any(line.strip() and not line.strip().startswith(';') for line in self.lines):
+            self.lines.insert(0, "[PHP]")
+        if self._first_scoped is None:
+            self.lines.append(new_line)
+        else:
+            self.lines.insert(self._first_scoped, new_line)
+        self._reindex()
+        return True
+
+    def to_text(self):
+        return "\n".join(self.lines) + "\n"
@@ -6,13 +6,18 @@ import time
 from pathlib import Path
 import subprocess
 import re
-import configparser
 import glob
 import shutil
 import tempfile
 import traceback
 import logging
 import errno
+import hashlib
+import fcntl
+import json
+import threading
+
+from .php_ini import IniDocument
 
 logger = logging.getLogger(__name__)  # Use __name__ for module-specific logger
 
@@ -20,6 +25,7 @@ logger = logging.getLogger(__name__)  # Use __name__ for module-specific logger
 try:
     from ..core import config
     from ..core import process_manager
+    from ..core import readiness
 
     DEFAULT_PHP = config.DEFAULT_PHP  # Get default PHP from main config
 except ImportError as e:  # pragma: no cover
@@ -53,16 +59,40 @@ except ImportError as e:  # pragma: no cover
     class ProcessManagerDummy:
         def get_process_status(self, process_id): return "stopped"
 
+        def wait_until_running(self, process_id, **kwargs): return "stopped"
+
+        def wait_until_ready(self, process_id, service_type, **kwargs): return "stopped"
+
         def stop_process(self, process_id, **kwargs): return True
 
         def start_process(self, process_id, command, **kwargs): return True
 
+        def get_process_pid(self, process_id): return None
+
+        def check_pid_running(self, pid): return False
+
 
     process_manager = ProcessManagerDummy()
+
+
+    class ReadinessDummy:
+        def refine_status(self, service_type, status, **target): return status
+
+        def wait_until_ready(self, service_type, timeout, is_alive=None, **target): return False
+
+
+    readiness = ReadinessDummy()
     DEFAULT_PHP = config.DEFAULT_PHP
 # --- End Imports ---
 
 DEFAULT_EXTENSION_PRIORITY = "20"
+FPM_RELOAD_TIMEOUT = 10  # Seconds for the old workers to finish and the socket to accept again
+
+# Written into the active config root after a successful materialisation: what was built
+# from which bundle file, so later runs only touch files whose source or output changed.
+CONFIG_MANIFEST_FILENAME = ".grazr-manifest.json"
+CONFIG_MANIFEST_SCHEMA = "2"  # Bump when ensure_php_version_config_structure output changes
+LEGACY_FINGERPRINT_FILENAME = ".grazr-fingerprint"  # Schema 1, replaced by the manifest
 
 
 # --- Path Definitions ---
@@ -118,47 +148,205 @@ def get_php_version_paths(version_str: str):
         logger.error(f"PHP_MANAGER: Error in get_php_version_paths for PHP {version_str}: {e}", exc_info=True); return None
 
 # --- Placeholder Processing Helper ---
-def _process_placeholders_in_file(file_path: Path, active_config_root: Path):
-    # (Content from response #52 - this function is robust)
-    if not file_path.is_file(): logger.warning(
-        f"PHP_MANAGER: Cannot process placeholders: file not found {file_path}"); return False
-    logger.debug(f"PHP_MANAGER: Processing placeholders in {file_path} with prefix {active_config_root}")
+def _current_os_user():
+    try:
+        return os.getlogin()
+    except OSError:
+        return os.environ.get("USER", "nobody")
+
+
+def _render_config_content(content, active_config_root, scan_dir=None, sapi_label=None):
+    """
+    Replaces ${grazr_prefix} and $USER_PLACEHOLDER in a config file's text and, for php.ini,
+    appends the SAPI-specific scan_dir unless it is already there. Idempotent.
+    """
+    content = content.replace("${grazr_prefix}", str(active_config_root.resolve()))
+    content = content.replace("$USER_PLACEHOLDER", _current_os_user())
+    if scan_dir:
+        scan_dir_directive = f"scan_dir={scan_dir}"
+        if scan_dir_directive not in content:  # Avoid duplicate appends
+            content += f"\n; Grazr: Added by php_manager.py to scan {sapi_label}-specific conf.d\n{scan_dir_directive}\n"
+    return content
+
+
+def _write_config_atomic(path, content, mode=0o644):
+    """Writes a config file through a temp file + rename, so readers never see half a file."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
     try:
-        content = file_path.read_text(encoding='utf-8')
-        content = content.replace("${grazr_prefix}", str(active_config_root.resolve()))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except Exception:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+# --- Active Config Manifest ---
+_manifest_cache = {}  # str(manifest path) -> ((mtime_ns, size), manifest dict)
+
+
+def _compute_config_fingerprint(paths):
+    """
+    Cheap fingerprint of everything ensure_php_version_config_structure() reads from the bundle.
+    Uses (mtime_ns, size) of the templates and of the template directories (entry add/remove
+    bumps a directory's mtime), so it costs a handful of stat() calls and no file reads.
+    """
+    hasher = hashlib.sha1()
+    hasher.update(f"{CONFIG_MANIFEST_SCHEMA}|{paths['active_config_root']}".encode())
+    for key in ('bundle_cli_ini_template', 'bundle_fpm_ini_template', 'bundle_fpm_conf_template',
+                'bundle_fpm_pool_d_dir', 'bundle_cli_conf_d_dir', 'bundle_fpm_conf_d_dir',
+                'bundle_mods_available_dir', 'bundle_extensions_src_dir', 'bundle_lib_php_src_dir'):
         try:
-            current_os_user = os.getlogin()
+            st = os.stat(paths[key])
+            hasher.update(f"|{key}:{st.st_mtime_ns}:{st.st_size}".encode())
         except OSError:
-            current_os_user = os.environ.get("USER", "nobody")
-        content = content.replace("$USER_PLACEHOLDER", current_os_user)
-        file_path.write_text(content, encoding='utf-8')
-        # Check if file is empty after writing (allow for fpm ini if its template was empty)
-        # This check was problematic, let's refine it or rely on subsequent operations failing if file is bad.
-        # For now, we assume write_text is atomic enough or errors out if it fails badly.
-        # if file_path.stat().st_size == 0:
-        #     # Check if it's the FPM ini and if its source template was also effectively empty or non-existent
-        #     paths = get_php_version_paths(active_config_root.name) # Get version from active_config_root
-        #     is_fpm_ini_and_template_missing = False
-        #     if paths and file_path == paths.get('active_fpm_ini'):
-        #         bundle_fpm_template = paths.get('bundle_fpm_ini_template')
-        #         if not bundle_fpm_template or not bundle_fpm_template.is_file() or bundle_fpm_template.stat().st_size == 0:
-        #             is_fpm_ini_and_template_missing = True
-        #     if not is_fpm_ini_and_template_missing:
-        #         logger.error(f"PHP_MANAGER: CRITICAL - File {file_path} is empty after placeholder processing!")
-        #         return False
+            hasher.update(f"|{key}:-".encode())
+    return hasher.hexdigest()
+
+
+def _stat_key(path):
+    """[mtime_ns, size] of path, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _load_config_manifest(paths):
+    """
+    The manifest of a version's active config, or None if it is missing, unreadable or from
+    another schema. Parsed manifests are cached per process and revalidated with one stat().
+    """
+    manifest_path = paths['active_config_root'] / CONFIG_MANIFEST_FILENAME
+    try:
+        st = os.stat(manifest_path)
+    except OSError:
+        return None
+    stat_key = (st.st_mtime_ns, st.st_size)
+    cached = _manifest_cache.get(str(manifest_path))
+    if cached and cached[0] == stat_key: return cached[1]
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"PHP_MANAGER: Ignoring unreadable config manifest {manifest_path}: {e}")
+        return None
+    if not isinstance(manifest, dict) or manifest.get("schema") != CONFIG_MANIFEST_SCHEMA: return None
+    _manifest_cache[str(manifest_path)] = (stat_key, manifest)
+    return manifest
+
+
+def _write_config_manifest(paths, files):
+    active_config_root = paths['active_config_root']
+    manifest_path = active_config_root / CONFIG_MANIFEST_FILENAME
+    manifest = {"schema": CONFIG_MANIFEST_SCHEMA, "fingerprint": _compute_config_fingerprint(paths),
+                "prefix": str(active_config_root), "files": files}
+    try:
+        _write_config_atomic(manifest_path, json.dumps(manifest, indent=1, sort_keys=True) + "\n")
+        st = os.stat(manifest_path)
+        _manifest_cache[str(manifest_path)] = ((st.st_mtime_ns, st.st_size), manifest)
+        (active_config_root / LEGACY_FINGERPRINT_FILENAME).unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"PHP_MANAGER: Could not write config manifest for {active_config_root}: {e}")
+
+
+def is_php_config_structure_current(version):
+    """
+    Read-only check: True if the active config for this PHP version is materialised and
+    was built from the bundle as it is now. Never writes anything; safe for the shim hot path.
+    """
+    paths = get_php_version_paths(version)
+    if not paths: return False
+    manifest = _load_config_manifest(paths)
+    if not manifest: return False
+    for key in ('active_cli_ini', 'active_fpm_conf'):
+        if not paths[key].is_file(): return False
+    return manifest.get("fingerprint") == _compute_config_fingerprint(paths)
+
+
+def _materialise_config_file(old_files, new_files, source, target, active_config_root,
+                             overwrite=False, scan_dir=None, sapi_label=None):
+    """
+    Builds target from a bundle template, recording it in new_files (keyed by the path
+    relative to the active config root) as source hash, processed hash and mode.
+
+    Nothing is read or written if neither the source nor the target changed since the
+    manifest entry was recorded. Otherwise an existing target is kept (user edits survive)
+    and only re-processed in place, unless overwrite is set: then it follows the template.
+
+    Returns:
+        bool: True if target exists and is processed.
+    """
+    rel = os.path.relpath(target, active_config_root)
+    entry = old_files.get(rel)
+    source_stat, target_stat = _stat_key(source), _stat_key(target)
+    if source_stat is None: return False
+    if entry and target_stat and entry.get("source_stat") == source_stat and entry.get("target_stat") == target_stat:
+        new_files[rel] = entry
         return True
-    except Exception as e:
-        logger.error(f"PHP_MANAGER: Error processing placeholders in {file_path}: {e}", exc_info=True)
-        try:
-            if file_path.is_file(): file_path.unlink(missing_ok=True)
-            logger.warning(
-                f"PHP_MANAGER: Deleted potentially corrupted file {file_path} after placeholder processing error.")
-        except Exception as e_del:
-            logger.error(f"PHP_MANAGER: Could not delete corrupted file {file_path}: {e_del}")
-        return False
+
+    source_text = source.read_text(encoding='utf-8')
+    current = target.read_text(encoding='utf-8') if target_stat else None
+    base = source_text if overwrite or current is None else current
+    content = _render_config_content(base, active_config_root, scan_dir, sapi_label)
+    if content != current:
+        _write_config_atomic(target, content)
+        logger.debug(f"PHP_MANAGER: Materialised {target} from {source}")
+    st = os.stat(target)
+    new_files[rel] = {
+        "source": str(source), "source_stat": source_stat,
+        "source_hash": hashlib.sha1(source_text.encode('utf-8')).hexdigest(),
+        "output_hash": hashlib.sha1(content.encode('utf-8')).hexdigest(),
+        "mode": oct(st.st_mode & 0o777), "target_stat": [st.st_mtime_ns, st.st_size],
+    }
+    return True
+
+
+def _render_existing_only(path, active_config_root, scan_dir=None, sapi_label=None):
+    """Re-processes an active config file whose bundle template has gone missing."""
+    if not path.is_file(): logger.error(f"PHP_MANAGER: {path} missing and no bundle template."); return False
+    current = path.read_text(encoding='utf-8')
+    content = _render_config_content(current, active_config_root, scan_dir, sapi_label)
+    if content != current: _write_config_atomic(path, content)
+    return True
+
+
+def ensure_php_version_config_if_stale(version):
+    """
+    Materialises the active config only when is_php_config_structure_current() says it is
+    missing or out of date. Concurrent callers (e.g. parallel php shim invocations) are
+    serialised with a per-version lock file and re-check after acquiring it, so only one
+    of them does the work.
+
+    Returns:
+        bool: True if the active config is usable.
+    """
+    if is_php_config_structure_current(version): return True
+    try:
+        config.ensure_dir(config.PHP_CONFIG_DIR)
+        lock_path = config.PHP_CONFIG_DIR / f".{version}.lock"
+        with open(lock_path, 'w') as lock_f:
+            fcntl.flock(lock_f, fcntl.LOCK_EX)
+            try:
+                if is_php_config_structure_current(version): return True
+                return ensure_php_version_config_structure(version, force_recreate=False)
+            finally:
+                fcntl.flock(lock_f, fcntl.LOCK_UN)
+    except OSError as e:
+        logger.error(f"PHP_MANAGER: Could not lock config for PHP {version}: {e}")
+        return ensure_php_version_config_structure(version, force_recreate=False)
+
 
 # --- Ensure Active Config Structure ---
 def ensure_php_version_config_structure(version, force_recreate=False):  # Made public
+    """
+    Materialises the active config of a PHP version from its bundle. Incremental: the
+    manifest written at the end records every file built from the bundle, and files whose
+    source and target are unchanged since then are skipped without being read. Most callers
+    want ensure_php_version_config_if_stale(), which skips this entirely when nothing changed.
+    """
     logger.info(f"PHP_MANAGER: Ensuring config structure for PHP {version} (force_recreate={force_recreate})...")
     paths = get_php_version_paths(version)
     if not paths: logger.error(f"PHP_MANAGER: Failed to get paths for PHP {version}."); return False
@@ -177,6 +365,11 @@ def ensure_php_version_config_structure(version, force_recreate=False):  # Made
             logger.error(
                 f"PHP_MANAGER: Failed to remove existing active config {active_config_root}: {e}"); return False
 
+    manifest = None if force_recreate else _load_config_manifest(paths)
+    if manifest and manifest.get("prefix") != str(active_config_root): manifest = None
+    old_files = (manifest or {}).get("files") or {}
+    new_files = {}
+
     dirs_to_create = [
         paths['active_cli_confd'], paths['active_fpm_confd'], paths['active_mods_available'],
         paths['active_fpm_pool_dir'], paths['active_var_run'], paths['active_var_log'],
@@ -195,9 +388,11 @@ def ensure_php_version_config_structure(version, force_recreate=False):  # Made
         bundle_src_dir = paths.get(bundle_src_key);
         active_symlink = paths.get(active_symlink_key)
         if bundle_src_dir and bundle_src_dir.is_dir() and active_symlink:
+            link_target = str(bundle_src_dir.resolve())
+            if active_symlink.is_symlink() and os.readlink(active_symlink) == link_target: continue
             if active_symlink.exists() or active_symlink.is_symlink(): active_symlink.unlink(missing_ok=True)
             try:
-                active_symlink.symlink_to(bundle_src_dir.resolve(), target_is_directory=True); logger.debug(
+                active_symlink.symlink_to(link_target, target_is_directory=True); logger.debug(
                     f"PHP_MANAGER: Symlinked {symlink_name} to {active_symlink}")
             except Exception as e:
                 logger.error(f"PHP_MANAGER: Failed to symlink {symlink_name}: {e}")
@@ -210,29 +405,15 @@ def ensure_php_version_config_structure(version, force_recreate=False):  # Made
     active_cli_ini = paths.get('active_cli_ini')
     if not (template_cli_ini and active_cli_ini): logger.error(
         "PHP_MANAGER: Path definition error for CLI INI."); return False
-    if not active_cli_ini.is_file() or force_recreate:
-        if not template_cli_ini.is_file(): logger.error(
-            f"Bundle CLI INI template missing: {template_cli_ini}."); return False
-        try:
-            shutil.copy2(template_cli_ini, active_cli_ini); os.chmod(active_cli_ini, 0o644); logger.debug(
-                f"Copied {template_cli_ini} to {active_cli_ini}")
-        except Exception as e:
-            logger.error(f"Failed copy CLI INI: {e}"); return False
-    if not active_cli_ini.is_file(): logger.error(f"Active CLI INI {active_cli_ini} missing after copy."); return False
-    if not _process_placeholders_in_file(active_cli_ini, active_config_root): logger.error(
-        f"Failed placeholder processing for CLI INI: {active_cli_ini}."); return False
-    # Append SAPI-specific scan_dir for CLI
+    if not template_cli_ini.is_file() and not active_cli_ini.is_file(): logger.error(
+        f"Bundle CLI INI template missing: {template_cli_ini}."); return False
     try:
-        cli_scan_dir_path = str((active_config_root / 'cli' / 'conf.d').resolve())
-        cli_ini_content = active_cli_ini.read_text(encoding='utf-8')
-        scan_dir_directive_cli = f"scan_dir={cli_scan_dir_path}"
-        if scan_dir_directive_cli not in cli_ini_content:  # Avoid duplicate appends
-            with open(active_cli_ini, 'a', encoding='utf-8') as f:
-                f.write(f"\n; Grazr: Added by php_manager.py to scan CLI-specific conf.d\n")
-                f.write(f"{scan_dir_directive_cli}\n")
-            logger.debug(f"Appended scan_dir='{cli_scan_dir_path}' to {active_cli_ini}")
+        cli_scan_dir_path = str(paths['active_cli_confd'].resolve())
+        if not _materialise_config_file(old_files, new_files, template_cli_ini, active_cli_ini, active_config_root,
+                                        scan_dir=cli_scan_dir_path, sapi_label="CLI"):
+            if not _render_existing_only(active_cli_ini, active_config_root, cli_scan_dir_path, "CLI"): return False
     except Exception as e:
-        logger.error(f"Failed to append scan_dir to {active_cli_ini}: {e}"); return False
+        logger.error(f"Failed to materialise CLI INI {active_cli_ini}: {e}", exc_info=True); return False
     if not active_cli_ini.is_file() or active_cli_ini.stat().st_size == 0: logger.error(
         f"Active CLI INI {active_cli_ini} missing or empty!"); return False
 
@@ -242,116 +423,100 @@ def ensure_php_version_config_structure(version, force_recreate=False):  # Made
     if active_fpm_ini and active_fpm_ini != active_cli_ini:
         chosen_fpm_template = template_fpm_ini_bundle if template_fpm_ini_bundle and template_fpm_ini_bundle.is_file() else paths.get(
             'bundle_cli_ini_template')
-        if not active_fpm_ini.is_file() or force_recreate:
+        fpm_scan_dir_path = str(paths['active_fpm_confd'].resolve())
+        try:
             if chosen_fpm_template and chosen_fpm_template.is_file():
-                try:
-                    shutil.copy2(chosen_fpm_template, active_fpm_ini); os.chmod(active_fpm_ini, 0o644)
-                except Exception as e:
-                    logger.error(f"Failed copy FPM INI: {e}")
+                _materialise_config_file(old_files, new_files, chosen_fpm_template, active_fpm_ini, active_config_root,
+                                         scan_dir=fpm_scan_dir_path, sapi_label="FPM")
+            elif active_fpm_ini.is_file():
+                _render_existing_only(active_fpm_ini, active_config_root, fpm_scan_dir_path, "FPM")
             else:
-                logger.warning(f"No template for FPM INI: {active_fpm_ini}")
-        if active_fpm_ini.is_file():
-            if not _process_placeholders_in_file(active_fpm_ini, active_config_root): logger.warning(
-                f"Failed placeholders for FPM INI: {active_fpm_ini}")
-            # Append SAPI-specific scan_dir for FPM
-            try:
-                fpm_scan_dir_path = str((active_config_root / 'fpm' / 'conf.d').resolve())
-                fpm_ini_content = active_fpm_ini.read_text(encoding='utf-8')
-                scan_dir_directive_fpm = f"scan_dir={fpm_scan_dir_path}"
-                if scan_dir_directive_fpm not in fpm_ini_content:
-                    with open(active_fpm_ini, 'a', encoding='utf-8') as f:
-                        f.write(f"\n; Grazr: Added by php_manager.py to scan FPM-specific conf.d\n")
-                        f.write(f"{scan_dir_directive_fpm}\n")
-                    logger.debug(f"Appended scan_dir='{fpm_scan_dir_path}' to {active_fpm_ini}")
-            except Exception as e:
-                logger.error(f"Failed to append scan_dir to {active_fpm_ini}: {e}")
-        elif not (
-                chosen_fpm_template and chosen_fpm_template.is_file()):  # If no template was found and file still doesn't exist
-            logger.warning(
-                f"PHP_MANAGER: Active FPM INI {active_fpm_ini} could not be created as no template was found.")
+                logger.warning(
+                    f"PHP_MANAGER: Active FPM INI {active_fpm_ini} could not be created as no template was found.")
+        except Exception as e:
+            logger.error(f"Failed to materialise FPM INI {active_fpm_ini}: {e}")
 
     # php-fpm.conf (ESSENTIAL for FPM)
     template_fpm_conf = paths.get('bundle_fpm_conf_template');
     active_fpm_conf = paths.get('active_fpm_conf')
     if not (template_fpm_conf and active_fpm_conf): logger.error("Path error for FPM conf."); return False
-    if not active_fpm_conf.is_file() or force_recreate:
-        if not template_fpm_conf.is_file(): logger.error(
-            f"Bundle FPM conf template missing: {template_fpm_conf}."); return False
-        try:
-            shutil.copy2(template_fpm_conf, active_fpm_conf); os.chmod(active_fpm_conf, 0o644)
-        except Exception as e:
-            logger.error(f"Failed copy FPM conf: {e}"); return False
-    if not active_fpm_conf.is_file(): logger.error(
-        f"Active FPM conf missing after copy: {active_fpm_conf}"); return False
-    if not _process_placeholders_in_file(active_fpm_conf, active_config_root): logger.error(
-        f"Failed placeholders for FPM conf: {active_fpm_conf}"); return False
+    if not template_fpm_conf.is_file() and not active_fpm_conf.is_file(): logger.error(
+        f"Bundle FPM conf template missing: {template_fpm_conf}."); return False
+    try:
+        if not _materialise_config_file(old_files, new_files, template_fpm_conf, active_fpm_conf, active_config_root):
+            if not _render_existing_only(active_fpm_conf, active_config_root): return False
+    except Exception as e:
+        logger.error(f"Failed to materialise FPM conf {active_fpm_conf}: {e}"); return False
     if not active_fpm_conf.is_file() or active_fpm_conf.stat().st_size == 0: logger.error(
         f"Active FPM conf {active_fpm_conf} missing or empty!"); return False
 
-    # (Rest of the function for pool.d, conf.d population, mods-available population is the same as response #58)
-    # ...
+    # pool.d follows its templates (overwrite=True); the rest is only seeded from the bundle
     bundle_pool_dir = paths.get('bundle_fpm_pool_d_dir');
     active_pool_dir = paths.get('active_fpm_pool_dir')
     if bundle_pool_dir and bundle_pool_dir.is_dir() and active_pool_dir:
         for item in bundle_pool_dir.iterdir():
             if item.is_file() and item.name.endswith(".grazr-default"):
-                dest_name = item.name.replace(".grazr-default", "");
-                dest_path = active_pool_dir / dest_name
+                dest_path = active_pool_dir / item.name.replace(".grazr-default", "")
                 try:
-                    shutil.copy2(item, dest_path);
-                    os.chmod(dest_path, 0o644)
-                    if not _process_placeholders_in_file(dest_path, active_config_root): logger.warning(
-                        f"Failed placeholders for {dest_path}")
+                    _materialise_config_file(old_files, new_files, item, dest_path, active_config_root, overwrite=True)
                 except Exception as e:
                     logger.error(f"Failed copy/process {item.name} to pool.d: {e}")
 
-    for sapi_type in ["cli", "fpm"]:
-        bundle_sapi_conf_d = paths.get('bundle_base') / sapi_type / "conf.d";
-        active_sapi_conf_d = paths.get(f'active_{sapi_type}_confd')
-        if bundle_sapi_conf_d and bundle_sapi_conf_d.is_dir() and active_sapi_conf_d:
-            for item_in_bundle_confd in bundle_sapi_conf_d.iterdir():
-                target_in_active_confd = active_sapi_conf_d / item_in_bundle_confd.name
-                if not target_in_active_confd.exists() or force_recreate:
-                    if target_in_active_confd.is_symlink() or target_in_active_confd.exists(): target_in_active_confd.unlink(
-                        missing_ok=True)
-                    try:
-                        if item_in_bundle_confd.is_symlink():
-                            link_target_in_bundle_relative = os.readlink(item_in_bundle_confd);
-                            actual_ini_filename_in_mods = Path(link_target_in_bundle_relative).name
-                            source_for_new_link_in_active_mods = paths[
-                                                                     'active_mods_available'] / actual_ini_filename_in_mods
-                            if source_for_new_link_in_active_mods.is_file():
-                                relative_path_to_active_mod = os.path.relpath(
-                                    source_for_new_link_in_active_mods.resolve(), active_sapi_conf_d)
-                                os.symlink(relative_path_to_active_mod, target_in_active_confd);
-                                logger.debug(
-                                    f"Recreated symlink {target_in_active_confd} -> {relative_path_to_active_mod}")
-                            else:
-                                logger.warning(
-                                    f"Target INI {source_for_new_link_in_active_mods} for symlink {item_in_bundle_confd.name} not in active_mods_available.")
-                        elif item_in_bundle_confd.is_file():
-                            shutil.copy2(item_in_bundle_confd, target_in_active_confd)
-                    except Exception as e_cs:
-                        logger.error(
-                            f"Failed copy/symlink {item_in_bundle_confd.name} to active {sapi_type}/conf.d: {e_cs}")
-        else:
-            logger.debug(
-                f"Bundle conf.d for {sapi_type} ({bundle_sapi_conf_d}) or active path ({active_sapi_conf_d}) not found.")
-
+    # mods-available before conf.d: the conf.d symlinks point into it
     bundle_mods_avail = paths.get('bundle_mods_available_dir');
     active_mods_avail = paths.get('active_mods_available')
     if bundle_mods_avail and bundle_mods_avail.is_dir() and active_mods_avail:
         for item in bundle_mods_avail.iterdir():
             if item.is_file() and item.name.endswith(".ini"):
-                if not (active_mods_avail / item.name).exists() or force_recreate:
-                    try:
-                        shutil.copy2(item, active_mods_avail / item.name)
-                    except Exception as e:
-                        logger.error(f"Failed copy {item.name} to active mods-available: {e}")
+                try:
+                    _materialise_config_file(old_files, new_files, item, active_mods_avail / item.name, active_config_root)
+                except Exception as e:
+                    logger.error(f"Failed copy {item.name} to active mods-available: {e}")
     else:
         logger.warning(
             f"Bundle mods-available dir ({bundle_mods_avail}) or active path ({active_mods_avail}) not found.")
 
+    for sapi_type in ["cli", "fpm"]:
+        bundle_sapi_conf_d = paths.get('bundle_base') / sapi_type / "conf.d";
+        active_sapi_conf_d = paths.get(f'active_{sapi_type}_confd')
+        if not (bundle_sapi_conf_d and bundle_sapi_conf_d.is_dir() and active_sapi_conf_d):
+            logger.debug(
+                f"Bundle conf.d for {sapi_type} ({bundle_sapi_conf_d}) or active path ({active_sapi_conf_d}) not found.")
+            continue
+        for item_in_bundle_confd in bundle_sapi_conf_d.iterdir():
+            target_in_active_confd = active_sapi_conf_d / item_in_bundle_confd.name
+            rel = os.path.relpath(target_in_active_confd, active_config_root)
+            target_present = target_in_active_confd.exists()
+            if rel in old_files and not (target_present or target_in_active_confd.is_symlink()):
+                new_files[rel] = old_files[rel]  # Seeded before and removed since: the extension was disabled
+                continue
+            try:
+                if item_in_bundle_confd.is_symlink():
+                    if target_present:
+                        new_files[rel] = ({"link": os.readlink(target_in_active_confd)}
+                                          if target_in_active_confd.is_symlink() else {"source": str(item_in_bundle_confd)})
+                        continue
+                    target_in_active_confd.unlink(missing_ok=True)  # Dangling link
+                    actual_ini_filename_in_mods = Path(os.readlink(item_in_bundle_confd)).name
+                    source_for_new_link_in_active_mods = paths['active_mods_available'] / actual_ini_filename_in_mods
+                    if source_for_new_link_in_active_mods.is_file():
+                        relative_path_to_active_mod = os.path.relpath(
+                            source_for_new_link_in_active_mods.resolve(), active_sapi_conf_d)
+                        os.symlink(relative_path_to_active_mod, target_in_active_confd)
+                        new_files[rel] = {"link": relative_path_to_active_mod}
+                        logger.debug(f"Recreated symlink {target_in_active_confd} -> {relative_path_to_active_mod}")
+                    else:
+                        logger.warning(
+                            f"Target INI {source_for_new_link_in_active_mods} for symlink {item_in_bundle_confd.name} not in active_mods_available.")
+                elif item_in_bundle_confd.is_file():
+                    _materialise_config_file(old_files, new_files, item_in_bundle_confd, target_in_active_confd,
+                                             active_config_root)
+            except Exception as e_cs:
+                logger.error(
+                    f"Failed copy/symlink {item_in_bundle_confd.name} to active {sapi_type}/conf.d: {e_cs}")
+
+    if new_files != old_files or not manifest or manifest.get("fingerprint") != _compute_config_fingerprint(paths):
+        _write_config_manifest(paths, new_files)
     logger.info(f"PHP_MANAGER: Config structure for PHP {version} ensured/updated.")
     return True
 
@@ -458,7 +623,9 @@ def get_php_fpm_status(version_str):  # Your existing function
     # Use process_manager's helpers if available and robust
     if hasattr(process_manager, 'read_pid_file') and hasattr(process_manager, 'check_pid_running'):
         pid = process_manager.read_pid_file(str(pid_file_to_check))
-        if pid and process_manager.check_pid_running(pid): return "running"
+        if pid and process_manager.check_pid_running(pid):
+            # "starting" until the pool socket accepts connections
+            return readiness.refine_status("php-fpm", "running", socket_path=paths.get('fpm_sock'))
     else:  # Fallback direct check
         if pid_file_to_check.is_file():
             try:
@@ -474,13 +641,28 @@ def get_php_fpm_status(version_str):  # Your existing function
     return "stopped"
 
 
+def _php_fpm_command(version_str, paths):
+    """The php-fpm master command line and environment (PHPRC, PHP_INI_SCAN_DIR) for a version."""
+    command = [
+        str(_get_php_fpm_binary_path(version_str).resolve()),
+        '--fpm-config', str(paths['active_fpm_conf'].resolve()),
+        '--prefix', str(paths['active_config_root'].resolve()),
+        '--nodaemonize',
+        '-R'
+    ]
+    env = os.environ.copy()
+    env['PHPRC'] = str(paths['active_fpm_ini'].resolve())  # Tells FPM which php.ini to load
+    env['PHP_INI_SCAN_DIR'] = str(paths['active_fpm_confd'].resolve())  # Overrides any scan_dir in php.ini
+    return command, env
+
+
 def start_php_fpm(version_str):
     current_status = get_php_fpm_status(version_str)
     if current_status == "running":
         logger.info(f"PHP_MANAGER: PHP-FPM {version_str} is already running.")
         return True
 
-    if not ensure_php_version_config_structure(version_str, force_recreate=False):
+    if not ensure_php_version_config_if_stale(version_str):
         logger.error(f"PHP_MANAGER: Cannot start PHP-FPM {version_str}: active config preparation failed.")
         return False
 
@@ -532,23 +714,9 @@ def start_php_fpm(version_str):
         logger.error(f"PHP_MANAGER: Active FPM conf.d directory not found: {active_fpm_confd_path}");
         return False
 
-    command = [
-        str(fpm_bin.resolve()),
-        '--fpm-config', str(fpm_conf.resolve()),
-        '--prefix', str(active_config_root.resolve()),
-        '--nodaemonize',
-        '-R'
-    ]
-
-    # --- Set PHPRC and PHP_INI_SCAN_DIR environment variables ---
-    env = os.environ.copy()
-    env['PHPRC'] = str(active_fpm_ini_path.resolve())
+    command, env = _php_fpm_command(version_str, paths)
     logger.info(f"PHP_MANAGER: Setting PHPRC for FPM {version_str} to: {env['PHPRC']}")
-
-    # Explicitly set PHP_INI_SCAN_DIR for the FPM process
-    env['PHP_INI_SCAN_DIR'] = str(active_fpm_confd_path.resolve())
     logger.info(f"PHP_MANAGER: Setting PHP_INI_SCAN_DIR for FPM {version_str} to: {env['PHP_INI_SCAN_DIR']}")
-    # --- End Environment Setup ---
 
     process_id_template_str = getattr(config, 'PHP_FPM_PROCESS_ID_TEMPLATE', "php-fpm-{version}")
     process_id = process_id_template_str.format(version=version_str)
@@ -564,13 +732,9 @@ def start_php_fpm(version_str):
     )
 
     if success_launch:
-        status = "stopped"
-        for attempt in range(5):
-            time.sleep(0.5)
-            status = get_php_fpm_status(version_str)
-            if status == "running":
-                break
-            logger.debug(f"PHP_MANAGER: FPM status check attempt {attempt + 1}/5 for {version_str}: {status}")
+        # Returns once the pool socket accepts connections, or as soon as FPM exits
+        status = process_manager.wait_until_ready(process_id, "php-fpm", timeout=10,
+                                                  socket_path=expected_sock_path)
 
         logger.info(f"PHP_MANAGER: PHP-FPM {version_str} status after start attempt and checks: {status}")
         if status != "running":
@@ -604,76 +768,348 @@ def stop_php_fpm(version):  # Your existing function
 
 def restart_php_fpm(version):  # Your existing function
     logger.info(f"PHP_MANAGER: Attempting to restart PHP-FPM {version}...")
-    stop_php_fpm(version)
-    time.sleep(1.0)  # Increased delay after stop
+    stop_php_fpm(version)  # Returns once the old master has exited
     return start_php_fpm(version)
 
 
-def get_ini_value(version, key, sapi='fpm'):  # Your existing function
-    ini_path = get_php_ini_path(version, sapi)
-    logger.debug(f"PHP_MANAGER: Getting INI value '{key}' from {ini_path} (SAPI: {sapi})")
-    if not ini_path or not ini_path.is_file():
-        logger.warning(f"PHP_MANAGER: INI file not found for PHP {version} ({sapi}): {ini_path}")
-        return None
+def _php_fpm_worker_pids(master_pid):
+    """PIDs of the master's child processes (its workers), from /proc."""
     try:
-        parser = configparser.ConfigParser(interpolation=None, strict=False, comment_prefixes=';', allow_no_value=True)
-        content = ini_path.read_text(encoding='utf-8')
-        if not re.match(r'^\s*\[.*\]', content, re.MULTILINE) and content.strip(): content = "[PHP]\n" + content
-        parser.read_string(content)
-        sections_to_check = ['PHP', configparser.DEFAULTSECT];
-        if parser.defaults(): sections_to_check.append('')
-        for section_name in sections_to_check:
-            effective_section = section_name if section_name and section_name != configparser.DEFAULTSECT else None
-            if parser.has_option(effective_section, key):
-                return parser.get(effective_section, key)
-        with open(ini_path, 'r', encoding='utf-8') as f:
-            for line_content in f:
-                line_s = line_content.strip()
-                if not line_s or line_s.startswith(';') or line_s.startswith('#'): continue
-                if '=' in line_s:
-                    k_ini_raw, v_ini_raw = line_s.split('=', 1)
-                    if k_ini_raw.strip().lower() == key.lower():
-                        v_ini_stripped = v_ini_raw.strip().strip('"').strip("'");
-                        return v_ini_stripped
-        return None
-    except Exception as e:
-        logger.error(f"PHP_MANAGER: Error reading INI key '{key}': {e}", exc_info=True); return None
+        with open(f"/proc/{master_pid}/task/{master_pid}/children", encoding='ascii') as f:
+            return {int(pid) for pid in f.read().split()}
+    except OSError:  # Kernel without CONFIG_PROC_CHILDREN: scan every process for its parent
+        children = set()
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit(): continue
+            try:
+                with open(f"/proc/{entry}/stat", encoding='ascii', errors='replace') as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            if ppid == master_pid: children.add(int(entry))
+        return children
 
 
-def set_ini_value(version, key, value, sapi='fpm'):  # Your existing function
-    if not ensure_php_version_config_structure(version, force_recreate=False): return False
-    ini_path = get_php_ini_path(version, sapi)
-    if not ini_path: logger.error(f"PHP_MANAGER: Cannot set INI, path not found: {ini_path}"); return False
-    logger.info(f"PHP_MANAGER: Setting INI: {ini_path} ['{key}' = '{value}']")
+def _php_fpm_binary_changed(master_pid, fpm_bin):
+    """True if the running master's executable is not the file at fpm_bin any more (bundle upgraded)."""
     try:
-        lines = ini_path.read_text(encoding='utf-8').splitlines() if ini_path.is_file() else []
-    except Exception as e:
-        logger.error(f"PHP_MANAGER: Error reading INI {ini_path}: {e}"); return False
-    new_lines = [];
-    found = False;
-    regex_key = re.compile(r"^\s*" + re.escape(key) + r"\s*=", re.IGNORECASE)
-    for line in lines:
-        stripped_line = line.strip()
-        if not stripped_line.startswith(';') and not stripped_line.startswith('#') and regex_key.match(stripped_line):
-            new_lines.append(f"{key} = {value}");
-            found = True
+        running_path = os.readlink(f"/proc/{master_pid}/exe")
+        if running_path.endswith(" (deleted)"): return True  # Replaced on disk since it started
+        if running_path != str(fpm_bin.resolve()): return False  # Started through a wrapper; can't tell
+        running, current = os.stat(f"/proc/{master_pid}/exe"), os.stat(running_path)
+    except (OSError, AttributeError):
+        return False  # Can't tell; a reload is still the safe default
+    return (running.st_dev, running.st_ino) != (current.st_dev, current.st_ino)
+
+
+def _test_php_fpm_config(version, paths):
+    """Runs `php-fpm -t` against the active config. Returns (ok, output)."""
+    command, env = _php_fpm_command(version, paths)
+    try:
+        test = subprocess.run(command + ['-t'], env=env, capture_output=True, text=True, timeout=15)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return False, f"Could not run the config test: {e}"
+    return test.returncode == 0, (test.stderr or test.stdout).strip()
+
+
+def reload_php_fpm(version, timeout=FPM_RELOAD_TIMEOUT):
+    """
+    Gracefully reloads PHP-FPM's configuration and workers: validates the config with
+    `php-fpm -t`, sends SIGUSR2 to the master (in-flight requests finish, the listening
+    socket stays open) and waits until the old workers are gone, the new master has
+    rewritten its PID file and the pool socket accepts connections. Starts FPM if it is not running, and falls back to
+    restart_php_fpm() only when the php-fpm binary itself changed.
+
+    Returns:
+        bool: True if FPM is running the current config.
+    """
+    process_id = getattr(config, 'PHP_FPM_PROCESS_ID_TEMPLATE', "php-fpm-{version}").format(version=version)
+    master_pid = process_manager.get_process_pid(process_id)
+    if not master_pid:
+        logger.info(f"PHP_MANAGER: PHP-FPM {version} is not running, starting it instead of reloading.")
+        return start_php_fpm(version)
+    if not ensure_php_version_config_if_stale(version):
+        logger.error(f"PHP_MANAGER: Cannot reload PHP-FPM {version}: active config preparation failed.")
+        return False
+    paths = get_php_version_paths(version)
+    if not paths: return False
+    if _php_fpm_binary_changed(master_pid, _get_php_fpm_binary_path(version)):
+        logger.info(f"PHP_MANAGER: PHP-FPM {version} binary changed since it started, restarting instead of reloading.")
+        return restart_php_fpm(version)
+
+    tested_ok, test_output = _test_php_fpm_config(version, paths)
+    if not tested_ok:  # A master re-exec'd onto a broken config exits
+        logger.error(f"PHP_MANAGER: PHP-FPM {version} config test failed, keeping the running config:\n{test_output}")
+        return False
+
+    old_workers = _php_fpm_worker_pids(master_pid)
+    old_pid_file = _stat_key(paths['fpm_pid'])  # The re-exec'd master rewrites it once it is up
+    logger.info(f"PHP_MANAGER: Reloading PHP-FPM {version} (master PID {master_pid}, {len(old_workers)} workers)...")
+    try:
+        os.kill(master_pid, signal.SIGUSR2)
+    except OSError as e:
+        logger.error(f"PHP_MANAGER: Could not signal PHP-FPM {version} master {master_pid}: {e}"); return False
+
+    is_alive = lambda: process_manager.check_pid_running(master_pid)
+    deadline = time.monotonic() + timeout
+    # The old workers finish their requests and exit, then the master re-execs with the new config
+    while old_workers & _php_fpm_worker_pids(master_pid) or _stat_key(paths['fpm_pid']) in (None, old_pid_file):
+        if not is_alive() or time.monotonic() >= deadline: break
+        time.sleep(0.05)
+    if readiness.wait_until_ready("php-fpm", max(0.0, deadline - time.monotonic()), is_alive=is_alive,
+                                  socket_path=paths.get('fpm_sock')):
+        logger.info(f"PHP_MANAGER: PHP-FPM {version} reloaded.")
+        return True
+    if not is_alive():
+        logger.error(f"PHP_MANAGER: PHP-FPM {version} master exited during reload. Log: {paths.get('active_fpm_error_log')}")
+    else:
+        logger.error(f"PHP_MANAGER: PHP-FPM {version} not accepting connections {timeout}s after reload.")
+    return False
+
+
+# --- Per-Site FPM Pools ---
+# A site's optional "php_pool" setting (None = the version's shared www pool) is a dict
+# of FPM directives; anything missing or invalid falls back to these defaults.
+SITE_POOL_DEFAULTS = {
+    "pm": "ondemand",
+    "pm.max_children": 5,
+    "pm.max_requests": 500,
+    "request_slowlog_timeout": "5s",
+}
+SITE_POOL_PM_MODES = ("static", "dynamic", "ondemand")
+SITE_POOL_FILE_PREFIX = "site-"
+SITE_POOL_MARKER = "; Generated by Grazr from the site's php_pool setting. Changes here are overwritten."
+_SITE_POOL_TIMEOUT_RE = re.compile(r"^\d+[smhd]?$")
+_SOCKET_PATH_MAX = 100  # sun_path is 108 bytes on Linux
+
+_SITE_POOL_TEMPLATE = """{marker}
+; Site: {domain}
+[{name}]
+user = {user}
+listen = {socket}
+listen.mode = 0660
+pm = {pm}
+pm.max_children = {max_children}
+{pm_extra}pm.max_requests = {max_requests}
+slowlog = {slowlog}
+request_slowlog_timeout = {slowlog_timeout}
+catch_workers_output = yes
+"""
+
+_site_pool_locks = {}  # version -> threading.Lock around writing that version's pool files
+_site_pool_locks_guard = threading.Lock()
+_fpm_reload_requests = {}  # version -> {"lock", "requested", "completed", "result"}
+
+
+def site_pool_name(domain):
+    """FPM pool name of a site's own pool, e.g. "site-myapp_test"."""
+    return SITE_POOL_FILE_PREFIX + re.sub(r"[^A-Za-z0-9_-]", "_", str(domain))
+
+
+def get_site_pool_socket_path(version, domain):
+    """Socket of a site's own pool, next to the version's shared socket."""
+    paths = get_php_version_paths(version)
+    if not paths: return None
+    sock_path = paths['active_var_run'] / f"{site_pool_name(domain)}.sock"
+    if len(str(sock_path)) > _SOCKET_PATH_MAX:  # Long domains/homes: fall back to a short stable name
+        digest = hashlib.sha1(str(domain).encode()).hexdigest()[:12]
+        sock_path = paths['active_var_run'] / f"{SITE_POOL_FILE_PREFIX}{digest}.sock"
+    return sock_path
+
+
+def normalize_site_pool_settings(overrides):
+    """
+    Merges a site's php_pool setting over SITE_POOL_DEFAULTS, dropping invalid values
+    (with a warning) so a typo can never produce a pool FPM refuses to load.
+    """
+    settings = dict(SITE_POOL_DEFAULTS)
+    for key, value in (overrides or {}).items():
+        if key not in SITE_POOL_DEFAULTS:
+            logger.warning(f"PHP_MANAGER: Ignoring unsupported php_pool setting '{key}'."); continue
+        if key == "pm":
+            valid = str(value) in SITE_POOL_PM_MODES
+        elif key == "request_slowlog_timeout":
+            valid = bool(_SITE_POOL_TIMEOUT_RE.match(str(value)))
+        else:
+            try:
+                valid = int(value) > 0; value = int(value)
+            except (TypeError, ValueError):
+                valid = False
+        if valid:
+            settings[key] = value
         else:
-            new_lines.append(line)
-    if not found:
-        has_php_section = any(l.strip().lower() == "[php]" for l in new_lines)
-        if not has_php_section and not any(
-            l.strip() and not l.strip().startswith(';') for l in new_lines): new_lines.insert(0, "[PHP]")
-        new_lines.append(f"{key} = {value}")
+            logger.warning(f"PHP_MANAGER: Invalid php_pool value {key}={value!r}, using {SITE_POOL_DEFAULTS[key]!r}.")
+    return settings
+
+
+def _render_site_pool(version, domain, settings, paths):
+    name = site_pool_name(domain)
+    max_children = settings["pm.max_children"]
+    if settings["pm"] == "dynamic":
+        max_spare = min(3, max_children)
+        pm_extra = (f"pm.start_servers = {min(2, max_spare)}\npm.min_spare_servers = 1\n"
+                    f"pm.max_spare_servers = {max_spare}\n")
+    elif settings["pm"] == "ondemand":
+        pm_extra = "pm.process_idle_timeout = 10s\n"
+    else:
+        pm_extra = ""
+    return _SITE_POOL_TEMPLATE.format(
+        marker=SITE_POOL_MARKER, domain=domain, name=name, user=_current_os_user(),
+        socket=get_site_pool_socket_path(version, domain), pm=settings["pm"], max_children=max_children,
+        pm_extra=pm_extra, max_requests=settings["pm.max_requests"],
+        slowlog=paths['active_var_log'] / f"php{version}-{name}.slow.log",
+        slowlog_timeout=settings["request_slowlog_timeout"])
+
+
+def _is_site_pool_file(path):
+    if not (path.name.startswith(SITE_POOL_FILE_PREFIX) and path.name.endswith(".conf")): return False
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.readline().rstrip("\n") == SITE_POOL_MARKER
+    except OSError:
+        return False
+
+
+def apply_site_pools(version, site_pools):
+    """
+    Makes the version's pool.d hold exactly one generated pool file per entry of
+    site_pools ({domain: php_pool setting}), leaving the shared www pool and any
+    hand-written pools alone. Unchanged files are not rewritten. If anything changed the
+    new set is checked with `php-fpm -t` and rolled back when FPM rejects it. Does not
+    reload FPM; see request_php_fpm_reload().
+
+    Returns:
+        tuple: (success, message, changed)
+    """
+    paths = get_php_version_paths(version)
+    if not paths: return False, f"No paths for PHP {version}.", False
+    pool_dir = paths['active_fpm_pool_dir']
+    if not site_pools and not pool_dir.is_dir():  # Version never configured: nothing to add or remove
+        return True, f"Site pools for PHP {version} unchanged.", False
+    if not ensure_php_version_config_if_stale(version):
+        return False, f"Active config for PHP {version} is not usable.", False
+    with _site_pool_locks_guard:
+        lock = _site_pool_locks.setdefault(version, threading.Lock())
+    with lock:
+        wanted = {pool_dir / f"{site_pool_name(domain)}.conf":
+                  _render_site_pool(version, domain, normalize_site_pool_settings(overrides), paths)
+                  for domain, overrides in site_pools.items()}
+        existing = {path for path in pool_dir.glob(f"{SITE_POOL_FILE_PREFIX}*.conf") if _is_site_pool_file(path)}
+        previous = {}  # path -> old content (None if new), for rolling back
+        try:
+            for path, content in wanted.items():
+                old_content = path.read_text(encoding='utf-8') if path in existing else None
+                if old_content == content: continue
+                _write_config_atomic(path, content); previous[path] = old_content
+            for path in existing - set(wanted):
+                previous[path] = path.read_text(encoding='utf-8'); path.unlink()
+        except OSError as e:
+            logger.error(f"PHP_MANAGER: Failed to write site pools for PHP {version}: {e}")
+            _restore_site_pools(previous)
+            return False, f"Could not write site pools for PHP {version}: {e}", False
+        if not previous:
+            return True, f"Site pools for PHP {version} unchanged.", False
+
+        tested_ok, test_output = _test_php_fpm_config(version, paths)
+        if not tested_ok:
+            logger.error(f"PHP_MANAGER: PHP-FPM {version} rejected the site pools, rolling back:\n{test_output}")
+            _restore_site_pools(previous)
+            return False, f"PHP-FPM {version} rejected the site pools: {test_output or 'config test failed'}", False
+    logger.info(f"PHP_MANAGER: Site pools for PHP {version} updated ({len(wanted)} active, {len(previous)} changed).")
+    return True, f"Site pools for PHP {version} updated.", True
+
+
+def _restore_site_pools(previous):
+    for path, content in previous.items():
+        try:
+            if content is None: path.unlink(missing_ok=True)
+            else: _write_config_atomic(path, content)
+        except OSError as e:
+            logger.error(f"PHP_MANAGER: Could not restore pool file {path}: {e}")
+
+
+def request_php_fpm_reload(version):
+    """
+    Coalescing front for reload_php_fpm(): callers that queue up behind a reload in
+    progress are served by a single follow-up reload, which picks up every change
+    written before it started. Does nothing if FPM for the version is not running.
+
+    Returns:
+        bool: True if FPM is running the current config (or is not running at all).
+    """
+    process_id = getattr(config, 'PHP_FPM_PROCESS_ID_TEMPLATE', "php-fpm-{version}").format(version=version)
+    if not process_manager.get_process_pid(process_id): return True
+    with _site_pool_locks_guard:
+        state = _fpm_reload_requests.setdefault(
+            version, {"lock": threading.Lock(), "requested": 0, "completed": 0, "result": True})
+        state["requested"] += 1
+        ticket = state["requested"]
+    with state["lock"]:
+        if state["completed"] >= ticket: return state["result"]  # A reload started after our request
+        with _site_pool_locks_guard: covered = state["requested"]
+        result = reload_php_fpm(version)
+        state["completed"], state["result"] = covered, result
+        return result
+
+
+# --- INI Documents ---
+_ini_cache = {}  # (version, sapi) -> ((mtime_ns, size), IniDocument)
+
+
+def _load_ini_document(version, sapi='fpm'):
+    """
+    The parsed active php.ini of a version/SAPI as (path, IniDocument), or (path, None) if it
+    is missing or unreadable. Documents are cached per (version, sapi) and re-parsed only when
+    the file's mtime/size changed. The returned document is shared: copy() it before editing.
+    """
+    ini_path = get_php_ini_path(version, sapi)
+    if not ini_path: return None, None
+    try:
+        st = os.stat(ini_path)
+    except OSError:
+        return ini_path, None
+    cache_key, stat_key = (str(version), sapi.lower()), (st.st_mtime_ns, st.st_size)
+    cached = _ini_cache.get(cache_key)
+    if cached and cached[0] == stat_key: return ini_path, cached[1]
+    try:
+        document = IniDocument(ini_path.read_text(encoding='utf-8'))
+    except (OSError, UnicodeDecodeError) as e:
+        logger.error(f"PHP_MANAGER: Error reading INI {ini_path}: {e}")
+        return ini_path, None
+    _ini_cache[cache_key] = (stat_key, document)
+    return ini_path, document
+
+
+def get_ini_values(version, keys, sapi='fpm'):
+    """
+    Reads several keys from the active SAPI php.ini with a single stat (and a parse only if
+    the file changed since the last call). Returns {key: value or None}.
+    """
+    ini_path, document = _load_ini_document(version, sapi)
+    if document is None:
+        logger.warning(f"PHP_MANAGER: INI file not found for PHP {version} ({sapi}): {ini_path}")
+        return {key: None for key in keys}
+    return document.get_many(keys)
+
+
+def get_ini_value(version, key, sapi='fpm'):  # Your existing function
+    return get_ini_values(version, [key], sapi)[key]
+
+
+def _write_ini_document(version, sapi, ini_path, document):
+    """Atomically replaces ini_path with document (fsynced temp file + rename) and caches it."""
     temp_path_obj = None
     try:
         with tempfile.NamedTemporaryFile('w', dir=ini_path.parent, delete=False, encoding='utf-8',
                                          prefix=f"{ini_path.name}.tmp.") as temp_f:
             temp_path_obj = Path(temp_f.name);
-            temp_f.write("\n".join(new_lines) + "\n");
+            temp_f.write(document.to_text());
             temp_f.flush();
             os.fsync(temp_f.fileno())
-        if ini_path.exists(): shutil.copystat(ini_path, temp_path_obj)
+        if ini_path.exists(): shutil.copymode(ini_path, temp_path_obj)  # Not copystat: the mtime must change for the INI cache
         os.replace(temp_path_obj, ini_path);
+        st = os.stat(ini_path)
+        _ini_cache[(str(version), sapi.lower())] = ((st.st_mtime_ns, st.st_size), document)
         return True
     except Exception as e:
         logger.error(f"PHP_MANAGER: Error writing INI {ini_path}: {e}", exc_info=True)
@@ -681,6 +1117,37 @@ def set_ini_value(version, key, value, sapi='fpm'):  # Your existing function
         return False
 
 
+def set_ini_values(version, settings, sapis=("cli", "fpm")):
+    """
+    Applies all {key: value} settings to the active php.ini of each SAPI in one pass: the
+    config structure is checked once, and each file is edited in memory and replaced
+    atomically at most once (not at all if every value is already set).
+
+    Returns:
+        dict: {sapi: bool} success per SAPI.
+    """
+    if not ensure_php_version_config_if_stale(version): return {sapi: False for sapi in sapis}
+    results = {}
+    for sapi in sapis:
+        ini_path, document = _load_ini_document(version, sapi)
+        if not ini_path:
+            logger.error(f"PHP_MANAGER: Cannot set INI, path not found for PHP {version} ({sapi})")
+            results[sapi] = False; continue
+        if document is None and ini_path.exists():
+            results[sapi] = False; continue  # Unreadable, already logged
+        logger.info(f"PHP_MANAGER: Setting INI: {ini_path} {settings}")
+        document = document.copy() if document is not None else IniDocument()
+        changed = False
+        for key, value in settings.items():
+            changed = document.set(key, value) or changed
+        results[sapi] = _write_ini_document(version, sapi, ini_path, document) if changed else True
+    return results
+
+
+def set_ini_value(version, key, value, sapi='fpm'):  # Your existing function
+    return set_ini_values(version, {key: value}, sapis=(sapi,))[sapi]
+
+
 # --- Extension Management Functions (from your original code, ensure paths are correct) ---
 def _get_extension_ini_filename(ext_name):
     return f"{DEFAULT_EXTENSION_PRIORITY}-{ext_name}.ini"
@@ -798,32 +1265,31 @@ def _manage_confd_symlinks(version, ext_name, enable=True):
 
 def enable_extension(version, ext_name):  # Your existing function
     logger.info(f"PHP_MANAGER: Enabling PHP extension {ext_name} for version {version}...")
-    if not ensure_php_version_config_structure(version): return False, "Config structure error on enable."
+    if not ensure_php_version_config_if_stale(version): return False, "Config structure error on enable."
     ok_ini, msg_ini = _modify_extension_line(version, ext_name, enable=True)
     if not ok_ini: return False, msg_ini
     ok_link, msg_link = _manage_confd_symlinks(version, ext_name, enable=True)
     if not ok_link: return False, msg_link
-    logger.info(f"PHP_MANAGER: Restarting FPM for version {version} to apply extension changes...")
-    if not restart_php_fpm(version): return False, f"{msg_ini} {msg_link} FPM restart failed."
+    logger.info(f"PHP_MANAGER: Reloading FPM for version {version} to apply extension changes...")
+    if not reload_php_fpm(version): return False, f"{msg_ini} {msg_link} FPM reload failed."
     return True, f"Extension {ext_name} enabled. {msg_link}"  # msg_ini might be redundant if already ok
 
 
 def disable_extension(version, ext_name):  # Your existing function
     logger.info(f"PHP_MANAGER: Disabling PHP extension {ext_name} for version {version}...")
-    if not ensure_php_version_config_structure(version): return False, "Config structure error on disable."
+    if not ensure_php_version_config_if_stale(version): return False, "Config structure error on disable."
     _modify_extension_line(version, ext_name, enable=False)  # Comment out in mods-available
     ok_link, msg_link = _manage_confd_symlinks(version, ext_name, enable=False)  # Remove symlinks
     if not ok_link: return False, msg_link
-    logger.info(f"PHP_MANAGER: Restarting FPM for version {version} to apply extension changes...")
-    if not restart_php_fpm(version): return False, f"{msg_link} FPM restart failed."
+    logger.info(f"PHP_MANAGER: Reloading FPM for version {version} to apply extension changes...")
+    if not reload_php_fpm(version): return False, f"{msg_link} FPM reload failed."
     return True, f"Extension {ext_name} disabled. {msg_link}"
 
 
 def list_available_extensions(version):  # Your existing function, ensuring correct paths
     logger.debug(f"PHP_MANAGER: Listing available extensions for PHP {version}...")
-    # ensure_php_version_config_structure populates active_mods_available from bundle.
-    # Call it with force_recreate=False to ensure it's populated but not wiped if user made changes.
-    if not ensure_php_version_config_structure(version, force_recreate=False):
+    # The active config (incl. active_mods_available) is only re-materialised if the bundle changed.
+    if not ensure_php_version_config_if_stale(version):
         logger.error(f"PHP_MANAGER: Cannot list extensions for PHP {version}, config prep failed.")
         return []
     paths = get_php_version_paths(version);
@@ -854,7 +1320,7 @@ def list_available_extensions(version):  # Your existing function, ensuring corr
 
 def list_enabled_extensions(version):  # Your existing function, ensuring correct paths
     logger.debug(f"PHP_MANAGER: Listing enabled extensions for PHP {version}...")
-    if not ensure_php_version_config_structure(version, force_recreate=False): return []
+    if not ensure_php_version_config_if_stale(version): return []
     paths = get_php_version_paths(version);
     if not paths: return []
 
@@ -897,7 +1363,7 @@ def list_enabled_extensions(version):  # Your existing function, ensuring correc
 
 def configure_extension(version, ext_name):  # Your existing function, ensuring paths are correct
     logger.info(f"PHP_MANAGER: Configuring system extension '{ext_name}' for PHP {version}...")
-    if not ensure_php_version_config_structure(version): return False, f"Config structure prep failed."
+    if not ensure_php_version_config_if_stale(version): return False, f"Config structure prep failed."
     paths = get_php_version_paths(version);
     if not paths: return False, "Path config error."
 
@@ -1,6 +1,5 @@
 import os
 import signal
-import time
 from pathlib import Path
 import subprocess
 import shutil
@@ -18,6 +17,7 @@ logger = logging.getLogger(__name__)
 try:
     from ..core import config
     from ..core import process_manager  # Used for its helper functions if available
+    from ..core import readiness
     from ..core.system_utils import run_command  # For direct command execution
     from .services_config_manager import get_service_config_by_id  # To load instance config
 except ImportError as e:  # pragma: no cover
@@ -44,6 +44,11 @@ except ImportError as e:  # pragma: no cover
 
     process_manager = ProcessManagerDummy()
 
+    class ReadinessDummy:
+        def refine_status(self, service_type, status, **target): return status
+
+    readiness = ReadinessDummy()
+
     class ConfigDummy: pass
 
     config = ConfigDummy()
@@ -68,6 +73,7 @@ except ImportError as e:  # pragma: no cover
     config.POSTGRES_DEFAULT_USER_VAR = "postgres"
     config.AVAILABLE_BUNDLED_SERVICES = {}  # Needs dummy data for testing _get_instance_paths
     config.ensure_dir = lambda p: p.mkdir(parents=True, exist_ok=True)
+    config.ensure_base_dirs = lambda force=False: True
 
     def run_command(*args, **kwargs): return -1, "", "Import Error"
     def get_service_config_by_id(id_str): return None
@@ -311,6 +317,7 @@ def start_postgres(service_instance_config: dict):
     if get_postgres_instance_status(instance_paths) == "running": logger.info(
         f"Instance '{instance_id}' already running."); return True
 
+    config.ensure_base_dirs()  # Bootstrap point: config no longer creates dirs on import
     port_to_use = service_instance_config.get('port', config.POSTGRES_DEFAULT_PORT)
     if not _ensure_instance_config_files(instance_paths, port_to_use): logger.error(
         f"Failed config setup for {instance_id}"); return False
@@ -345,7 +352,7 @@ def start_postgres(service_instance_config: dict):
         logger.debug(
             f"pg_ctl start for '{instance_id}' exit: {result.returncode}, stdout: {result.stdout.strip()}, stderr: {result.stderr.strip()}")
         if result.returncode == 0:
-            time.sleep(1.0);
+            # pg_ctl -w already waited until the server accepts connections
             final_status = get_postgres_instance_status(instance_paths)
             if final_status == "running":
                 logger.info(f"Instance '{instance_id}' confirmed running."); return True
@@ -405,6 +412,12 @@ def stop_postgres(service_instance_config: dict):
         logger.error(f"Failed pg_ctl stop for '{instance_id}': {e}", exc_info=True); return False
 
 
+def _ready_status(instance_paths: dict):
+    """"running" once the instance accepts connections on its socket, else "starting"."""
+    return readiness.refine_status(instance_paths.get('service_type') or "postgres", "running",
+                                   sock_dir=instance_paths.get('instance_sock_dir'))
+
+
 def get_postgres_instance_status(instance_paths: dict):
     """Gets status for a specific instance using its PID file or pg_ctl status."""
     if not instance_paths: return "error"
@@ -415,7 +428,7 @@ def get_postgres_instance_status(instance_paths: dict):
 
     if not data_dir.is_dir(): return "stopped"
     pid = _read_pid_from_file(pid_file)  # Use process_manager's helper if it's public, else local one.
-    if pid and _check_process_running(pid): return "running"  # Use process_manager's helper
+    if pid and _check_process_running(pid): return _ready_status(instance_paths)  # Use process_manager's helper
 
     if pg_ctl_path and pg_ctl_path.is_file() and os.access(pg_ctl_path, os.X_OK):
         command = [str(pg_ctl_path.resolve()), "-D", str(data_dir.resolve()), "status"]
@@ -425,7 +438,7 @@ def get_postgres_instance_status(instance_paths: dict):
             lib_dir_path.resolve())
         try:
             result = subprocess.run(command, capture_output=True, text=True, check=False, env=env, timeout=10)
-            if result.returncode == 0: return "running"
+            if result.returncode == 0: return _ready_status(instance_paths)
             if result.returncode == 3: return "stopped"
             logger.warning(
                 f"pg_ctl status for {data_dir} returned {result.returncode}. Stderr: {result.stderr.strip()}")
@@ -19,6 +19,9 @@ except ImportError as e:
         def start_process(*args, **kwargs): return False
         def stop_process(*args, **kwargs): return True
         def get_process_status(*args, **kwargs): return "stopped"
+        def wait_until_running(*args, **kwargs): return "stopped"
+        def wait_until_ready(*args, **kwargs): return "stopped"
+        def get_ready_status(*args, **kwargs): return "stopped"
         def get_process_pid(*args, **kwargs): return None
     process_manager = ProcessManagerDummy()
     # Define necessary config constants used in this file as fallbacks
@@ -188,8 +191,9 @@ def start_redis():
 
     if success:
         print(f"Redis Manager: Start command issued for {process_id}. Verifying status...")
-        time.sleep(1.0) # Give Redis a moment to bind/log errors
-        status = process_manager.get_process_status(process_id)
+        # Returns once Redis answers PING (after loading its dataset) or exits
+        status = process_manager.wait_until_ready(process_id, "redis", timeout=30,
+                                                  port=getattr(config, 'REDIS_PORT', 6379))
         if status != "running":
              print(f"Redis Manager Error: {process_id} failed to stay running (Status: {status}). Check log: {log_path}")
              # Try reading last few lines of log
@@ -219,7 +223,7 @@ def stop_redis():
 def get_redis_status():
      """Gets the status of the bundled Redis process via process_manager."""
      process_id = config.REDIS_PROCESS_ID
-     return process_manager.get_process_status(process_id)
+     return process_manager.get_ready_status(process_id, "redis", port=getattr(config, 'REDIS_PORT', 6379))
 
 # --- Example Usage ---
 if __name__ == "__main__":
@@ -30,17 +30,34 @@ except ImportError as e:
     config = ConfigDummy()
 # --- End Imports ---
 
-def load_configured_services():
-    """
-    Loads the list of configured service instance dictionaries from storage.
+_services_db_migrated = False
+
+
+def _state_db():
+    """core.state_db when the SQLite backend is configured, else None. Imports services.json once."""
+    global _services_db_migrated
+    if getattr(config, 'STORAGE_BACKEND', 'json') != 'sqlite': return None
+    from ..core import state_db
+    if not _services_db_migrated:
+        if not state_db.is_migrated("services"):
+            state_db.migrate_from_json("services", _read_services_json(), config.SERVICES_CONFIG_FILE)
+        _services_db_migrated = True
+    return state_db
+
+
+def _apply_service_defaults(svc):
+    """Add default keys for robustness if they are missing from older configs."""
+    svc.setdefault('id', str(uuid.uuid4()))
+    svc.setdefault('autostart', False)
+    # Set default port based on service_type if port is missing
+    service_type = svc.get('service_type')
+    if 'port' not in svc and service_type and hasattr(config, 'AVAILABLE_BUNDLED_SERVICES'):
+        service_def = config.AVAILABLE_BUNDLED_SERVICES.get(service_type, {})
+        svc['port'] = service_def.get('default_port', 0)  # Get default from main config
+    return svc
 
-    Each dictionary contains: id, service_type ('mysql', 'redis', 'minio', 'postgres16', etc.),
-                             name ('MySQL / MariaDB'), port (int), autostart (bool)
-    """
-    if not config.ensure_dir(config.CONFIG_DIR):
-        logger.error("SERVICES_CONFIG_MANAGER: Main config directory could not be ensured. Cannot load services.")
-        return []
 
+def _read_services_json():
     services_list = []
     config_file = config.SERVICES_CONFIG_FILE
     if config_file.is_file():
@@ -50,15 +67,7 @@ def load_configured_services():
             # Basic validation
             if isinstance(data, dict) and 'configured_services' in data and isinstance(data['configured_services'], list):
                 services_list = data['configured_services']
-                # Add default keys for robustness if they are missing from older configs
-                for svc in services_list:
-                    svc.setdefault('id', str(uuid.uuid4()))
-                    svc.setdefault('autostart', False)
-                    # Set default port based on service_type if port is missing
-                    service_type = svc.get('service_type')
-                    if 'port' not in svc and service_type and hasattr(config, 'AVAILABLE_BUNDLED_SERVICES'):
-                        service_def = config.AVAILABLE_BUNDLED_SERVICES.get(service_type, {})
-                        svc['port'] = service_def.get('default_port', 0)  # Get default from main config
+                for svc in services_list: _apply_service_defaults(svc)
             else:
                 logger.warning(f"SERVICES_CONFIG_MANAGER: Invalid format in {config_file}. Discarding content.")
                 services_list = []  # Reset to empty if format is wrong
@@ -70,6 +79,27 @@ def load_configured_services():
             services_list = []
     else:
         logger.info(f"SERVICES_CONFIG_MANAGER: Services config file {config_file} not found. Returning empty list.")
+    return services_list
+
+
+def load_configured_services():
+    """
+    Loads the list of configured service instance dictionaries from storage.
+
+    Each dictionary contains: id, service_type ('mysql', 'redis', 'minio', 'postgres16', etc.),
+                             name ('MySQL / MariaDB'), port (int), autostart (bool)
+    """
+    if not config.ensure_dir(config.CONFIG_DIR):
+        logger.error("SERVICES_CONFIG_MANAGER: Main config directory could not be ensured. Cannot load services.")
+        return []
+
+    try:
+        state_db = _state_db()
+        if state_db is None: services_list = _read_services_json()
+        else: services_list = [_apply_service_defaults(svc) for svc in state_db.load_records("services")]
+    except Exception as e:
+        logger.error(f"SERVICES_CONFIG_MANAGER: Error loading services from {config.STATE_DB_FILE}: {e}", exc_info=True)
+        services_list = []
 
     # Sort by name for consistent display? Or by category then name?
     try:
@@ -96,7 +126,7 @@ def save_configured_services(services_list):
         return False
 
     config_file = config.SERVICES_CONFIG_FILE
-    temp_path_str = None  # For atomic write
+    temp_path = None  # For atomic write; checked in finally
     try:
         # Ensure consistent sorting before saving
         try:
@@ -107,6 +137,12 @@ def save_configured_services(services_list):
         except Exception:  # Fallback sort
             services_list.sort(key=lambda x: x.get('name', '').lower())
 
+        state_db = _state_db()
+        if state_db is not None:
+            if not state_db.save_records("services", services_list): return False  # Only changed rows
+            logger.info(f"SERVICES_CONFIG_MANAGER: Saved {len(services_list)} services to {config.STATE_DB_FILE}")
+            return True
+
         data_to_save = {'configured_services': services_list}
 
         # Atomic write using tempfile
@@ -221,6 +257,15 @@ def update_configured_service(service_id_to_update: str, updated_data: dict):
 def get_service_config_by_id(service_id_to_find: str):
     """Retrieves a specific service configuration by its ID."""
     if not service_id_to_find: return None
+    if getattr(config, 'STORAGE_BACKEND', 'json') == 'sqlite':
+        try:
+            service = _state_db().get_record("services", service_id_to_find)  # Primary-key lookup, no full load
+        except Exception as e:
+            logger.error(f"SERVICES_CONFIG_MANAGER: Error reading service '{service_id_to_find}' from DB: {e}")
+            return None
+        if service is None:
+            logger.debug(f"SERVICES_CONFIG_MANAGER: Service config not found for ID '{service_id_to_find}'.")
+        return _apply_service_defaults(service) if service else None
     current_services = load_configured_services()
     for service in current_services:
         if service.get('id') == service_id_to_find:
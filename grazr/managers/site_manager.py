@@ -1,3 +1,4 @@
+import copy
 import json
 import os
 import uuid
@@ -5,6 +6,7 @@ from pathlib import Path
 import tempfile
 import shutil
 import sys
+import threading
 import traceback
 
 # --- Import Core Config ---
@@ -88,11 +90,101 @@ def _detect_framework_info(site_path_obj: Path):
     print(f"Detected: framework='{framework}', docroot='{docroot}', needs_node={needs_node}")
     return {"framework_type": framework, "docroot_relative": docroot, "needs_node": needs_node}
 
-# --- Public API ---
+def _refresh_shim_tables(sites_list):
+    """Regenerates the shim resolution tables after sites.json changed. Never fails the save."""
+    try:
+        from ..core import shim_tables
+        if not shim_tables.write_site_tables(sites_list):
+            print("SiteManager Warn: Could not refresh shim resolution tables; shims will use the slow path.")
+    except Exception as e:
+        print(f"SiteManager Warn: Error refreshing shim tables: {e}")
 
-def load_sites(): # Add favorite default and sorting
-    """Loads site data, ensuring new keys have defaults and sorting by favorite/path."""
-    if not _ensure_config_dir_exists(): return []
+# --- In-memory Site Index ---
+# sites.json is parsed once and indexed by resolved path, domain and id. The index is
+# rebuilt only when the file's (inode, mtime, size) stamp changes: save_sites() keeps the
+# old mtime (copystat), but os.replace() always gives the file a new inode.
+_NOT_LOADED = object()
+_site_index = {"stamp": _NOT_LOADED, "sites": [], "by_path": {}, "by_domain": {}, "by_id": {}}
+
+_sites_db_migrated = False
+
+def _state_db():
+    """
+    core.state_db when the SQLite backend is configured, else None (imported lazily:
+    sqlite3 is not free). The first call per process imports sites.json if needed.
+    """
+    global _sites_db_migrated
+    if getattr(config, 'STORAGE_BACKEND', 'json') != 'sqlite': return None
+    from ..core import state_db
+    if not _sites_db_migrated:
+        if not state_db.is_migrated("sites"):
+            state_db.migrate_from_json("sites", _read_sites_json(), config.SITES_FILE)
+        _sites_db_migrated = True
+    return state_db
+
+def _sites_file_stamp():
+    if getattr(config, 'STORAGE_BACKEND', 'json') == 'sqlite':
+        try: return ("sqlite", _state_db().generation("sites"))
+        except Exception as e: print(f"SiteManager Error: Reading site DB generation: {e}"); return None
+    try:
+        st = os.stat(config.SITES_FILE)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _resolve_path_str(path_str):
+    if not path_str: return None
+    try: return str(Path(path_str).resolve())
+    except Exception: return None
+
+def _migrate_docroot(site, site_path_obj):
+    """
+    Entries from before docroot detection were always served from public/ when it
+    existed. Keep it that way instead of re-rooting them at the project root (which
+    would expose .env, composer.json, storage/...): re-detect, and fall back to public/.
+    """
+    docroot = site.get('docroot_relative') or '.'
+    if docroot == '.' and site_path_obj and (site_path_obj / 'public').is_dir():
+        detected = _detect_framework_info(site_path_obj)["docroot_relative"]
+        docroot = detected if detected != '.' else 'public'
+        print(f"SiteManager Info: Migrated docroot of '{site_path_obj}' to '{docroot}'.")
+    site['docroot_relative'] = docroot
+    site['docroot_detected'] = True
+
+def _apply_site_defaults(site):
+    """Fills keys added in later Grazr versions so callers can rely on them."""
+    site_path_str = site.get('path', '')
+    site_path_obj = Path(site_path_str) if site_path_str else None
+
+    site.setdefault('id', str(uuid.uuid4()))
+    site_name = site_path_obj.name if site_path_obj else 'unknown'
+    site.setdefault('domain', f"{site_name}.{config.SITE_TLD}" if site_name else "unknown.err")
+    site.setdefault('php_version', config.DEFAULT_PHP)
+    site.setdefault('php_pool', None)  # None: shared FPM pool; a dict of FPM pm settings: own pool (see php_manager)
+    site.setdefault('https', False)
+    site.setdefault('framework_type', 'Unknown')
+    if not site.get('docroot_detected'): _migrate_docroot(site, site_path_obj)
+    site.setdefault('nginx_template', 'auto')  # See nginx_templates.PROFILES; proxy also reads 'proxy_port'
+    site.setdefault('favorite', False)
+    if 'needs_node' not in site:
+        site['needs_node'] = site_path_obj.joinpath('package.json').is_file() if site_path_obj else False
+    site.setdefault('node_version', config.DEFAULT_NODE)
+    return site
+
+def _read_sites_file():
+    """Loads all sites (from sites.json or the SQLite backend) as a sorted list of site dicts."""
+    try:
+        state_db = _state_db()
+        if state_db is None: return _read_sites_json()
+        sites_data = state_db.load_records("sites")
+    except Exception as e:
+        print(f"Error Loading sites from {getattr(config, 'STATE_DB_FILE', 'state DB')}: {e}"); sites_data = []
+    for site in sites_data: _apply_site_defaults(site)
+    sites_data.sort(key=lambda x: (not x.get('favorite', False), x.get('domain', '').lower()))
+    return sites_data
+
+def _read_sites_json():
+    """Parses sites.json (converting the old list format) into a sorted list of site dicts."""
     sites_data = []; sites_file_path = config.SITES_FILE
     if sites_file_path.is_file():
         try:
@@ -100,20 +192,7 @@ def load_sites(): # Add favorite default and sorting
             if isinstance(data, dict) and 'sites' in data and isinstance(data['sites'], list):
                 sites_data = data['sites']
                 # Add default keys for robustness
-                for site in sites_data:
-                    site_path_str = site.get('path', '')
-                    site_path_obj = Path(site_path_str) if site_path_str else None
-
-                    site.setdefault('id', str(uuid.uuid4()))
-                    site_name = site_path_obj.name if site_path_obj else 'unknown'
-                    site.setdefault('domain', f"{site_name}.{config.SITE_TLD}" if site_name else "unknown.err")
-                    site.setdefault('php_version', config.DEFAULT_PHP)
-                    site.setdefault('https', False)
-                    site.setdefault('framework_type', 'Unknown')
-                    site.setdefault('docroot_relative', '.')
-                    site.setdefault('favorite', False)
-                    site.setdefault('needs_node', site_path_obj.joinpath('package.json').is_file() if site_path_obj else False)
-                    site.setdefault('node_version', config.DEFAULT_NODE)
+                for site in sites_data: _apply_site_defaults(site)
             elif isinstance(data, list): # Handle old format conversion
                  print(f"Warn: Old sites.json format detected. Converting...")
                  sites_data = []
@@ -131,6 +210,7 @@ def load_sites(): # Add favorite default and sorting
                                   "https": False,
                                   "framework_type": detection_info["framework_type"],
                                   "docroot_relative": detection_info["docroot_relative"],
+                                  "docroot_detected": True,
                                   "favorite": False,
                                   "needs_node": detection_info["needs_node"],
                                   "node_version": config.DEFAULT_NODE
@@ -142,11 +222,117 @@ def load_sites(): # Add favorite default and sorting
     sites_data.sort(key=lambda x: (not x.get('favorite', False), x.get('domain', '').lower()))
     return sites_data
 
+def _build_site_index(sites_data, stamp):
+    """Maps resolved path / lower-case domain / id to positions in sites_data (first entry wins)."""
+    by_path, by_domain, by_id = {}, {}, {}
+    for position, site in enumerate(sites_data):
+        resolved_path = _resolve_path_str(site.get('path', ''))
+        if resolved_path: by_path.setdefault(resolved_path, position)
+        if site.get('domain'): by_domain.setdefault(str(site['domain']).lower(), position)
+        if site.get('id'): by_id.setdefault(site['id'], position)
+    return {"stamp": stamp, "sites": sites_data, "by_path": by_path, "by_domain": by_domain, "by_id": by_id}
+
+def _get_site_index():
+    """Returns the current index, re-reading sites.json only if its stamp changed."""
+    global _site_index
+    stamp = _sites_file_stamp()
+    index = _site_index
+    if index["stamp"] is not _NOT_LOADED and index["stamp"] == stamp: return index
+    index = _build_site_index(_read_sites_file(), stamp)
+    _site_index = index # Swapped as a whole, so readers on other threads never see a partial index
+    return index
+
+def _copy_site(site):
+    # Values are mostly scalars; nested ones (e.g. php_pool) are copied too so callers never share the cache's
+    return {key: copy.deepcopy(value) if isinstance(value, (dict, list)) else value for key, value in site.items()}
+
+def _copy_sites(index):
+    return [_copy_site(site) for site in index["sites"]]
+
+def _site_at(index, position):
+    return _copy_site(index["sites"][position]) if position is not None else None
+
+# --- Public API ---
+
+def load_sites(): # Add favorite default and sorting
+    """Loads site data, ensuring new keys have defaults and sorting by favorite/path."""
+    # Read-only: a missing config dir simply means no sites (save_sites creates it)
+    return _copy_sites(_get_site_index())
+
+def get_site_by_path(path_str):
+    """Returns a copy of the site whose root is exactly path_str (after resolving), or None."""
+    state_db = _state_db()
+    if state_db is not None and _site_index["stamp"] is _NOT_LOADED:
+        # Nothing cached in this process (e.g. a shim): one indexed query beats a full load
+        resolved_path = _resolve_path_str(path_str)
+        found = state_db.find_sites_by_paths([resolved_path]) if resolved_path else []
+        return _apply_site_defaults(found[0]) if found else None
+    index = _get_site_index()
+    return _site_at(index, index["by_path"].get(_resolve_path_str(path_str)))
+
+def get_site_by_domain(domain):
+    """Returns a copy of the site with this domain (case-insensitive), or None."""
+    if not domain: return None
+    state_db = _state_db()
+    if state_db is not None and _site_index["stamp"] is _NOT_LOADED:
+        found = state_db.find_site_by_domain(domain)
+        return _apply_site_defaults(found) if found else None
+    index = _get_site_index()
+    return _site_at(index, index["by_domain"].get(str(domain).lower()))
+
+def get_site_by_id(site_id):
+    """Returns a copy of the site with this id, or None."""
+    if not site_id: return None
+    index = _get_site_index()
+    return _site_at(index, index["by_id"].get(site_id))
+
+def find_site_for_path(path_str, predicate=None):
+    """
+    Finds the site containing path_str: the site whose root is the path itself or its
+    nearest ancestor (longest prefix). Costs one resolve() plus a dict lookup per level.
+
+    Args:
+        path_str (str): Any directory, e.g. a shell's working directory inside a project.
+        predicate (callable, optional): Only consider sites for which predicate(site) is true
+            (e.g. sites that need Node); non-matching sites are skipped, not terminal.
+
+    Returns:
+        dict | None: A copy of the matched site.
+    """
+    resolved_path = _resolve_path_str(path_str)
+    if not resolved_path: return None
+    state_db = _state_db()
+    if state_db is not None and _site_index["stamp"] is _NOT_LOADED:
+        current = Path(resolved_path)
+        for site in state_db.find_sites_by_paths(str(p) for p in (current, *current.parents)):
+            if predicate is None or predicate(site): return _apply_site_defaults(site)
+        return None
+    index = _get_site_index()
+    by_path = index["by_path"]
+    current = Path(resolved_path)
+    for candidate in (current, *current.parents):
+        position = by_path.get(str(candidate))
+        if position is None: continue
+        site = index["sites"][position]
+        if predicate is None or predicate(site): return _copy_site(site)
+    return None
+
 def save_sites(sites_list):
     """Saves the list of site dictionaries using path from config."""
+    global _site_index
     if not _ensure_config_dir_exists(): return False
     if not isinstance(sites_list, list): print("Error: save_sites expects list."); return False
 
+    state_db = _state_db()
+    if state_db is not None:
+        sites_list.sort(key=lambda x: (not x.get('favorite', False), x.get('domain', '').lower()))
+        if not state_db.save_records("sites", sites_list): # Only changed rows are written
+            print(f"SiteManager Error: Saving sites to {config.STATE_DB_FILE} failed."); return False
+        print(f"SiteManager Info: Saved {len(sites_list)} sites to {config.STATE_DB_FILE}")
+        _site_index = _build_site_index([_apply_site_defaults(_copy_site(site)) for site in sites_list], _sites_file_stamp())
+        _refresh_shim_tables(sites_list)
+        return True
+
     config_file = config.SITES_FILE
     temp_path_str = None
     try:
@@ -163,6 +349,9 @@ def save_sites(sites_list):
         os.replace(temp_path_str, config_file);
         temp_path_str = None
         print(f"SiteManager Info: Saved {len(sites_list)} sites to {config_file}")
+        # Index what we just wrote instead of re-reading it on the next lookup
+        _site_index = _build_site_index([_apply_site_defaults(_copy_site(site)) for site in sites_list], _sites_file_stamp())
+        _refresh_shim_tables(sites_list)
         return True
     except Exception as e:
         print(f"SiteManager Error: Saving {config_file}: {e}"); return False
@@ -174,13 +363,153 @@ def save_sites(sites_list):
             except OSError:
                 return None
 
+# --- Transactions ---
+# One lock per process: the GUI thread and the Worker thread both mutate sites, and each
+# transaction is load -> mutate -> save, so two interleaved transactions would lose updates.
+_site_store_lock = threading.RLock()
+_site_store_state = threading.local()
+_INDEXED_KEYS = frozenset(('path', 'domain', 'id'))
+
+class SiteStore:
+    """
+    Transaction over sites.json. Mutations are applied to an in-memory copy and written
+    with a single save_sites() (one json.dump + fsync) when the outermost block exits.
+    Nothing is written if the block raises. A SiteStore opened while another is active on
+    the same thread joins it, so helpers like update_site_settings() batch automatically.
+
+        with SiteStore() as store:
+            for path in paths: store.update(path, {"php_version": "8.3"})
+        if not store.committed: ...
+
+    Sites are addressed by id or by path (resolved before matching).
+    """
+
+    def __init__(self):
+        self._sites = []
+        self._index = None
+        self._dirty = False
+        self._joined = False
+        self.committed = None # None while open; then True (saved or nothing to save) / False
+
+    def __enter__(self):
+        _site_store_lock.acquire()
+        active = getattr(_site_store_state, 'store', None)
+        if active is not None:
+            self._joined = True
+            return active
+        self._sites = _copy_sites(_get_site_index())
+        self._reindex()
+        _site_store_state.store = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        try:
+            if self._joined: return False
+            _site_store_state.store = None
+            if exc_type is not None:
+                print(f"SiteManager Warn: Site transaction aborted ({exc_type.__name__}); nothing saved.")
+                self.committed = False
+            elif self._dirty:
+                self.committed = save_sites(self._sites)
+            else:
+                self.committed = True
+        finally:
+            _site_store_lock.release()
+        return False
+
+    def _reindex(self, changed_keys=None):
+        # Only path/domain/id are indexed; positions are stable across in-place updates
+        if changed_keys is not None and not _INDEXED_KEYS.intersection(changed_keys): return
+        self._index = _build_site_index(self._sites, None)
+
+    def _position(self, path_or_id):
+        if not path_or_id: return None
+        position = self._index["by_id"].get(path_or_id)
+        if position is None: position = self._index["by_path"].get(_resolve_path_str(path_or_id))
+        return position
+
+    @property
+    def sites(self):
+        """Copies of the sites as they will be saved."""
+        return [_copy_site(site) for site in self._sites]
+
+    def get(self, path_or_id):
+        return _site_at(self._index, self._position(path_or_id))
+
+    def add(self, site):
+        """Adds a site dict (missing keys get defaults). False if its path is already linked."""
+        resolved_path = _resolve_path_str(site.get('path', ''))
+        if not resolved_path or resolved_path in self._index["by_path"]: return False
+        self._sites.append(_apply_site_defaults(_copy_site(dict(site, path=resolved_path))))
+        self._reindex(); self._dirty = True
+        return True
+
+    def update(self, path_or_id, new_settings):
+        position = self._position(path_or_id)
+        if position is None: return False
+        self._sites[position].update(_copy_site(new_settings))
+        self._reindex(new_settings); self._dirty = True
+        return True
+
+    def update_many(self, updates):
+        """
+        Applies {path_or_id: settings} (or (path_or_id, settings) pairs). All-or-nothing:
+        if any site is unknown, nothing is changed and False is returned.
+        """
+        items = list(updates.items() if isinstance(updates, dict) else updates)
+        positions = [self._position(key) for key, _ in items]
+        missing = [key for (key, _), position in zip(items, positions) if position is None]
+        if missing:
+            print(f"SiteManager Error: Sites not found for bulk update: {missing}")
+            return False
+        changed_keys = set()
+        for (_, new_settings), position in zip(items, positions):
+            self._sites[position].update(_copy_site(new_settings))
+            changed_keys.update(new_settings)
+        if items: self._reindex(changed_keys); self._dirty = True
+        return True
+
+    def remove(self, path_or_id):
+        position = self._position(path_or_id)
+        if position is None: return False
+        del self._sites[position]
+        self._reindex(); self._dirty = True
+        return True
+
+    def toggle_favorite(self, site_id):
+        position = self._index["by_id"].get(site_id) if site_id else None
+        if position is None: return None
+        site = self._sites[position]
+        site['favorite'] = not site.get('favorite', False)
+        self._dirty = True
+        return site['favorite']
+
+def _transaction_ok(store):
+    # A joined store commits later with the outer transaction
+    return store.committed is not False
+
+def update_many(updates):
+    """
+    Updates many sites with a single write of sites.json.
+
+    Args:
+        updates (dict | iterable): {path_or_id: settings_dict} or (path_or_id, settings_dict) pairs.
+
+    Returns:
+        bool: True if every site was found and the list was saved; nothing is changed otherwise.
+    """
+    items = list(updates.items() if isinstance(updates, dict) else updates)
+    with SiteStore() as store:
+        if not store.update_many(items): return False
+        print(f"SiteManager Info: Bulk-updating {len(items)} site(s).")
+    return _transaction_ok(store)
+
 def add_site(path_to_add):
     """Adds a site with defaults using constants from config."""
     site_path_obj = Path(path_to_add)
     if not site_path_obj.is_dir(): print(f"Error: Invalid dir '{path_to_add}'."); return False
     absolute_path = str(site_path_obj.resolve())
-    current_sites = load_sites()
-    if any(site.get('path') == absolute_path for site in current_sites):
+    if get_site_by_path(absolute_path) is not None:
         print(f"Info: Site '{absolute_path}' already linked."); return False
 
     # Detect framework info <<< NEW CALL
@@ -196,13 +525,15 @@ def add_site(path_to_add):
         "https": False,
         "framework_type": detection_info["framework_type"],
         "docroot_relative": detection_info["docroot_relative"],
+        "docroot_detected": True,
         "needs_node": detection_info["needs_node"],
         "favorite": False
     }
-    current_sites.append(new_site)
-    # save_sites handles sorting now
-    print(f"SiteManager Info: Adding site '{absolute_path}'")
-    return save_sites(current_sites)
+    with SiteStore() as store:
+        if not store.add(new_site):
+            print(f"Info: Site '{absolute_path}' already linked."); return False
+        print(f"SiteManager Info: Adding site '{absolute_path}'")
+    return _transaction_ok(store)
 
 def remove_site(path_to_remove):
     """
@@ -223,28 +554,14 @@ def remove_site(path_to_remove):
         print(f"SiteManager Error: Invalid path provided for removal '{path_to_remove}': {e}")
         return False
 
-    current_sites = load_sites() # Load the current list of site dictionaries
-    original_length = len(current_sites)
-
-    # Filter out the site dictionary with the matching 'path' key
-    # Use .get('path') to avoid KeyError if a dictionary is malformed
-    sites_after_removal = [
-        site for site in current_sites
-        if site.get('path') != absolute_path
-    ]
+    with SiteStore() as store:
+        if not store.remove(absolute_path):
+            print(f"SiteManager Info: Site path '{absolute_path}' not found in linked list.")
+            return False # Return False to indicate the site wasn't found
+        print(f"SiteManager Info: Removing site '{absolute_path}' from storage.")
 
-    # Check if any site was actually removed
-    if len(sites_after_removal) == original_length:
-        print(f"SiteManager Info: Site path '{absolute_path}' not found in linked list.")
-        return False # Return False to indicate the site wasn't found
-
-    # If a site was removed, try saving the updated list
-    print(f"SiteManager Info: Removing site '{absolute_path}' from storage.")
-    save_successful = save_sites(sites_after_removal)
-
-    if not save_successful:
+    if not _transaction_ok(store):
         print(f"SiteManager Error: Failed to save updated site list after removing '{absolute_path}'.")
-        # Consider if state is now inconsistent. Maybe try restoring backup? For now, just report False.
         return False
 
     return True # Return True only if found, removed, and saved successfully
@@ -252,44 +569,30 @@ def remove_site(path_to_remove):
 def get_site_settings(path_to_find):
     """Retrieves settings dict for a site path."""
     absolute_path = str(Path(path_to_find).resolve())
-    current_sites = load_sites()
-    for site in current_sites:
-        if site.get('path') == absolute_path: return site.copy() # Return a copy
-    print(f"Info: Settings not found for path '{absolute_path}'.")
-    return None
+    site = get_site_by_path(absolute_path) # Already a copy
+    if site is None: print(f"Info: Settings not found for path '{absolute_path}'.")
+    return site
 
 def update_site_settings(path_to_update, new_settings):
-    """Updates specific settings for a site."""
+    """Updates specific settings for a site. Inside a SiteStore block, the write is deferred to its commit."""
     absolute_path = str(Path(path_to_update).resolve())
     if not isinstance(new_settings, dict): print("Error: new_settings must be dict."); return False
-    current_sites = load_sites(); site_found_index = -1
-    for i, site in enumerate(current_sites):
-        if site.get('path') == absolute_path: site_found_index = i; break
-    if site_found_index == -1: print(f"Error: Site '{absolute_path}' not found."); return False
-    print(f"SiteManager Info: Updating '{absolute_path}' with {new_settings}")
-    # Ensure required keys are not accidentally deleted if not present in new_settings
-    for key, value in new_settings.items():
-         current_sites[site_found_index][key] = value
-    # save_sites handles sorting now
-    return save_sites(current_sites)
+    with SiteStore() as store:
+        if not store.update(absolute_path, new_settings): print(f"Error: Site '{absolute_path}' not found."); return False
+        print(f"SiteManager Info: Updating '{absolute_path}' with {new_settings}")
+    return _transaction_ok(store)
 
 def toggle_site_favorite(site_id):
     """Finds a site by its ID and toggles its 'favorite' status."""
     if not site_id: return False
-    current_sites = load_sites()
-    found = False
-    for site in current_sites:
-        if site.get('id') == site_id:
-            current_favorite_state = site.get('favorite', False)
-            site['favorite'] = not current_favorite_state # Toggle the boolean
-            print(f"SiteManager Info: Toggled favorite for '{site.get('domain')}' to {site['favorite']}")
-            found = True
-            break
-    if not found:
-        print(f"SiteManager Error: Site ID '{site_id}' not found for favorite toggle.")
-        return False
-    # Save the modified list (save_sites handles sorting)
-    return save_sites(current_sites)
+    with SiteStore() as store:
+        site = store.get(site_id)
+        new_state = store.toggle_favorite(site_id)
+        if new_state is None:
+            print(f"SiteManager Error: Site ID '{site_id}' not found for favorite toggle.")
+            return False
+        print(f"SiteManager Info: Toggled favorite for '{site.get('domain')}' to {new_state}")
+    return _transaction_ok(store)
 
 # --- Example Usage ---
 if __name__ == "__main__":
@@ -0,0 +1,95 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                               QDialogButtonBox, QTableWidget, QTableWidgetItem,
+                               QHeaderView, QCheckBox, QAbstractItemView)
+from PySide6.QtCore import Qt, Slot
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from ..core import task_metrics
+except ImportError as e:
+    logger.error(f"DIAGNOSTICS_DIALOG: Could not import core.task_metrics: {e}", exc_info=True)
+
+    class TaskMetricsDummy:
+        @staticmethod
+        def recent_records(from_file=False): return []
+        @staticmethod
+        def slowest(limit=10, task_name=None, from_file=False): return []
+        @staticmethod
+        def format_steps(record): return ""
+    task_metrics = TaskMetricsDummy()
+
+SLOWEST_LIMIT = 50
+
+
+class DiagnosticsDialog(QDialog):
+    """Shows recent worker task timings (see core/task_metrics.py), slowest first."""
+
+    COLUMNS = ["Task", "Target", "Duration", "Result", "Steps", "Finished"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics - Task Timings")
+        self.setMinimumSize(820, 420)
+        self.setObjectName("DiagnosticsDialog")
+
+        layout = QVBoxLayout(self)
+        info_label = QLabel("Recent background tasks and where they spent their time.")
+        layout.addWidget(info_label)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setAlternatingRowColors(True)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(self.COLUMNS.index("Steps"), QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table, 1)
+
+        controls_layout = QHBoxLayout()
+        self.slowest_checkbox = QCheckBox("Slowest first")
+        self.slowest_checkbox.setChecked(True)
+        self.slowest_checkbox.toggled.connect(self.refresh_data)
+        controls_layout.addWidget(self.slowest_checkbox)
+        controls_layout.addStretch()
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh_data)
+        controls_layout.addWidget(refresh_button)
+        layout.addLayout(controls_layout)
+
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+
+        self.refresh_data()
+
+    @Slot()
+    def refresh_data(self):
+        if self.slowest_checkbox.isChecked():
+            records = task_metrics.slowest(SLOWEST_LIMIT)
+        else:
+            records = list(reversed(task_metrics.recent_records()))[:SLOWEST_LIMIT]
+        self.table.setRowCount(0)
+        for record in records:
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            finished = (record.get("started_at") or 0) + (record.get("duration") or 0)
+            result = "OK" if record.get("success") else "Failed"
+            if record.get("over_timeout"): result += " (over budget)"
+            values = [
+                record.get("task") or "", record.get("detail") or "",
+                f"{record.get('duration') or 0:.2f}s", result,
+                task_metrics.format_steps(record), time.strftime("%H:%M:%S", time.localtime(finished)),
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column == self.COLUMNS.index("Duration"):
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                if column == self.COLUMNS.index("Result") and not record.get("success"):
+                    item.setForeground(Qt.GlobalColor.red)
+                if record.get("message"): item.setToolTip(record["message"])
+                self.table.setItem(row, column, item)
@@ -27,7 +27,7 @@ try:
     # Managers
     from ..managers.php_manager import detect_bundled_php_versions  # Keep for PhpPage
     from ..managers.site_manager import add_site, remove_site, toggle_site_favorite, update_site_settings
-    from ..managers.nginx_manager import get_nginx_version  # For ServicesPage
+    from ..managers.nginx_manager import get_nginx_version, get_nginx_status  # For ServicesPage
     from ..managers.mysql_manager import get_mysql_version, get_mysql_status
     from ..managers.postgres_manager import get_postgres_status, \
         get_postgres_version
@@ -44,6 +44,7 @@ except ImportError as e:
 
     config = ConfigDummyMW()
     def get_nginx_version(): return "N/A"
+    def get_nginx_status(): return "error"
     def get_mysql_version(): return "N/A"
     def get_mysql_status(): return "error"
     def get_postgres_status(instance_id=None): return "error"
@@ -76,6 +77,7 @@ try:
 
     from .add_service_dialog import AddServiceDialog
     from .php_config_dialog import PhpConfigurationDialog
+    from .diagnostics_dialog import DiagnosticsDialog
 except ImportError as e:
     logger.critical(f"MAIN_WINDOW: Could not import page widgets - {e}", exc_info=True)
 
@@ -85,6 +87,7 @@ except ImportError as e:
     class NodePage(QWidget): pass
     class AddServiceDialog(QDialog): pass
     class PhpConfigurationDialog(QDialog): pass
+    class DiagnosticsDialog(QDialog): pass
     sys.exit(1)
 
 try:
@@ -282,6 +285,12 @@ class MainWindow(QMainWindow):
         self.toggle_log_button.clicked.connect(self.toggle_log_area)  # Connect signal
         log_toggle_layout.addWidget(self.toggle_log_button)
         log_toggle_layout.addStretch()
+        self.diagnostics_button = QPushButton("Diagnostics")
+        self.diagnostics_button.setObjectName("DiagnosticsButton")
+        self.diagnostics_button.setToolTip("Show timings of recent background tasks")
+        self.diagnostics_button.setStyleSheet("border: none; color: #6C757D;")
+        self.diagnostics_button.clicked.connect(self.show_diagnostics)
+        log_toggle_layout.addWidget(self.diagnostics_button)
         content_layout.addWidget(log_toggle_bar)
 
         main_h_layout.addWidget(content_area_widget, 1)
@@ -306,11 +315,14 @@ class MainWindow(QMainWindow):
         self.services_page.addServiceClicked.connect(self.on_add_service_button_clicked);
         self.services_page.removeServiceRequested.connect(self.on_remove_service_config);
         self.services_page.stopAllServicesClicked.connect(self.on_stop_all_services_clicked)
+        self.services_page.nginxProfileRequested.connect(self.on_nginx_profile_requested)
         # Sites Page Signals
         self.sites_page.linkDirectoryClicked.connect(self.add_site_dialog);
         self.sites_page.unlinkSiteClicked.connect(self.remove_selected_site);
         self.sites_page.saveSiteDomainClicked.connect(self.on_save_site_domain);
         self.sites_page.setSitePhpVersionClicked.connect(self.on_set_site_php_version);
+        self.sites_page.setSitesPhpVersionClicked.connect(self.on_set_sites_php_version)
+        self.sites_page.setSitePhpPoolClicked.connect(self.on_set_site_php_pool)
         self.sites_page.setSiteNodeVersionClicked.connect(self.on_set_site_node_version)
         self.sites_page.enableSiteSslClicked.connect(self.on_enable_site_ssl);
         self.sites_page.disableSiteSslClicked.connect(self.on_disable_site_ssl);
@@ -327,7 +339,6 @@ class MainWindow(QMainWindow):
         self.log_message("Application starting...");
         self.sidebar.setCurrentRow(0);
         self.log_message("Attempting to start bundled Nginx...");
-        QTimer.singleShot(100, lambda: self.triggerWorker.emit("start_internal_nginx", {}))
         self.start_configured_autostart_services()
 
     def set_tray_icon(self, tray_icon: QSystemTrayIcon):
@@ -378,6 +389,7 @@ class MainWindow(QMainWindow):
             logger.error(f"Error loading services for Start All: {e}", exc_info=True); return
         if not services_to_start_ids: logger.info("No services need starting."); return
         logger.info(f"Attempting to start services for process IDs: {services_to_start_ids}")
+        start_tasks = []
         for process_id_to_start in services_to_start_ids:
             task_name = ""
             task_data = {}
@@ -402,8 +414,10 @@ class MainWindow(QMainWindow):
                 else:
                     logger.error(f"Could not parse instance_id from {process_id_to_start}"); continue
             if task_name:
-                logger.info(f"Triggering start task: {task_name} for {process_id_to_start}")
-                self.triggerWorker.emit(task_name, task_data)
+                start_tasks.append({"task_name": task_name, "data": task_data})
+        # One worker task; the orchestrator starts independent services concurrently
+        logger.info(f"Triggering start_services for: {[task['task_name'] for task in start_tasks]}")
+        self.triggerWorker.emit("start_services", {"tasks": start_tasks})
 
     def add_header_action(self, widget, page_name=None):
         if widget:
@@ -469,13 +483,18 @@ class MainWindow(QMainWindow):
         node_version_ctx = context_data.get("version", "N/A")
         pg_instance_id_ctx = context_data.get("instance_id")
 
-        if task_name in ["install_nginx", "uninstall_nginx", "update_site_domain", "set_site_php", "enable_ssl", "disable_ssl"]:
+        if task_name in ["install_nginx", "uninstall_nginx", "update_site_domain", "set_site_php", "set_site_php_pool",
+                         "enable_ssl", "disable_ssl"]:
             target_page = self.sites_page
             display_name = f"Site ({domain_ctx or Path(path_ctx).name if path_ctx else 'N/A'})"
+        elif task_name == "set_sites_php":
+            target_page = self.sites_page
+            display_name = f"Sites ({len(context_data.get('site_paths', []))})"
 
-        elif task_name in ["start_internal_nginx", "stop_internal_nginx"]:
+        elif task_name in ["start_internal_nginx", "stop_internal_nginx", "set_nginx_profile"]:
             target_page = self.services_page
             display_name = "Internal Nginx"
+            if task_name == "set_nginx_profile": display_name += f" Profile ({context_data.get('profile')})"
             service_id_for_ui_refresh = getattr(config, 'NGINX_PROCESS_ID', 'internal-nginx')
         elif task_name in ["start_mysql", "stop_mysql"]:
             target_page = self.services_page
@@ -494,6 +513,9 @@ class MainWindow(QMainWindow):
             target_page = self.services_page
             display_name = "Bundled MinIO"
             service_id_for_ui_refresh = self._get_config_id_for_service_type("minio")
+        elif task_name == "start_services":
+            target_page = self.services_page
+            display_name = f"Start Services ({len(context_data.get('services', []))})"
         elif task_name == "run_helper":
             target_page = self.services_page
             display_name = f"System Service ({service_name_ctx})"
@@ -573,6 +595,13 @@ class MainWindow(QMainWindow):
             logger.debug(f"MAIN_WINDOW: NOT scheduling re-enable for task '{task_name}'.")
         self.log_message("-" * 30)
 
+    @Slot()
+    def show_diagnostics(self):
+        """Opens the task timing view (non-modal, so it can stay open while tasks run)."""
+        dialog = DiagnosticsDialog(self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+
     @Slot()
     def toggle_log_area(self):
         """Shows or hides the log output area."""
@@ -669,7 +698,7 @@ class MainWindow(QMainWindow):
         default_port = service_definition.get('default_port', 0)
 
         if process_id_for_service == config.NGINX_PROCESS_ID:
-            status_func = process_manager.get_process_status;
+            status_func = get_nginx_status;
             version_func = get_nginx_version;
             port_info = "80/443"
         elif process_id_for_service == config.MYSQL_PROCESS_ID:
@@ -898,6 +927,12 @@ class MainWindow(QMainWindow):
         if isinstance(self.php_page, PhpPage): self.php_page.set_controls_enabled(False)
         QApplication.processEvents(); task_data = {"version": version}; self.triggerWorker.emit(task_name, task_data)
 
+    @Slot(str) # Connected to services_page.nginxProfileRequested
+    def on_nginx_profile_requested(self, profile):
+        logger.info(f"Requesting Nginx performance profile '{profile}'...")
+        if isinstance(self.services_page, ServicesPage): self.services_page.set_controls_enabled(False)
+        QApplication.processEvents(); self.triggerWorker.emit("set_nginx_profile", {"profile": profile})
+
     @Slot(dict, str) # Connected to sites_page.saveSiteDomainClicked
     def on_save_site_domain(self, site_info, new_domain):
         path=site_info.get("path","?"); old=site_info.get("domain","?")
@@ -918,6 +953,19 @@ class MainWindow(QMainWindow):
         if isinstance(self.sites_page, SitesPage): self.sites_page.set_controls_enabled(False)
         QApplication.processEvents(); task_data={"site_info":site_info, "new_php_version":new_php_version}; self.triggerWorker.emit("set_site_php", task_data)
 
+    @Slot(list, str) # Connected to sites_page.setSitesPhpVersionClicked
+    def on_set_sites_php_version(self, site_paths, new_php_version):
+        """Bulk variant of on_set_site_php_version: one sites.json write for all sites."""
+        logger.info(f"Requesting PHP update for {len(site_paths)} site(s) -> '{new_php_version}'...")
+        if isinstance(self.sites_page, SitesPage): self.sites_page.set_controls_enabled(False)
+        QApplication.processEvents(); task_data={"site_paths":list(site_paths), "new_php_version":new_php_version}; self.triggerWorker.emit("set_sites_php", task_data)
+
+    @Slot(dict, object) # Connected to sites_page.setSitePhpPoolClicked
+    def on_set_site_php_pool(self, site_info, php_pool):
+        path=site_info.get("path","?"); logger.info(f"Requesting PHP-FPM pool update '{path}' -> {php_pool or 'shared'}...")
+        if isinstance(self.sites_page, SitesPage): self.sites_page.set_controls_enabled(False)
+        QApplication.processEvents(); task_data={"site_info":site_info, "php_pool":php_pool}; self.triggerWorker.emit("set_site_php_pool", task_data)
+
     @Slot(dict)
     def on_enable_site_ssl(self, site_info):
         domain = site_info.get("domain", "?");
@@ -1008,8 +1056,10 @@ class MainWindow(QMainWindow):
         self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
         self.progress_dialog.setMinimumDuration(0)
         self.progress_dialog.setValue(0)
-        self.progress_dialog.show()
         task_data = {"version": version}
+        # Only a queued task can be cancelled; a running NVM command finishes
+        self.progress_dialog.canceled.connect(lambda: self.worker.cancel_queued("install_node", task_data))
+        self.progress_dialog.show()
         self.triggerWorker.emit("install_node", task_data)
 
     @Slot(str)
@@ -1021,8 +1071,10 @@ class MainWindow(QMainWindow):
         self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
         self.progress_dialog.setMinimumDuration(0)
         self.progress_dialog.setValue(0)
-        self.progress_dialog.show()
         task_data = {"version": version}
+        # Only a queued task can be cancelled; a running NVM command finishes
+        self.progress_dialog.canceled.connect(lambda: self.worker.cancel_queued("uninstall_node", task_data))
+        self.progress_dialog.show()
         self.triggerWorker.emit("uninstall_node", task_data)
 
     @Slot(str, str)
@@ -1117,7 +1169,9 @@ class MainWindow(QMainWindow):
         return None
 
     def start_configured_autostart_services(self):
+        """Starts Nginx and every service with autostart set, as one parallel start_services task."""
         logger.info("Checking for services configured for autostart...")
+        start_tasks = [{"task_name": "start_internal_nginx", "data": {}}]
         try:
             services = load_configured_services()
             for svc_config in services:  # svc_config is the dict from services.json
@@ -1139,11 +1193,12 @@ class MainWindow(QMainWindow):
 
                     if task_name:
                         logger.info(f"Autostarting {service_type} (Instance ID: {instance_id})...")
-                        self.triggerWorker.emit(task_name, task_data)
+                        start_tasks.append({"task_name": task_name, "data": task_data})
                     else:
                         logger.warning(f"Unknown service type '{service_type}' for autostart.")
         except Exception as e:
             logger.error(f"Error loading or starting autostart services: {e}", exc_info=True)
+        QTimer.singleShot(100, lambda: self.triggerWorker.emit("start_services", {"tasks": start_tasks}))
 
     def closeEvent(self, event):
         logger.debug("MAIN_WINDOW: closeEvent triggered")
@@ -17,14 +17,14 @@ logger = logging.getLogger(__name__)
 # --- Import Core Config & Manager Functions ---
 try:
     from ..core import config
-    from ..managers.php_manager import (get_ini_value, set_ini_value,
+    from ..managers.php_manager import (get_ini_values, set_ini_values,
                                         list_available_extensions, list_enabled_extensions,
                                         enable_extension, disable_extension,
                                         configure_extension, get_php_ini_path)
 except ImportError as e:
     logger.error(f"Failed to import dependencies: {e}", exc_info=True)
-    def get_ini_value(v, k, s='PHP'): return "128M"
-    def set_ini_value(v, k, val, s='PHP'): return False
+    def get_ini_values(v, keys, s='fpm'): return {k: "128M" for k in keys}
+    def set_ini_values(v, settings, sapis=('cli', 'fpm')): return {s: False for s in sapis}
     def list_available_extensions(v): return ["opcache(err)", "xdebug(err)"]
     def list_enabled_extensions(v): return ["opcache(err)"]
     def enable_extension(v, n): return False, "Err"
@@ -180,7 +180,8 @@ class PhpConfigurationDialog(QDialog):
         self._pending_extension_changes = {}
 
         # Load INI values (as before)
-        upload_str = get_ini_value(self.php_version, 'upload_max_filesize'); upload_mb = self._parse_mb_value(upload_str); mem_str = get_ini_value(self.php_version, 'memory_limit'); mem_mb = self._parse_mb_value(mem_str, allow_unlimited=-1); exec_str = get_ini_value(self.php_version, 'max_execution_time'); exec_sec = self._parse_int_value(exec_str);
+        ini_values = get_ini_values(self.php_version, ['upload_max_filesize', 'memory_limit', 'max_execution_time'])
+        upload_mb = self._parse_mb_value(ini_values['upload_max_filesize']); mem_mb = self._parse_mb_value(ini_values['memory_limit'], allow_unlimited=-1); exec_sec = self._parse_int_value(ini_values['max_execution_time']);
         self.upload_spinbox.setValue(upload_mb if upload_mb is not None else 2); self._initial_ini_values['upload_max_filesize'] = f"{self.upload_spinbox.value()}M"; self._initial_ini_values['post_max_size'] = f"{self.upload_spinbox.value()}M";
         self.memory_spinbox.setValue(mem_mb if mem_mb is not None else 128); self._initial_ini_values['memory_limit'] = "-1" if self.memory_spinbox.value() == -1 else f"{self.memory_spinbox.value()}M";
         self.exectime_spinbox.setValue(exec_sec if exec_sec is not None else 60); self._initial_ini_values['max_execution_time'] = str(self.exectime_spinbox.value());
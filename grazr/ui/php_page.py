@@ -19,7 +19,7 @@ try:
     from ..managers.php_manager import (detect_bundled_php_versions,
                                         get_php_fpm_status,
                                         get_default_php_version,
-                                        get_ini_value,
+                                        get_ini_values,
                                         get_php_ini_path
                                         )
     from .widgets.php_version_item_widget import PhpVersionItemWidget
@@ -28,7 +28,7 @@ except ImportError as e:
     # Define dummy functions/constants
     def detect_bundled_php_versions(): return ["?.?(ImportErr)"]
     def get_php_fpm_status(v): return "unknown"
-    def get_ini_value(v, k, s='PHP'): return None
+    def get_ini_values(v, keys, s='fpm'): return {k: None for k in keys}
     def get_php_ini_path(v): return Path(f"/tmp/error_php_{v}.ini")
 
 
@@ -242,8 +242,9 @@ class PhpPage(QWidget):
              self.ini_group_box.setEnabled(True)
         self._initial_ini_values = {}
 
-        upload_str = get_ini_value(version, 'upload_max_filesize'); upload_mb = self._parse_mb_value(upload_str)
-        mem_str = get_ini_value(version, 'memory_limit'); mem_mb = self._parse_mb_value(mem_str, allow_unlimited=-1)
+        ini_values = get_ini_values(version, ['upload_max_filesize', 'memory_limit'])
+        upload_mb = self._parse_mb_value(ini_values['upload_max_filesize'])
+        mem_mb = self._parse_mb_value(ini_values['memory_limit'], allow_unlimited=-1)
 
         if hasattr(self, 'upload_spinbox'): self.upload_spinbox.setValue(upload_mb if upload_mb is not None else 2); self._initial_ini_values['upload_max_filesize'] = self.upload_spinbox.value()
         if hasattr(self, 'memory_spinbox'): self.memory_spinbox.setValue(mem_mb if mem_mb is not None else 128); self._initial_ini_values['memory_limit'] = self.memory_spinbox.value()
@@ -132,7 +132,7 @@ class ServiceItemWidget(QWidget):
     @Slot()
     def _on_action_button_clicked(self):
         action = "start"
-        if self._current_status in ["running", "active"]: action = "stop"
+        if self._current_status in ["running", "active", "starting"]: action = "stop"
         self.actionClicked.emit(self.service_id, action)  # Emits widget_key
 
     @Slot(str)
@@ -153,6 +153,12 @@ class ServiceItemWidget(QWidget):
             action_enabled = True;
             remove_enabled = False;
             tooltip = f"Stop {self.display_name}"
+        elif status == "starting":  # Process alive, readiness probe not passing yet
+            status_color = Qt.GlobalColor.darkYellow;
+            button_text = "Stop";
+            action_enabled = True;
+            remove_enabled = False;
+            tooltip = f"{self.display_name} is starting (not accepting connections yet)"
         elif status == "stopped" or status == "inactive":
             status_color = Qt.GlobalColor.darkRed;
             button_text = "Start";
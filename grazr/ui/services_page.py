@@ -2,7 +2,7 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                                QPushButton, QListWidget, QListWidgetItem,
                                QFrame, QSplitter, QSizePolicy, QStackedWidget,
                                QTextEdit, QScrollArea, QMessageBox, QApplication,
-                               QSpacerItem, QGroupBox, QLineEdit)
+                               QSpacerItem, QGroupBox, QLineEdit, QComboBox)
 from PySide6.QtCore import Signal, Slot, Qt, QTimer, QObject, QUrl, QSize
 from PySide6.QtGui import QFont, QPalette, QColor, QTextCursor, QDesktopServices, QClipboard, QIcon, QBrush
 
@@ -23,6 +23,7 @@ try:
     from .widgets.status_indicator import StatusIndicator
     from .service_item_widget import ServiceItemWidget
     from ..managers.services_config_manager import load_configured_services, get_service_config_by_id
+    from ..managers.nginx_manager import NGINX_PROFILES, NGINX_PROFILE_DEFAULT, get_nginx_profile
 except ImportError as e:
     logger.error(f"SERVICES_PAGE: Could not import dependencies: {e}", exc_info=True)
 
@@ -41,6 +42,9 @@ except ImportError as e:
 
     def load_configured_services(): return []
     def get_service_config_by_id(id_str): return None
+    NGINX_PROFILES = {}
+    NGINX_PROFILE_DEFAULT = "default"
+    def get_nginx_profile(): return None
 
     class ConfigDummy:
         NGINX_PROCESS_ID = "err-nginx";
@@ -67,6 +71,7 @@ class ServicesPage(QWidget):
     addServiceClicked = Signal()
     removeServiceRequested = Signal(str)
     stopAllServicesClicked = Signal()
+    nginxProfileRequested = Signal(str)
 
     def __init__(self, parent=None):
         """Initializes the Services page UI - dynamically loads services."""
@@ -303,6 +308,9 @@ class ServicesPage(QWidget):
             doc_button)
         scroll_layout.addLayout(top_row_layout)
 
+        if service_type == "nginx" and NGINX_PROFILES:
+            scroll_layout.addWidget(self._create_nginx_profile_section(service_item_id_or_process_id))
+
         # (DB Client buttons, Env Vars, Dashboard Link, Log Viewer sections - same structure as before)
         # These sections will need to use service_config and instance_paths for PostgreSQL
         # For Env Vars:
@@ -365,6 +373,46 @@ class ServicesPage(QWidget):
         scroll_layout.addStretch(1)
         return widget
 
+    def _create_nginx_profile_section(self, service_item_id):
+        """Performance profile picker for the main nginx.conf (see nginx_manager.NGINX_PROFILES)."""
+        section_widget = QWidget()
+        section_widget.setObjectName("DetailSectionWidget")
+        section_layout = QVBoxLayout(section_widget)
+        section_layout.setSpacing(8)
+        section_layout.setContentsMargins(0, 0, 0, 0)
+        profile_label = QLabel("Performance Profile")
+        profile_label.setFont(QFont("Sans Serif", 10, QFont.Weight.Bold))
+        section_layout.addWidget(profile_label)
+
+        row_layout = QHBoxLayout()
+        profile_combo = QComboBox()
+        for name, profile in NGINX_PROFILES.items():
+            profile_combo.addItem(profile.get("label", name), name)
+        current = get_nginx_profile()
+        profile_combo.setCurrentIndex(max(0, profile_combo.findData(current or NGINX_PROFILE_DEFAULT)))
+        apply_button = QPushButton("Apply")
+        apply_button.setObjectName("PrimaryButton")
+        apply_button.clicked.connect(lambda: self.nginxProfileRequested.emit(profile_combo.currentData()))
+        row_layout.addWidget(profile_combo)
+        row_layout.addWidget(apply_button)
+        row_layout.addStretch()
+        section_layout.addLayout(row_layout)
+
+        description_label = QLabel()
+        description_label.setWordWrap(True)
+        description_label.setStyleSheet("color: #666;")
+        def update_description():
+            text = NGINX_PROFILES.get(profile_combo.currentData(), {}).get("description", "")
+            if current is None: text += " The current nginx.conf was not generated from a profile; applying one replaces it."
+            description_label.setText(text)
+        profile_combo.currentIndexChanged.connect(update_description)
+        update_description()
+        section_layout.addWidget(description_label)
+
+        self._detail_controls[f"{service_item_id}_nginx_profile_combo"] = profile_combo
+        self._detail_controls[f"{service_item_id}_nginx_profile_apply"] = apply_button
+        return section_widget
+
     @Slot()  # Slot for copy button
     def on_copy_env_vars(self, service_item_id):
         env_label_widget = self._detail_controls.get(f"{service_item_id}_env_text_label")
@@ -611,6 +659,8 @@ class ServicesPage(QWidget):
                 widget.setEnabled(enabled)
         self.add_service_button.setEnabled(enabled)
         if hasattr(self, 'stop_all_button'): self.stop_all_button.setEnabled(enabled)
+        nginx_apply = self._detail_controls.get(f"{getattr(config, 'NGINX_PROCESS_ID', '')}_nginx_profile_apply")
+        if nginx_apply: nginx_apply.setEnabled(enabled)
         if enabled: QTimer.singleShot(10, self.refresh_data)  # Re-check states after enabling
 
     def refresh_data(self):
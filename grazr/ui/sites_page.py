@@ -2,7 +2,8 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                                QPushButton, QListWidget, QListWidgetItem,
                                QFileDialog, QApplication, QFrame, QSplitter,
                                QSizePolicy, QLineEdit, QMessageBox,
-                               QComboBox, QCheckBox, QMenu, QFormLayout, QScrollArea)
+                               QComboBox, QCheckBox, QMenu, QFormLayout, QScrollArea,
+                               QAbstractItemView, QSpinBox)
 from PySide6.QtCore import Signal, Slot, Qt, QRegularExpression, QUrl, QSize
 from PySide6.QtGui import QFont, QRegularExpressionValidator, QAction, QDesktopServices, QPainter, QColor, QPixmap, QIcon
 
@@ -56,6 +57,8 @@ class SitesPage(QWidget):
     unlinkSiteClicked = Signal(dict)
     saveSiteDomainClicked = Signal(dict, str)
     setSitePhpVersionClicked = Signal(dict, str)
+    setSitesPhpVersionClicked = Signal(list, str)  # Site paths, PHP version (bulk, from the list's context menu)
+    setSitePhpPoolClicked = Signal(dict, object)  # Site info, php_pool dict (None = shared pool)
     setSiteNodeVersionClicked = Signal(dict, str)
     enableSiteSslClicked = Signal(dict)
     disableSiteSslClicked = Signal(dict)
@@ -111,6 +114,8 @@ class SitesPage(QWidget):
         self.site_list_widget.setObjectName("SiteList")
         self.site_list_widget.setSpacing(0);
         self.site_list_widget.setStyleSheet("...")  # Use global style
+        self.site_list_widget.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.site_list_widget.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         left_layout.addWidget(self.site_list_widget, 1)  # List takes stretch
 
         left_pane_widget.setMinimumWidth(200);
@@ -142,6 +147,7 @@ class SitesPage(QWidget):
 
         # --- Connect Signals ---
         self.site_list_widget.currentItemChanged.connect(self.on_site_selection_changed)
+        self.site_list_widget.customContextMenuRequested.connect(self.on_site_list_context_menu)
         # --- Initial State ---
         self.display_site_details(None)
 
@@ -261,6 +267,25 @@ class SitesPage(QWidget):
         general_form_layout.addRow("PHP Version:", php_version_combo)
         self._detail_widgets_cache['php_version_combo'] = php_version_combo
 
+        # --- PHP-FPM Pool (shared, or the site's own pool; see php_manager.SITE_POOL_DEFAULTS) ---
+        stored_pool = site_info.get('php_pool') or {}
+        php_pool_combo = QComboBox(); php_pool_combo.setFont(details_font)
+        php_pool_combo.setToolTip("Shared: the PHP version's common pool. Otherwise the site gets its own pool with this process manager mode.")
+        php_pool_combo.addItems(["Shared", "ondemand", "dynamic", "static"])
+        php_pool_combo.setCurrentText(stored_pool.get('pm', 'ondemand') if stored_pool else "Shared")
+        max_children_spin = QSpinBox(); max_children_spin.setRange(1, 256); max_children_spin.setPrefix("Max children: ")
+        max_children_spin.setValue(int(stored_pool.get('pm.max_children', 5)) if str(stored_pool.get('pm.max_children', 5)).isdigit() else 5)
+        max_children_spin.setEnabled(bool(stored_pool))
+        php_pool_combo.currentTextChanged.connect(lambda text: max_children_spin.setEnabled(text != "Shared"))
+        apply_pool_button = QPushButton("Apply"); apply_pool_button.setObjectName("ApplyPoolButton")
+        apply_pool_button.clicked.connect(self.on_apply_php_pool_clicked)
+        pool_row_layout = QHBoxLayout(); pool_row_layout.setContentsMargins(0, 0, 0, 0)
+        pool_row_layout.addWidget(php_pool_combo, 1); pool_row_layout.addWidget(max_children_spin); pool_row_layout.addWidget(apply_pool_button)
+        general_form_layout.addRow("PHP-FPM Pool:", pool_row_layout)
+        self._detail_widgets_cache['php_pool_combo'] = php_pool_combo
+        self._detail_widgets_cache['php_pool_max_children'] = max_children_spin
+        self._detail_widgets_cache['apply_pool_button'] = apply_pool_button
+
         # --- Node Version (Conditional) ---
         if site_info.get('needs_node', False):
             node_version_combo = QComboBox()
@@ -551,6 +576,45 @@ class SitesPage(QWidget):
         self.log_to_main(f"Request PHP change '{self.current_site_info['path']}' -> '{version_to_save}'"); set_btn.setEnabled(False)
         self.setSitePhpVersionClicked.emit(self.current_site_info, version_to_save)
 
+    @Slot()
+    def on_apply_php_pool_clicked(self):
+        """Emits the site's new php_pool setting; other pool keys (max_requests, slowlog) are kept."""
+        if not self.current_site_info: return
+        combo = self._detail_widgets_cache.get('php_pool_combo'); spin = self._detail_widgets_cache.get('php_pool_max_children')
+        if not combo or not spin: return
+        if combo.currentText() == "Shared":
+            php_pool = None
+        else:
+            php_pool = dict(self.current_site_info.get('php_pool') or {})
+            php_pool.update({"pm": combo.currentText(), "pm.max_children": spin.value()})
+        if php_pool == (self.current_site_info.get('php_pool') or None): return
+        self.log_to_main(f"Request PHP-FPM pool change for site '{self.current_site_info['domain']}' -> {php_pool or 'shared'}")
+        self.setSitePhpPoolClicked.emit(self.current_site_info, php_pool)
+
+    def _selected_site_paths(self):
+        paths = []
+        for item in self.site_list_widget.selectedItems():
+            site_info = item.data(Qt.UserRole)
+            if isinstance(site_info, dict) and site_info.get('path'): paths.append(site_info['path'])
+        return paths
+
+    @Slot(object)
+    def on_site_list_context_menu(self, pos):
+        """Context menu for the selected sites (Ctrl/Shift-click to select several)."""
+        site_paths = self._selected_site_paths()
+        if not site_paths: return
+        menu = QMenu(self)
+        php_menu = menu.addMenu(f"Set PHP Version ({len(site_paths)} site{'s' if len(site_paths) != 1 else ''})")
+        for label in ["Default"] + list(detect_bundled_php_versions() or []):
+            version = config.DEFAULT_PHP if label == "Default" else label
+            action = php_menu.addAction(label)
+            action.triggered.connect(lambda checked=False, v=version: self._request_sites_php_version(site_paths, v))
+        menu.exec(self.site_list_widget.viewport().mapToGlobal(pos))
+
+    def _request_sites_php_version(self, site_paths, version):
+        self.log_to_main(f"Request PHP change for {len(site_paths)} site(s) -> '{version}'")
+        self.setSitesPhpVersionClicked.emit(site_paths, version)
+
     @Slot(int)
     def on_https_toggled(self, state): # (Unchanged)
         if self._ignore_https_toggle or not self.current_site_info: return
@@ -791,6 +855,12 @@ class SitesPage(QWidget):
                 self.on_url_text_changed(self._detail_widgets_cache['url_edit'].text())
             except RuntimeError:
                 pass  # Ignore if url_edit deleted
+        if enabled and 'php_pool_combo' in self._detail_widgets_cache:
+            try:
+                self._detail_widgets_cache['php_pool_max_children'].setEnabled(
+                    self._detail_widgets_cache['php_pool_combo'].currentText() != "Shared")
+            except RuntimeError:
+                pass
 
     def _set_detail_widget_enabled(self, widget_key, enabled, check_condition=None):
         """Helper to enable/disable a specific widget in the details cache."""
@@ -145,7 +145,7 @@ class PhpVersionItemWidget(QWidget):
         # Determine action based on current status stored internally
         action = "start"
         # Check against various 'stopped' or 'error' states
-        if self._current_status in ["running", "active"]:
+        if self._current_status in ["running", "active", "starting"]:
             action = "stop"
         # Emit the main signal with the determined action and version
         self.actionClicked.emit(self.php_version, action)
@@ -173,6 +173,11 @@ class PhpVersionItemWidget(QWidget):
             button_text = "Stop"
             action_enabled = True
             tooltip = f"Stop PHP-FPM {self.php_version}"
+        elif status == "starting":  # Process alive, pool socket not accepting yet
+            status_color = Qt.darkYellow
+            button_text = "Stop"
+            action_enabled = True
+            tooltip = f"PHP-FPM {self.php_version} is starting (not accepting connections yet)"
         elif status == "stopped" or status == "inactive":
             status_color = Qt.darkRed
             button_text = "Start"
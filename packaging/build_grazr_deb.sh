@@ -36,6 +36,7 @@ INSTALL_DIR_DESKTOP_ENTRY="/usr/share/applications"
 INSTALL_DIR_PIXMAPS="/usr/share/pixmaps"
 INSTALL_DIR_POLKIT_ACTIONS="/usr/share/polkit-1/actions"
 INSTALL_DIR_LAUNCHER="/usr/bin"
+INSTALL_DIR_SYSTEMD_USER="/usr/lib/systemd/user"
 
 # --- Helper Functions ---
 RED='\033[0;31m'; GREEN='\033[0;32m'; YELLOW='\033[0;33m'; NC='\033[0m';
@@ -102,12 +103,14 @@ mkdir -p "${BUILD_DIR}${INSTALL_DIR_DESKTOP_ENTRY}"
 mkdir -p "${BUILD_DIR}${INSTALL_DIR_PIXMAPS}"
 mkdir -p "${BUILD_DIR}${INSTALL_DIR_POLKIT_ACTIONS}"
 mkdir -p "${BUILD_DIR}${INSTALL_DIR_LAUNCHER}"
+mkdir -p "${BUILD_DIR}${INSTALL_DIR_SYSTEMD_USER}"
 
 echo_green "4. Copying application files..."
 if [ -d "${GRAZR_PYTHON_PACKAGE_SOURCE_DIR}" ]; then echo_yellow "  Copying Grazr Python package to ${BUILD_DIR}${INSTALL_DIR_PYTHON_PKG}..."; cp -r "${GRAZR_PYTHON_PACKAGE_SOURCE_DIR}/"* "${BUILD_DIR}${INSTALL_DIR_PYTHON_PKG}/"; else echo_red "Grazr Python package source dir not found: ${GRAZR_PYTHON_PACKAGE_SOURCE_DIR}"; exit 1; fi
 if [ -f "${PACKAGING_SOURCE_DIR}/grazr_root_helper.py" ]; then echo_yellow "  Copying grazr_root_helper.py to ${BUILD_DIR}${INSTALL_DIR_BIN}..."; cp "${PACKAGING_SOURCE_DIR}/grazr_root_helper.py" "${BUILD_DIR}${INSTALL_DIR_BIN}/grazr_root_helper.py"; else echo_red "grazr_root_helper.py not found."; exit 1; fi
 if [ -f "${PACKAGING_SOURCE_DIR}/php-shim.sh" ]; then echo_yellow "  Copying shims to ${BUILD_DIR}${INSTALL_DIR_BIN}..."; cp "${PACKAGING_SOURCE_DIR}/php-shim.sh" "${BUILD_DIR}${INSTALL_DIR_BIN}/php"; else echo_red "php-shim.sh not found."; exit 1; fi
 if [ -f "${PACKAGING_SOURCE_DIR}/node-shim.sh" ]; then cp "${PACKAGING_SOURCE_DIR}/node-shim.sh" "${BUILD_DIR}${INSTALL_DIR_BIN}/node"; else echo_red "node-shim.sh not found."; exit 1; fi
+if [ -f "${PACKAGING_SOURCE_DIR}/grazr-resolver.service" ]; then cp "${PACKAGING_SOURCE_DIR}/grazr-resolver.service" "${BUILD_DIR}${INSTALL_DIR_SYSTEMD_USER}/grazr-resolver.service"; else echo_yellow "  grazr-resolver.service not found, skipping optional user unit."; fi
 if [ -f "$MKCERT_SOURCE_BINARY" ]; then echo_yellow "  Copying mkcert to ${BUILD_DIR}${INSTALL_DIR_BIN}/grazr-mkcert..."; cp "$MKCERT_SOURCE_BINARY" "${BUILD_DIR}${INSTALL_DIR_BIN}/grazr-mkcert"; else echo_red "mkcert binary not found at $MKCERT_SOURCE_BINARY. Run bundle_mkcert.sh first."; exit 1; fi
 if [ -f "${PACKAGING_SOURCE_DIR}/com.grazr.pkexec.policy" ]; then echo_yellow "  Copying Polkit policy to ${BUILD_DIR}${INSTALL_DIR_POLKIT_ACTIONS}..."; cp "${PACKAGING_SOURCE_DIR}/com.grazr.pkexec.policy" "${BUILD_DIR}${INSTALL_DIR_POLKIT_ACTIONS}/com.grazr.pkexec.policy"; else echo_red "Polkit policy not found."; exit 1; fi
 if [ -f "$APP_ICON_SOURCE_PATH" ]; then echo_yellow "  Copying application icon to ${BUILD_DIR}${INSTALL_DIR_PIXMAPS}..."; cp "$APP_ICON_SOURCE_PATH" "${BUILD_DIR}${INSTALL_DIR_PIXMAPS}/${APP_NAME}-logo.png"; else echo_red "App icon not found at $APP_ICON_SOURCE_PATH"; exit 1; fi
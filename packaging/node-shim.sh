@@ -1,5 +1,6 @@
 #!/bin/bash
-# /usr/local/bin/node - Grazr Shim Script (Using nvm which - Clean Version)
+# /usr/local/bin/node - Grazr Shim Script (also installed as npm/npx)
+# Resolves the site's Node version and execs it from Grazr's version map; nvm is only a fallback.
 
 # --- Configuration ---
 GRAZR_PYTHON_EXEC="${HOME}/Projects/Grazr/venv/bin/python"
@@ -8,6 +9,12 @@ GRAZR_PROJECT_ROOT="${HOME}/Projects/Grazr"
 NVM_BUNDLES_DIR="${HOME}/.local/share/grazr/bundles/nvm"
 NVM_SCRIPT_PATH="${NVM_BUNDLES_DIR}/nvm.sh"
 NVM_MANAGED_NODE_DIR="${HOME}/.local/share/grazr/nvm_nodes"
+GRAZR_CONFIG_DIR="${XDG_CONFIG_HOME:-${HOME}/.config}/grazr"
+GRAZR_SITES_FILE="${GRAZR_CONFIG_DIR}/sites.json"
+GRAZR_NODE_TABLE="${GRAZR_CONFIG_DIR}/node_resolution.tsv"
+GRAZR_NODE_VERSION_MAP="${GRAZR_CONFIG_DIR}/node_versions.tsv"
+GRAZR_RESOLVER_SOCK="${GRAZR_CONFIG_DIR}/run/resolver.sock"
+GRAZR_RESOLVER_TIMEOUT="0.3" # Hard timeout (seconds) for the optional resolver daemon
 # --- End Configuration ---
 
 CURRENT_DIR="$PWD"
@@ -15,25 +22,77 @@ CALLED_COMMAND=$(basename "$0")
 
 log_error() { echo "[Grazr Shim Error|${CALLED_COMMAND}] $1" >&2; }
 
-# --- Check required components exist ---
-if [ ! -x "$GRAZR_PYTHON_EXEC" ]; then
-    log_error "Python exec not found: ${GRAZR_PYTHON_EXEC}"
-    exit 127
-fi
-
-if [ ! -f "$NVM_SCRIPT_PATH" ]; then
-    log_error "Bundled NVM script not found: ${NVM_SCRIPT_PATH}. Falling back."
+exec_system_command() {
     SYSTEM_CMD_PATH=$(command -v "$CALLED_COMMAND")
     if [ -x "$SYSTEM_CMD_PATH" ] && [ "$SYSTEM_CMD_PATH" != "$0" ]; then
         exec "$SYSTEM_CMD_PATH" "$@"
-        exit $?
+    fi
+    log_error "System ${CALLED_COMMAND} not found."
+    exit 127
+}
+
+# --- Fast path: precompiled site table (written by Grazr on every sites.json save) ---
+# Rows are "site_root<TAB>node_version", longest root first; no match means "system".
+NODE_VERSION_STRING=""; NODE_BIN_DIR=""
+TABLE_STATE="missing"
+resolve_from_table() {
+    [ -f "$GRAZR_NODE_TABLE" ] || return 1
+    TABLE_STATE="stale"
+    if [ -e "$GRAZR_SITES_FILE" ] && [ ! "$GRAZR_NODE_TABLE" -nt "$GRAZR_SITES_FILE" ]; then return 1; fi
+    TABLE_STATE="fresh"
+    local physical_dir row_root row_version
+    physical_dir=$(pwd -P 2>/dev/null) || physical_dir="$CURRENT_DIR"
+    while IFS=$'\t' read -r row_root row_version; do
+        case "$row_root" in ''|'#'*) continue ;; esac
+        if [ "$physical_dir" = "$row_root" ] || [[ "$physical_dir" == "${row_root%/}/"* ]]; then
+            NODE_VERSION_STRING="$row_version"
+            return 0
+        fi
+    done < "$GRAZR_NODE_TABLE"
+    NODE_VERSION_STRING="system"
+    return 0
+}
+
+# --- Version -> bin dir from the map Grazr writes on Node install/uninstall ---
+lookup_bin_dir() {
+    [ -f "$GRAZR_NODE_VERSION_MAP" ] || return 1
+    local map_key map_dir
+    while IFS=$'\t' read -r map_key map_dir; do
+        if [ "$map_key" = "$NODE_VERSION_STRING" ]; then
+            NODE_BIN_DIR="$map_dir"
+            return 0
+        fi
+    done < "$GRAZR_NODE_VERSION_MAP"
+    return 1
+}
+
+# --- Second try: resident resolver daemon (optional; needs socat or nc with -U) ---
+resolve_from_daemon() {
+    [ -S "$GRAZR_RESOLVER_SOCK" ] || return 1
+    command -v timeout > /dev/null 2>&1 || return 1
+    local request reply reply_status
+    request=$(printf 'node\t%s' "$CURRENT_DIR")
+    if command -v socat > /dev/null 2>&1; then
+        reply=$(printf '%s\n' "$request" | timeout "$GRAZR_RESOLVER_TIMEOUT" socat -t "$GRAZR_RESOLVER_TIMEOUT" - "UNIX-CONNECT:${GRAZR_RESOLVER_SOCK}" 2>/dev/null) || return 1
+    elif command -v nc > /dev/null 2>&1; then
+        reply=$(printf '%s\n' "$request" | timeout "$GRAZR_RESOLVER_TIMEOUT" nc -U "$GRAZR_RESOLVER_SOCK" 2>/dev/null) || return 1
     else
-        log_error "System ${CALLED_COMMAND} not found."
-        exit 127
+        return 1
     fi
+    IFS=$'\t' read -r reply_status NODE_VERSION_STRING NODE_BIN_DIR <<< "$reply"
+    [ "$reply_status" = "ok" ] && [ -n "$NODE_VERSION_STRING" ]
+}
+
+HELPER_EXIT_CODE=0
+if resolve_from_table || resolve_from_daemon; then
+    :
+else
+# --- Slow path: ask grazr.cli (also refreshes the table if it was missing or stale) ---
+if [ ! -x "$GRAZR_PYTHON_EXEC" ]; then
+    log_error "Python exec not found: ${GRAZR_PYTHON_EXEC}"
+    exit 127
 fi
 
-# --- Call Python Helper ---
 PYTHON_CODE="
 import sys
 import os
@@ -46,6 +105,13 @@ try:
     target_path = '${CURRENT_DIR}'
     version = find_node_version_for_path(target_path)
     print(version)
+    sys.stdout.flush()
+    if '${TABLE_STATE}' != 'fresh':
+        try:
+            from grazr.core import shim_tables
+            shim_tables.write_node_resolution_table()
+        except Exception as e_tbl:
+            print(f'Shim Python Table Refresh Error: {e_tbl}', file=sys.stderr)
     sys.exit(0)
 except ImportError as e:
     print(f'Shim Python Error: Import: {e}', file=sys.stderr)
@@ -56,19 +122,26 @@ except Exception as e:
 "
 NODE_VERSION_STRING=$("$GRAZR_PYTHON_EXEC" -c "$PYTHON_CODE")
 HELPER_EXIT_CODE=$?
+fi
 
 # --- Handle Helper Result ---
 if [ $HELPER_EXIT_CODE -ne 0 ] || [ -z "$NODE_VERSION_STRING" ] || [ "$NODE_VERSION_STRING" = "system" ]; then
-    SYSTEM_CMD_PATH=$(command -v "$CALLED_COMMAND")
-    if [ -x "$SYSTEM_CMD_PATH" ] && [ "$SYSTEM_CMD_PATH" != "$0" ]; then
-        exec "$SYSTEM_CMD_PATH" "$@"
-        exit $?
-    else
-        log_error "System ${CALLED_COMMAND} not found."
-        exit 127
+    exec_system_command "$@"
+fi
+
+# --- Direct exec from the version map (no nvm.sh) ---
+if [ -n "$NODE_BIN_DIR" ] || lookup_bin_dir; then
+    if [ -x "${NODE_BIN_DIR}/${CALLED_COMMAND}" ]; then
+        exec "${NODE_BIN_DIR}/${CALLED_COMMAND}" "$@"
     fi
 fi
 
+# --- Fallback: bundled NVM (aliases like lts/*, or a map that is missing/out of date) ---
+if [ ! -f "$NVM_SCRIPT_PATH" ]; then
+    log_error "Bundled NVM script not found: ${NVM_SCRIPT_PATH}. Falling back."
+    exec_system_command "$@"
+fi
+
 # --- Use Bundled NVM to find executable path ---
 export NVM_DIR="$NVM_MANAGED_NODE_DIR"
 \. "$NVM_SCRIPT_PATH" || {
@@ -87,14 +160,7 @@ WHICH_EXIT_CODE=$?
 if [ $WHICH_EXIT_CODE -ne 0 ] || [ -z "$TARGET_NODE_EXEC_PATH" ] || [ ! -x "$TARGET_NODE_EXEC_PATH" ]; then
     log_error "Could not find executable path for Node version '${NODE_VERSION_STRING}' using 'nvm which'."
     log_error "Ensure version '${NODE_VERSION_STRING}' is installed via Grazr Node page."
-    SYSTEM_CMD_PATH=$(command -v "$CALLED_COMMAND")
-    if [ -x "$SYSTEM_CMD_PATH" ] && [ "$SYSTEM_CMD_PATH" != "$0" ]; then
-        exec "$SYSTEM_CMD_PATH" "$@"
-        exit $?
-    else
-        log_error "System ${CALLED_COMMAND} not found."
-        exit 127
-    fi
+    exec_system_command "$@"
 fi
 
 NODE_BIN_DIR=$(dirname "$TARGET_NODE_EXEC_PATH")
@@ -102,14 +168,7 @@ TARGET_COMMAND_PATH="${NODE_BIN_DIR}/${CALLED_COMMAND}"
 
 if [ ! -x "$TARGET_COMMAND_PATH" ]; then
     log_error "Command '${CALLED_COMMAND}' not found at expected path: ${TARGET_COMMAND_PATH}"
-    SYSTEM_CMD_PATH=$(command -v "$CALLED_COMMAND")
-    if [ -x "$SYSTEM_CMD_PATH" ] && [ "$SYSTEM_CMD_PATH" != "$0" ]; then
-        exec "$SYSTEM_CMD_PATH" "$@"
-        exit $?
-    else
-        log_error "System ${CALLED_COMMAND} not found."
-        exit 127
-    fi
+    exec_system_command "$@"
 fi
 
 exec "$TARGET_COMMAND_PATH" "$@"
@@ -10,6 +10,11 @@ GRAZR_PYTHON_EXEC="${HOME}/Projects/Grazr/venv/bin/python"
 GRAZR_PROJECT_ROOT="${HOME}/Projects/Grazr"
 GRAZR_MODULE_PATH="grazr.cli"
 GRAZR_PHP_BUNDLES_DIR="${HOME}/.local/share/grazr/bundles/php"
+GRAZR_CONFIG_DIR="${XDG_CONFIG_HOME:-${HOME}/.config}/grazr"
+GRAZR_SITES_FILE="${GRAZR_CONFIG_DIR}/sites.json"
+GRAZR_PHP_TABLE="${GRAZR_CONFIG_DIR}/php_resolution.tsv"
+GRAZR_RESOLVER_SOCK="${GRAZR_CONFIG_DIR}/run/resolver.sock"
+GRAZR_RESOLVER_TIMEOUT="0.3" # Hard timeout (seconds) for the optional resolver daemon
 # --- End Configuration ---
 
 CURRENT_DIR="$PWD"
@@ -18,10 +23,58 @@ SHIM_NAME=$(basename "$0")
 log_shim_error() { echo "Grazr PHP Shim Error (${SHIM_NAME}): $1" >&2; }
 log_shim_info() { echo "Grazr PHP Shim Info (${SHIM_NAME}): $1" >&2; }
 
+# --- Fast path: precompiled resolution table (written by Grazr on every sites.json save) ---
+# Rows are "site_root<TAB>version<TAB>cli_ini<TAB>cli_conf_d", longest root first, "*" = default.
+# The table is ignored when sites.json or the PHP bundles dir is newer than it.
+PHP_VERSION_STRING=""; PHP_INI_PATH_ACTIVE=""; PHP_CLI_CONFD_PATH_FROM_HELPER=""
+TABLE_STATE="missing"
+resolve_from_table() {
+    [ -f "$GRAZR_PHP_TABLE" ] || return 1
+    TABLE_STATE="stale"
+    if [ -e "$GRAZR_SITES_FILE" ] && [ ! "$GRAZR_PHP_TABLE" -nt "$GRAZR_SITES_FILE" ]; then return 1; fi
+    if [ -d "$GRAZR_PHP_BUNDLES_DIR" ] && [ ! "$GRAZR_PHP_TABLE" -nt "$GRAZR_PHP_BUNDLES_DIR" ]; then return 1; fi
+    TABLE_STATE="fresh"
+    local physical_dir row_root row_version row_ini row_confd
+    physical_dir=$(pwd -P 2>/dev/null) || physical_dir="$CURRENT_DIR"
+    while IFS=$'\t' read -r row_root row_version row_ini row_confd; do
+        case "$row_root" in ''|'#'*) continue ;; esac
+        if [ "$row_root" = "*" ] || [ "$physical_dir" = "$row_root" ] || [[ "$physical_dir" == "${row_root%/}/"* ]]; then
+            # Active config not materialised yet: let the Python helper create it.
+            [ -n "$row_version" ] && [ -f "$row_ini" ] || return 1
+            PHP_VERSION_STRING="$row_version"; PHP_INI_PATH_ACTIVE="$row_ini"; PHP_CLI_CONFD_PATH_FROM_HELPER="$row_confd"
+            return 0
+        fi
+    done < "$GRAZR_PHP_TABLE"
+    return 1
+}
+
+# --- Second try: resident resolver daemon (optional; needs socat or nc with -U) ---
+resolve_from_daemon() {
+    [ -S "$GRAZR_RESOLVER_SOCK" ] || return 1
+    command -v timeout > /dev/null 2>&1 || return 1
+    local request reply reply_status
+    request=$(printf 'php\t%s' "$CURRENT_DIR")
+    if command -v socat > /dev/null 2>&1; then
+        reply=$(printf '%s\n' "$request" | timeout "$GRAZR_RESOLVER_TIMEOUT" socat -t "$GRAZR_RESOLVER_TIMEOUT" - "UNIX-CONNECT:${GRAZR_RESOLVER_SOCK}" 2>/dev/null) || return 1
+    elif command -v nc > /dev/null 2>&1; then
+        reply=$(printf '%s\n' "$request" | timeout "$GRAZR_RESOLVER_TIMEOUT" nc -U "$GRAZR_RESOLVER_SOCK" 2>/dev/null) || return 1
+    else
+        return 1
+    fi
+    IFS=$'\t' read -r reply_status PHP_VERSION_STRING PHP_INI_PATH_ACTIVE PHP_CLI_CONFD_PATH_FROM_HELPER <<< "$reply"
+    [ "$reply_status" = "ok" ] && [ -n "$PHP_VERSION_STRING" ]
+}
+
+HELPER_EXIT_CODE=0
+if resolve_from_table; then
+    log_shim_info "Resolved from table: ${GRAZR_PHP_TABLE}"
+elif resolve_from_daemon; then
+    log_shim_info "Resolved via resolver daemon: ${GRAZR_RESOLVER_SOCK}"
+else
+# --- Slow path: ask grazr.cli (also refreshes the table if it was missing or stale) ---
 if [ ! -x "$GRAZR_PYTHON_EXEC" ]; then log_shim_error "Python exec not found: ${GRAZR_PYTHON_EXEC}"; exit 127; fi
 
 TMP_PHP_INFO_FILE=$(mktemp /tmp/grazr_php_info.XXXXXX)
-HELPER_EXIT_CODE=0
 PYTHON_CODE_TO_EXEC="
 import sys; import importlib; from pathlib import Path;
 project_root = Path('${GRAZR_PROJECT_ROOT}');
@@ -31,6 +84,10 @@ try:
     find_php_version_for_path = getattr(cli_module, 'find_php_version_for_path');
     target_path = '${CURRENT_DIR}';
     find_php_version_for_path(target_path);
+    sys.stdout.flush();
+    if '${TABLE_STATE}' != 'fresh':
+        try: importlib.import_module('grazr.core.shim_tables').write_php_resolution_table();
+        except Exception as e_tbl: print(f'Shim Python Table Refresh Error: {e_tbl}', file=sys.stderr);
     sys.exit(0);
 except ImportError as e_imp: print(f'Shim Python Import Error: {e_imp}', file=sys.stderr); sys.exit(3);
 except AttributeError as e_attr: print(f'Shim Python Attribute Error: {e_attr}', file=sys.stderr); sys.exit(5);
@@ -43,6 +100,7 @@ PHP_INI_PATH_ACTIVE=$(sed -n '2p' "$TMP_PHP_INFO_FILE")
 # The third line from cli.py *should* be the active cli conf.d path
 PHP_CLI_CONFD_PATH_FROM_HELPER=$(sed -n '3p' "$TMP_PHP_INFO_FILE")
 rm "$TMP_PHP_INFO_FILE"
+fi
 
 if [ $HELPER_EXIT_CODE -ne 0 ] || [ -z "$PHP_VERSION_STRING" ]; then
   log_shim_error "Could not determine Grazr PHP version (Helper Exit: ${HELPER_EXIT_CODE}). Falling back."
@@ -0,0 +1,61 @@
+import threading
+import unittest
+
+from grazr.core.task_executor import LANE_DEFAULT, LANE_INTERACTIVE, TaskExecutor
+
+WAIT = 5
+
+
+class TaskExecutorOrderingTest(unittest.TestCase):
+    def setUp(self):
+        self.order = []
+        self.order_lock = threading.Lock()
+
+    def _record(self, name, data):
+        with self.order_lock:
+            self.order.append(name)
+
+    def _blocker(self, started, release):
+        def run(name, data):
+            started.set()
+            release.wait(WAIT)
+        return run
+
+    def test_same_resource_keeps_submission_order_across_lanes(self):
+        executor = TaskExecutor(max_workers=2)
+        started, release = threading.Event(), threading.Event()
+        executor.submit("busy", {}, self._blocker(started, release), lane=LANE_INTERACTIVE, resources={"php:8.3"})
+        self.assertTrue(started.wait(WAIT))
+        # A later interactive Stop must not overtake an earlier INI save on the same version
+        executor.submit("save_php_ini", {}, self._record, lane=LANE_DEFAULT, resources={"php:8.3"})
+        executor.submit("stop_php_fpm", {}, self._record, lane=LANE_INTERACTIVE, resources={"php:8.3"})
+        release.set()
+        self.assertTrue(self._drained(executor))
+        self.assertEqual(self.order, ["save_php_ini", "stop_php_fpm"])
+
+    def test_interactive_lane_goes_first_for_unrelated_resources(self):
+        executor = TaskExecutor(max_workers=3)
+        releases = []
+        for index in range(3):  # Fill every worker
+            started, release = threading.Event(), threading.Event()
+            releases.append(release)
+            executor.submit(f"busy{index}", {}, self._blocker(started, release),
+                            lane=LANE_INTERACTIVE, resources={f"service:{index}"})
+            self.assertTrue(started.wait(WAIT))
+        executor.submit("save_php_ini", {}, self._record, lane=LANE_DEFAULT, resources={"php:8.3"})
+        executor.submit("status", {}, self._record, lane=LANE_INTERACTIVE, resources={"service:redis"})
+        releases[0].set()  # One free worker: the interactive task gets it
+        with executor._cond:
+            self.assertTrue(executor._cond.wait_for(lambda: self.order, WAIT))
+        for release in releases[1:]: release.set()
+        self.assertTrue(self._drained(executor))
+        self.assertEqual(self.order, ["status", "save_php_ini"])
+
+    @staticmethod
+    def _drained(executor):
+        with executor._cond:
+            return executor._cond.wait_for(lambda: not executor._queued and not executor._running, WAIT)
+
+
+if __name__ == "__main__":
+    unittest.main()